@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from instance import affectationPlusProches, coordonneesInstance, instanceChargee
+from instrumentation import chronometre, chronometrer
+
+
+# Au-delà de ce nombre de noeuds, les numéros des noeuds ne sont plus écrits sur les schémas
+SEUIL_ETIQUETTES = 200
+
+
+# Fonction pour créer le graphe de l'instance
+def creerGraphe(probleme):
+    g = probleme.get_graph()
+    return g
+
+# Fonction pour afficher le graphe
+def afficherGraphe(graphe, probleme):
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
+    coords = probleme.node_coords
+    pos = {}
+    if coords:
+        # Utilise les coordonnées de l'instance quand elles existent
+        for node in graphe.nodes():
+            if node in coords:
+                pos[node] = coords[node]
+
+    if len(pos) != len(graphe.nodes()):
+        pos = nx.spring_layout(graphe, seed=4)
+
+    nx.draw(graphe, pos, with_labels=True)
+    plt.savefig(f"img/{probleme.name}.png")
+    plt.show()
+    plt.close()
+
+
+# Dessin d'une solution sur une figure : anneau et étoiles en deux LineCollection
+def _dessinerSolution(figure, probleme, cycle, stations, titre, affectation=None):
+    noeuds, coords = coordonneesInstance(probleme)
+    noeuds = np.asarray(noeuds)
+    if affectation is None:
+        _, affectation, _ = affectationPlusProches(probleme, stations)
+    idx_stations = np.searchsorted(noeuds, np.asarray(stations))
+    idx_affectation = np.searchsorted(noeuds, np.asarray(affectation))
+    est_station = np.zeros(len(noeuds), dtype=bool)
+    est_station[idx_stations] = True
+    clients = np.flatnonzero(~est_station)
+    points_anneau = coords[np.searchsorted(noeuds, np.asarray(cycle))]
+
+    axes = figure.add_subplot()
+    # Un segment par client vers sa station, puis un segment par arête de l'anneau
+    etoiles = np.stack([coords[clients], coords[idx_affectation[clients]]], axis=1)
+    axes.add_collection(LineCollection(etoiles, colors="gray", linewidths=1, linestyles="dotted", zorder=1))
+    anneau = np.stack([points_anneau, np.roll(points_anneau, -1, axis=0)], axis=1)
+    axes.add_collection(LineCollection(anneau, colors="red", linewidths=2, zorder=2))
+
+    # Taille des points réduite pour les grandes instances
+    echelle = min(1.0, SEUIL_ETIQUETTES / len(noeuds))
+    axes.scatter(coords[clients, 0], coords[clients, 1], s=50 * echelle, c="blue", zorder=3)
+    axes.scatter(coords[idx_stations, 0], coords[idx_stations, 1], s=100 * echelle, c="red", zorder=4)
+    if len(noeuds) <= SEUIL_ETIQUETTES:
+        for noeud, (x, y) in zip(noeuds.tolist(), coords.tolist()):
+            axes.text(x, y, str(noeud), fontsize=8, ha="center", va="center", zorder=5)
+    axes.set_aspect("equal", adjustable="datalim")
+    axes.autoscale_view()
+    axes.set_title(titre)
+
+
+# Fonction pour enregistrer le schéma d'une solution (backend Agg, sans pyplot ni fenêtre)
+@chronometrer("affichage")
+def dessinerSolution(probleme, cycle, stations, chemin_image, titre=None, affectation=None):
+    """
+    Args:
+        chemin_image: Fichier PNG de sortie (son dossier est créé si besoin)
+        titre: Titre du schéma (défaut : nom de l'instance)
+        affectation: Station de chaque noeud, dans l'ordre des noeuds triés (celle que
+            renvoie affectationPlusProches) ; recalculée par arbre k-d si elle n'est pas donnée
+    """
+    figure = Figure(figsize=(12, 10))
+    _dessinerSolution(figure, probleme, cycle, stations, titre or probleme.name, affectation)
+    os.makedirs(os.path.dirname(chemin_image) or ".", exist_ok=True)
+    figure.savefig(chemin_image, dpi=150, bbox_inches="tight")
+    return chemin_image
+
+
+# Affichage d'une solution anneau + étoiles
+def afficherSolution(probleme, cycle, stations, methode="solution", montrer=True, affectation=None):
+    titre = f"Solution {methode} - {probleme.name}"
+    nom_fichier = f"img/Solution_{methode}_{probleme.name}.png"
+
+    # montrer=False : image seulement, par le backend Agg (exécutions sans écran, lots)
+    if not montrer:
+        dessinerSolution(probleme, cycle, stations, nom_fichier, titre, affectation)
+        print(f"Schéma sauvegardé : {nom_fichier}")
+        return
+
+    import matplotlib.pyplot as plt
+
+    with chronometre("affichage"):
+        figure = plt.figure(figsize=(12, 10))
+        _dessinerSolution(figure, probleme, cycle, stations, titre, affectation)
+        os.makedirs("img", exist_ok=True)
+        figure.savefig(nom_fichier, dpi=150, bbox_inches="tight")
+    print(f"Schéma sauvegardé : {nom_fichier}")
+    plt.show()
+    plt.close(figure)
+
+
+def _dessiner_tache(chemin_instance, cycle, stations, chemin_image, titre):
+    return dessinerSolution(instanceChargee(chemin_instance), cycle, stations, chemin_image, titre)
+
+
+# Rendu d'un lot de solutions, réparti sur n_workers processus
+def dessinerSolutions(taches, n_workers=1):
+    """
+    Args:
+        taches: Liste de (chemin_instance, cycle, stations, chemin_image, titre)
+        n_workers: Nombre de processus (1 = séquentiel)
+
+    Returns:
+        Liste des images écrites, dans l'ordre des tâches
+    """
+    # Tâches groupées par instance : chaque processus recharge l'instance le moins souvent possible
+    ordre = sorted(range(len(taches)), key=lambda k: taches[k][0])
+    if n_workers <= 1:
+        images = [_dessiner_tache(*taches[k]) for k in ordre]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            images = list(pool.map(_dessiner_tache, *zip(*(taches[k] for k in ordre)),
+                                   chunksize=max(1, len(taches) // (4 * n_workers))))
+    resultat = [None] * len(taches)
+    for k, image in zip(ordre, images):
+        resultat[k] = image
+    return resultat
+
+
+# Schémas des solutions d'un fichier JSON lines produit par batch.py (étape séparée du calcul)
+def afficherResultats(chemin_resultats, dossier="img", n_workers=1):
+    taches = []
+    with open(chemin_resultats) as f:
+        for texte in f:
+            ligne = json.loads(texte)
+            if "erreur" in ligne:
+                continue
+            methode = f"{ligne['methode']}_p{ligne['p']}"
+            taches.append((ligne["instance"], ligne["cycle"], ligne["stations"],
+                           os.path.join(dossier, f"Solution_{methode}_{ligne['nom']}.png"),
+                           f"Solution {methode} - {ligne['nom']}"))
+    for image in dessinerSolutions(taches, n_workers):
+        print(f"Schéma sauvegardé : {image}")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage : python affichage.py <resultats.jsonl> [nombre_processus] [dossier_images]")
+        sys.exit(1)
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    dossier = sys.argv[3] if len(sys.argv) > 3 else "img"
+    afficherResultats(sys.argv[1], dossier, n_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import contextlib
+import random
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from echeances import echeanceDepassee
+from instance import (
+    MatriceImplicite,
+    _executer_metaheuristique,
+    _matrices_en_memoire,
+    coordonneesInstance,
+    evaluerNombreStations,
+    obtenirMatriceDistances,
+)
+
+
+# Contexte d'un processus du balayage parallèle (rempli par _initialiser_worker)
+_contexte_worker = {}
+
+
+# Matrice copiée en mémoire partagée pour les processus d'un pool ; renvoie le nom du segment.
+# Une matrice implicite n'a rien à partager (None) : chaque processus la recrée sans calcul
+@contextlib.contextmanager
+def _matricePartagee(matrice):
+    if isinstance(matrice, MatriceImplicite):
+        yield None
+        return
+    memoire = shared_memory.SharedMemory(create=True, size=max(1, matrice.nbytes))
+    try:
+        partagee = np.ndarray(matrice.shape, dtype=matrice.dtype, buffer=memoire.buf)
+        partagee[:] = matrice
+        yield memoire.name
+    finally:
+        memoire.close()
+        memoire.unlink()
+
+
+def _initialiser_worker(probleme, methode_resolution, ameliorer_anneau, nom_memoire, forme, dtype, echeance=None):
+    # Rattachement à la matrice en mémoire partagée, sans copie ni recalcul
+    # (sans segment, la matrice est implicite et obtenirMatriceDistances la recrée)
+    memoire = None
+    if nom_memoire is not None:
+        try:
+            memoire = shared_memory.SharedMemory(name=nom_memoire, track=False)
+        except TypeError:
+            # Python < 3.13 : le suivi passe par le resource_tracker partagé avec le processus principal
+            memoire = shared_memory.SharedMemory(name=nom_memoire)
+        matrice = np.ndarray(forme, dtype=dtype, buffer=memoire.buf)
+        noeuds, _ = coordonneesInstance(probleme)
+        index_to_node = {i: noeuds[i] for i in range(len(noeuds))}
+        node_to_index = {noeuds[i]: i for i in range(len(noeuds))}
+        _matrices_en_memoire.setdefault(probleme, {})[("EUCLIDIENNE", np.dtype(dtype).str)] = (
+            matrice, index_to_node, node_to_index
+        )
+    _contexte_worker.update(
+        probleme=probleme,
+        methode_resolution=methode_resolution,
+        ameliorer_anneau=ameliorer_anneau,
+        memoire=memoire,
+        echeance=echeance,
+    )
+    # Sans cela, tous les processus issus du fork tireraient les mêmes stations aléatoires
+    random.seed()
+
+
+# Pool de n_workers processus rattachés à la matrice de distances de probleme (mémoire partagée)
+@contextlib.contextmanager
+def _poolMatricePartagee(probleme, n_workers, methode_resolution=None, ameliorer_anneau=False, echeance=None):
+    matrice, _, _ = obtenirMatriceDistances(probleme)
+    with _matricePartagee(matrice) as nom_memoire, ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_initialiser_worker,
+        initargs=(probleme, methode_resolution, ameliorer_anneau, nom_memoire, matrice.shape, matrice.dtype,
+                  echeance),
+    ) as pool:
+        yield pool
+
+
+# Évaluation d'un p dans un processus du pool ; avec une méthode à état partagé (voir
+# _balayage_parallele), l'état reçu est fusionné avant et l'état obtenu est renvoyé après
+def _evaluer_p_worker(p, etat=None):
+    echeance = _contexte_worker.get("echeance")
+    methode_resolution = _contexte_worker["methode_resolution"]
+    if echeanceDepassee(echeance):
+        return p, None, None, None, "échéance dépassée", None
+    if etat is not None:
+        methode_resolution.fusionner_etat(etat)
+    try:
+        cycle, stations, cout = evaluerNombreStations(
+            _contexte_worker["probleme"], methode_resolution, p, _contexte_worker["ameliorer_anneau"],
+            echeance=echeance,
+        )
+        resultat = (p, cycle, stations, cout, None)
+    except Exception as e:
+        resultat = (p, None, None, None, str(e))
+    return (*resultat, None if etat is None else methode_resolution.etat_partage())
+
+
+# Balayage des valeurs de p sur un pool de processus, résultats au fil de l'eau
+# À l'échéance, les valeurs de p pas encore commencées sont annulées ; celles en cours
+# reçoivent la même échéance et s'arrêtent d'elles-mêmes.
+# Une méthode à état partagé (etat_partage / fusionner_etat, comme les modèles exacts :
+# coupure et coupes déjà trouvées) ne reçoit qu'une valeur de p par processus à la fois :
+# chaque tâche part de l'état connu à son lancement, et l'état qu'elle renvoie est fusionné
+def _balayage_parallele(probleme, methode_resolution, valeurs_p, ameliorer_anneau, n_workers, echeance=None):
+    partage = hasattr(methode_resolution, "etat_partage")
+    with _poolMatricePartagee(probleme, n_workers, methode_resolution, ameliorer_anneau, echeance) as pool:
+        def lancer(p):
+            return pool.submit(_evaluer_p_worker, p, methode_resolution.etat_partage() if partage else None)
+
+        def rendre(tache):
+            *resultat, etat = tache.result()
+            if etat is not None:
+                methode_resolution.fusionner_etat(etat)
+            return tuple(resultat)
+
+        a_lancer = deque(valeurs_p)
+        en_vol = n_workers if partage else len(a_lancer)
+        en_cours = set()
+        while a_lancer or en_cours:
+            while a_lancer and len(en_cours) < en_vol:
+                en_cours.add(lancer(a_lancer.popleft()))
+            terminees, en_cours = wait(en_cours, return_when=FIRST_COMPLETED)
+            for tache in terminees:
+                yield rendre(tache)
+            if echeanceDepassee(echeance):
+                break
+        for tache in en_cours:
+            # cancel() échoue pour une tâche en cours : on attend son résultat
+            if not tache.cancel():
+                yield rendre(tache)
+
+
+# Une exécution de la métaheuristique dans un processus de _poolMatricePartagee
+def _metaheuristique_worker(*arguments):
+    return _executer_metaheuristique(_contexte_worker["probleme"], *arguments)
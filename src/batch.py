@@ -0,0 +1,157 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from echeances import Echeance
+from instance import (
+    cout_solution,
+    dimensionInstance,
+    heuristique_puis_amelioration,
+    heuristique_rapide,
+    heuristique_rapide_optimisee,
+    amelioration_locale_optimisee,
+    instanceChargee,
+    metaheuristique,
+    obtenirMatriceDistances,
+)
+from instrumentation import rapportInstrumentation, reinitialiserCompteurs
+
+
+METHODES = ("heuristique", "amelioration_locale", "metaheuristique", "exacte")
+
+
+# Valeurs de p : "auto" (la méthode choisit p), ou une liste de valeurs et d'intervalles "3-10,15"
+def lireValeursP(texte):
+    if texte == "auto":
+        return [None]
+    valeurs = []
+    for morceau in texte.split(","):
+        if "-" in morceau:
+            debut, fin = morceau.split("-")
+            valeurs.extend(range(int(debut), int(fin) + 1))
+        else:
+            valeurs.append(int(morceau))
+    return valeurs
+
+
+# Fichiers .tsp désignés par des chemins ou des motifs glob (dans l'ordre, sans doublon)
+def listerInstances(motifs):
+    fichiers = []
+    for motif in motifs:
+        trouves = sorted(glob.glob(motif)) if glob.has_magic(motif) else [motif]
+        for fichier in trouves:
+            if fichier not in fichiers:
+                fichiers.append(fichier)
+    return fichiers
+
+
+# Résolution d'une tâche ; p=None laisse la méthode choisir le nombre de stations
+# budget : temps maximal de la tâche (None = sans limite), qui borne aussi le temps_limite de la métaheuristique
+def resoudre(probleme, methode, p, graine, temps_limite, budget=None):
+    if methode == "heuristique":
+        if p is None:
+            return heuristique_rapide_optimisee(probleme, verbeux=False, budget=budget)
+        cycle, stations = heuristique_rapide(probleme, p)
+        return p, cycle, stations, cout_solution(probleme, cycle, stations, *obtenirMatriceDistances(probleme))
+    if methode == "amelioration_locale":
+        if p is None:
+            return amelioration_locale_optimisee(probleme, strategie="section_doree", verbeux=False, budget=budget)
+        echeance = None if budget is None else Echeance(budget)
+        cycle, stations, cout = heuristique_puis_amelioration(probleme, p, echeance=echeance)
+        return p, cycle, stations, cout
+    if methode == "metaheuristique":
+        if budget is not None:
+            # Budget épuisé : la métaheuristique renvoie sa première construction GRASP
+            temps_limite = max(min(temps_limite, budget), 1e-3)
+        # p donné : nombre de stations du premier départ, la recherche le fait ensuite varier
+        return metaheuristique(probleme, temps_limite=temps_limite, graine=graine, p_initial=p, verbeux=False)
+    from exact import methode_exacte, methode_exacte_optimisee
+    if p is None:
+        return methode_exacte_optimisee(probleme, formulation="coupes", temps_limite=temps_limite, budget=budget)
+    echeance = None if budget is None else Echeance(budget)
+    cycle, stations = methode_exacte(probleme, p, formulation="coupes", temps_limite=temps_limite,
+                                     echeance=echeance)
+    return p, cycle, stations, cout_solution(probleme, cycle, stations, *obtenirMatriceDistances(probleme))
+
+
+# Une tâche (instance, méthode, p) dans un processus du pool ; renvoie la ligne JSON à écrire
+def executerTache(fichier, methode, p, graine, temps_limite, budget=None):
+    ligne = {"instance": fichier, "methode": methode, "p_demande": p, "graine": graine}
+    debut = time.perf_counter()
+    reinitialiserCompteurs()
+    try:
+        # Les méthodes affichent leur progression : rien ne doit se mêler aux lignes JSON
+        with contextlib.redirect_stdout(io.StringIO()):
+            probleme = instanceChargee(fichier)
+            random.seed(graine)
+            p_trouve, cycle, stations, cout = resoudre(probleme, methode, p, graine, temps_limite, budget)
+        ligne.update(nom=probleme.name, n=probleme.dimension, p=p_trouve, cout=cout,
+                     stations=[int(u) for u in stations], cycle=[int(u) for u in cycle])
+    except Exception as e:
+        ligne["erreur"] = f"{type(e).__name__}: {e}"
+    ligne["temps"] = time.perf_counter() - debut
+    ligne["phases"] = {phase: mesure["temps"] for phase, mesure in rapportInstrumentation()["phases"].items()}
+    return ligne
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Résolution d'un lot d'instances sur un pool de processus, "
+                                                 "une ligne JSON par tâche terminée")
+    parser.add_argument("instances", nargs="+", help="Fichiers .tsp ou motifs glob (\"data/*.tsp\")")
+    parser.add_argument("--methodes", default="heuristique",
+                        help="Méthodes séparées par des virgules parmi " + ", ".join(METHODES))
+    parser.add_argument("--p", default="auto",
+                        help="\"auto\" (la méthode choisit p) ou valeurs et intervalles, par exemple \"3-10,15\"")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument("--temps-limite", type=float, default=10.0,
+                        help="Budget de la métaheuristique et temps limite de la méthode exacte (secondes)")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Temps maximal de chaque tâche, métaheuristique comprise : à l'échéance, "
+                             "la tâche renvoie la meilleure solution trouvée (secondes, défaut : sans limite)")
+    parser.add_argument("--graine", type=int, default=0, help="Graine aléatoire de chaque tâche")
+    parser.add_argument("--sortie", default="-", help="Fichier JSON lines (défaut : sortie standard)")
+    args = parser.parse_args()
+
+    methodes = args.methodes.split(",")
+    for methode in methodes:
+        if methode not in METHODES:
+            parser.error(f"méthode inconnue : {methode}")
+    fichiers = listerInstances(args.instances)
+    if not fichiers:
+        parser.error("aucune instance trouvée")
+    valeurs_p = lireValeursP(args.p)
+
+    # Les plus grandes instances d'abord : les tâches longues ne restent pas seules en fin de lot.
+    # Seul l'entête est lu ; les instances sont chargées par les processus du pool
+    tailles = {fichier: dimensionInstance(fichier) or instanceChargee(fichier).dimension for fichier in fichiers}
+    taches = [(fichier, methode, p) for fichier in sorted(fichiers, key=lambda f: -tailles[f])
+              for methode in methodes for p in valeurs_p if p is None or 3 <= p <= tailles[fichier]]
+
+    sortie = sys.stdout if args.sortie == "-" else open(args.sortie, "w")
+    debut = time.perf_counter()
+    erreurs = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = [pool.submit(executerTache, fichier, methode, p, args.graine, args.temps_limite, args.budget)
+                       for fichier, methode, p in taches]
+            for future in as_completed(futures):
+                ligne = future.result()
+                erreurs += "erreur" in ligne
+                sortie.write(json.dumps(ligne) + "\n")
+                sortie.flush()
+    finally:
+        if sortie is not sys.stdout:
+            sortie.close()
+    print(f"{len(taches)} tâches ({erreurs} en erreur) en {time.perf_counter() - debut:.1f} s", file=sys.stderr)
+    sys.exit(1 if erreurs else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from instance import (
+    chargerInstance,
+    heuristique_puis_amelioration,
+    heuristique_rapide,
+    obtenirMatriceDistances,
+    cout_solution,
+)
+from instrumentation import COMPTEURS, reinitialiserCompteurs
+
+
+METHODES = ("heuristique", "amelioration_locale", "exacte")
+
+# Colonnes du fichier CSV (une ligne par exécution)
+COLONNES = ("instance", "n", "methode", "p", "graine", "temps", "cout", "evaluations_cout",
+            "evaluations_delta", "borne", "ecart")
+
+
+# Valeurs de p testées par défaut : autour de √n, plus une petite et une grande valeur
+def valeursP(n):
+    racine = max(3, math.ceil(math.sqrt(n)))
+    return sorted({max(3, racine // 2), racine, min(n, 2 * racine)})
+
+
+# Une exécution d'une méthode pour une valeur de p et une graine
+def executer(probleme, methode, p, graine, modele_exact=None):
+    matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
+    random.seed(graine)
+    reinitialiserCompteurs()
+    borne = None
+
+    debut = time.perf_counter()
+    if methode == "heuristique":
+        cycle, stations = heuristique_rapide(probleme, p)
+    elif methode == "amelioration_locale":
+        cycle, stations, _ = heuristique_puis_amelioration(probleme, p)
+    else:
+        # Pas de coupure venant des autres valeurs de p : la borne obtenue est celle de ce p
+        cycle, stations, _, borne = modele_exact.resoudre(p, borne_sup=float("inf"))
+    temps = time.perf_counter() - debut
+    evaluations_cout, evaluations_delta = COMPTEURS["cout"], COMPTEURS["delta"]
+
+    return {
+        "temps": temps,
+        "cout": cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index),
+        "evaluations_cout": evaluations_cout,
+        "evaluations_delta": evaluations_delta,
+        "borne": borne,
+    }
+
+
+# Lance toutes les méthodes sur toutes les instances ; renvoie la liste des exécutions
+def lancer(fichiers, methodes, p_demandes, graines, temps_limite_exact, n_max_exacte):
+    resultats = []
+    for fichier in fichiers:
+        probleme = chargerInstance(fichier)
+        n = probleme.dimension
+        nom = os.path.basename(fichier)
+        # La matrice est construite avant les chronomètres : elle est commune à toutes les méthodes
+        obtenirMatriceDistances(probleme)
+        valeurs_p = [p for p in (p_demandes or valeursP(n)) if 3 <= p <= n]
+
+        modele_exact = None
+        if "exacte" in methodes and n <= n_max_exacte:
+            from exact import creerModeleExact
+            modele_exact = creerModeleExact(probleme, "coupes", temps_limite=temps_limite_exact)
+
+        for methode in methodes:
+            if methode == "exacte" and modele_exact is None:
+                continue
+            # La méthode exacte ne dépend de la graine que par sa solution de départ
+            graines_methode = graines[:1] if methode == "exacte" else graines
+            for p in valeurs_p:
+                for graine in graines_methode:
+                    mesure = executer(probleme, methode, p, graine, modele_exact)
+                    mesure.update(instance=nom, n=n, methode=methode, p=p, graine=graine)
+                    resultats.append(mesure)
+                    print(f"{nom:>16} {methode:>20} p={p:<4} graine={graine:<3} "
+                          f"temps={mesure['temps']:8.3f} s  coût={mesure['cout']:.2f}", flush=True)
+    calculerEcarts(resultats)
+    return resultats
+
+
+# Écart relatif de chaque coût à la meilleure borne exacte connue pour (instance, p)
+def calculerEcarts(resultats):
+    bornes = {}
+    for r in resultats:
+        if r["borne"] is not None:
+            cle = (r["instance"], r["p"])
+            bornes[cle] = max(bornes.get(cle, -math.inf), r["borne"])
+    for r in resultats:
+        borne = bornes.get((r["instance"], r["p"]))
+        r["ecart"] = (r["cout"] - borne) / borne if borne else None
+
+
+# Moyennes par (instance, méthode, p) sur les graines
+def resumer(resultats):
+    groupes = {}
+    for r in resultats:
+        groupes.setdefault((r["instance"], r["methode"], r["p"]), []).append(r)
+    resume = []
+    for (instance, methode, p), lignes in sorted(groupes.items()):
+        ecarts = [r["ecart"] for r in lignes if r["ecart"] is not None]
+        resume.append({
+            "instance": instance,
+            "methode": methode,
+            "p": p,
+            "executions": len(lignes),
+            "temps_moyen": float(np.mean([r["temps"] for r in lignes])),
+            "cout_moyen": float(np.mean([r["cout"] for r in lignes])),
+            "cout_min": float(min(r["cout"] for r in lignes)),
+            "evaluations_moyennes": float(np.mean([r["evaluations_cout"] + r["evaluations_delta"] for r in lignes])),
+            "ecart_moyen": float(np.mean(ecarts)) if ecarts else None,
+        })
+    return resume
+
+
+# Contexte de la mesure (machine, versions, commit) pour comparer ce qui est comparable
+def environnement():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processeur": platform.processor(),
+        "nombre_coeurs": os.cpu_count(),
+    }
+
+
+def ecrireResultats(dossier, parametres, resultats, resume):
+    os.makedirs(dossier, exist_ok=True)
+    with open(os.path.join(dossier, "resultats.json"), "w") as f:
+        json.dump({"environnement": environnement(), "parametres": parametres, "resume": resume,
+                   "executions": resultats}, f, indent=2)
+    with open(os.path.join(dossier, "resultats.csv"), "w", newline="") as f:
+        ecrivain = csv.DictWriter(f, fieldnames=COLONNES)
+        ecrivain.writeheader()
+        for r in resultats:
+            ecrivain.writerow({c: r[c] for c in COLONNES})
+
+
+# Régressions par rapport à la référence : temps ou coût moyens dégradés au-delà des seuils
+def comparer(resume, reference, seuil_temps, seuil_cout, temps_min):
+    references = {(r["instance"], r["methode"], r["p"]): r for r in reference["resume"]}
+    regressions = []
+    for r in resume:
+        ref = references.get((r["instance"], r["methode"], r["p"]))
+        if ref is None:
+            continue
+        cle = f"{r['instance']} {r['methode']} p={r['p']}"
+        # Les mesures trop courtes sont dominées par le bruit
+        if ref["temps_moyen"] >= temps_min and r["temps_moyen"] > ref["temps_moyen"] * (1 + seuil_temps):
+            regressions.append(f"{cle} : temps {r['temps_moyen']:.3f} s au lieu de {ref['temps_moyen']:.3f} s")
+        if r["cout_moyen"] > ref["cout_moyen"] * (1 + seuil_cout):
+            regressions.append(f"{cle} : coût {r['cout_moyen']:.2f} au lieu de {ref['cout_moyen']:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des méthodes sur les instances de data/")
+    parser.add_argument("instances", nargs="*", help="Fichiers .tsp (défaut : tous ceux de data/)")
+    parser.add_argument("--methodes", default=",".join(METHODES),
+                        help="Méthodes séparées par des virgules parmi " + ", ".join(METHODES))
+    parser.add_argument("--p", default=None, help="Valeurs de p séparées par des virgules (défaut : autour de √n)")
+    parser.add_argument("--graines", type=int, default=3, help="Nombre de graines par (méthode, p)")
+    parser.add_argument("--temps-limite-exacte", type=float, default=10.0,
+                        help="Temps limite de la méthode exacte pour chaque p (secondes)")
+    parser.add_argument("--n-max-exacte", type=int, default=200,
+                        help="Taille au-delà de laquelle la méthode exacte n'est pas lancée")
+    parser.add_argument("--sortie", default="benchmark", help="Dossier des résultats (JSON et CSV)")
+    parser.add_argument("--reference", default="benchmark/reference.json", help="Fichier de référence")
+    parser.add_argument("--enregistrer-reference", action="store_true",
+                        help="Enregistre les résultats comme nouvelle référence")
+    parser.add_argument("--comparer", action="store_true",
+                        help="Échoue si le temps ou le coût régresse par rapport à la référence")
+    parser.add_argument("--seuil-temps", type=float, default=0.5, help="Hausse de temps tolérée (0.5 = +50 %%)")
+    parser.add_argument("--seuil-cout", type=float, default=0.01, help="Hausse de coût tolérée (0.01 = +1 %%)")
+    parser.add_argument("--temps-min", type=float, default=0.05,
+                        help="Temps de référence en dessous duquel le temps n'est pas comparé (secondes)")
+    args = parser.parse_args()
+
+    methodes = args.methodes.split(",")
+    for methode in methodes:
+        if methode not in METHODES:
+            parser.error(f"méthode inconnue : {methode}")
+    fichiers = args.instances or sorted(glob.glob("data/*.tsp"))
+    p_demandes = [int(p) for p in args.p.split(",")] if args.p else None
+    graines = list(range(args.graines))
+
+    resultats = lancer(fichiers, methodes, p_demandes, graines, args.temps_limite_exacte, args.n_max_exacte)
+    resume = resumer(resultats)
+    parametres = {"instances": fichiers, "methodes": methodes, "p": p_demandes, "graines": graines,
+                  "temps_limite_exacte": args.temps_limite_exacte, "n_max_exacte": args.n_max_exacte}
+    ecrireResultats(args.sortie, parametres, resultats, resume)
+    print(f"\nRésultats écrits dans {args.sortie}/resultats.json et {args.sortie}/resultats.csv")
+
+    if args.enregistrer_reference:
+        os.makedirs(os.path.dirname(args.reference) or ".", exist_ok=True)
+        with open(args.reference, "w") as f:
+            json.dump({"environnement": environnement(), "parametres": parametres, "resume": resume}, f, indent=2)
+        print(f"Référence enregistrée : {args.reference}")
+
+    if args.comparer:
+        if not os.path.exists(args.reference):
+            print(f"Référence introuvable : {args.reference}")
+            sys.exit(2)
+        with open(args.reference) as f:
+            reference = json.load(f)
+        regressions = comparer(resume, reference, args.seuil_temps, args.seuil_cout, args.temps_min)
+        if regressions:
+            print(f"\n=== {len(regressions)} régression(s) ===")
+            for ligne in regressions:
+                print(f"  {ligne}")
+            sys.exit(1)
+        print("\nAucune régression par rapport à la référence")
+
+
+if __name__ == "__main__":
+    main()
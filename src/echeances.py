@@ -0,0 +1,43 @@
+import time
+
+
+class Echeance:
+    """
+    Date limite et/ou demande d'annulation d'une résolution.
+
+    Les méthodes qui la reçoivent la consultent entre deux mouvements (ou deux
+    valeurs de p) et s'arrêtent en renvoyant la meilleure solution déjà trouvée.
+    La date limite est une heure absolue (time.time()), valable dans les
+    processus du balayage parallèle ; l'événement d'annulation (threading.Event
+    ou tout objet ayant is_set()) reste dans le processus qui l'a créé.
+
+    Args:
+        temps_limite: Budget en secondes à partir de maintenant (None = sans limite)
+        arret: Événement dont is_set() demande l'arrêt (None = pas d'annulation)
+    """
+
+    def __init__(self, temps_limite=None, arret=None):
+        self.fin = None if temps_limite is None else time.time() + temps_limite
+        self.arret = arret
+
+    def depassee(self):
+        if self.arret is not None and self.arret.is_set():
+            return True
+        return self.fin is not None and time.time() >= self.fin
+
+    def restant(self):
+        """Secondes restantes (None = sans limite, 0 si l'échéance est passée)."""
+        if self.arret is not None and self.arret.is_set():
+            return 0.0
+        return None if self.fin is None else max(0.0, self.fin - time.time())
+
+    def __getstate__(self):
+        # Un événement de threading ne se transmet pas aux processus : seule la date limite les suit
+        etat = self.__dict__.copy()
+        etat["arret"] = None
+        return etat
+
+
+# Vrai si l'échéance (éventuellement absente) est passée
+def echeanceDepassee(echeance):
+    return echeance is not None and echeance.depassee()
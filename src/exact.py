@@ -0,0 +1,857 @@
+import contextlib
+import functools
+import math
+import os
+import tempfile
+import time
+
+import networkx as nx
+import numpy as np
+import pulp
+from scipy import sparse
+from scipy.optimize import milp, Bounds, LinearConstraint
+
+from echeances import Echeance, echeanceDepassee
+from instance import (
+    NOMBRE_MIN_STATIONS,
+    _listes_depart,
+    ajuster_nombre_stations,
+    amelioration_locale_optimisee,
+    cout_solution,
+    heuristique_puis_amelioration,
+    obtenirMatriceDistances,
+    optimiserNombreStations,
+)
+from instrumentation import chronometre, chronometrer
+
+
+# =========================
+# Brique D : méthode exacte (PLNE)
+# =========================
+def reconstruire_cycle_depuis_arcs(edges_metro, stations):
+    succ = {s: None for s in stations}
+    for (i, j) in edges_metro:
+        if i in succ:
+            succ[i] = j
+
+    if not stations:
+        return []
+
+    start = stations[0]
+    cycle = [start]
+    courant = start
+    while True:
+        suivant = succ.get(courant)
+        if suivant is None or suivant == start:
+            break
+        cycle.append(suivant)
+        courant = suivant
+
+    return cycle
+
+
+def reconstruire_cycle_depuis_aretes(aretes, stations):
+    # Parcours de l'anneau à partir de ses arêtes non orientées
+    voisins = {s: [] for s in stations}
+    for (i, j) in aretes:
+        voisins[i].append(j)
+        voisins[j].append(i)
+
+    if not stations:
+        return []
+
+    start = stations[0]
+    cycle = [start]
+    precedent = None
+    courant = start
+    while True:
+        suivants = [v for v in voisins[courant] if v != precedent]
+        if not suivants or suivants[0] == start:
+            break
+        precedent, courant = courant, suivants[0]
+        cycle.append(courant)
+
+    return cycle
+
+
+def separer_coupes_connexite(valeurs_x, valeurs_z, noeuds, epsilon=1e-6):
+    """
+    Cherche des contraintes de connexité de l'anneau violées par une solution (fractionnaire).
+
+    Pour S contenant la station i mais pas la station k, l'anneau doit traverser
+    la frontière de S au moins deux fois : x(δ(S)) >= 2 (z_i + z_k - 1). On fixe i
+    à la station la plus "ouverte" et on calcule, pour chaque autre station k,
+    une coupe minimale i-k (max-flow) dans le graphe de capacités x.
+
+    Returns:
+        Liste de (S, i, k) violées, S étant l'ensemble des noeuds du côté de i
+    """
+    graphe = nx.Graph()
+    graphe.add_nodes_from(noeuds)
+    for (i, j), v in valeurs_x.items():
+        if v > epsilon:
+            graphe.add_edge(i, j, capacity=v)
+
+    racine = max(noeuds, key=lambda v: valeurs_z[v])
+    coupes = []
+    deja_vus = set()
+    for k in noeuds:
+        if k == racine:
+            continue
+        second_membre = 2 * (valeurs_z[racine] + valeurs_z[k] - 1)
+        if second_membre <= epsilon:
+            continue
+        valeur, (cote_racine, _) = nx.minimum_cut(graphe, racine, k)
+        if valeur < second_membre - epsilon:
+            cote_racine = frozenset(cote_racine)
+            if cote_racine not in deja_vus:
+                deja_vus.add(cote_racine)
+                coupes.append((cote_racine, racine, k))
+    return coupes
+
+
+# Lecture de la meilleure borne inférieure dans le journal de CBC
+def _lire_borne_cbc(chemin_log):
+    borne = None
+    optimal = False
+    objectif = None
+    try:
+        with open(chemin_log) as f:
+            for ligne in f:
+                if ligne.startswith("Result - Optimal solution found"):
+                    optimal = True
+                elif ligne.startswith("Objective value:"):
+                    objectif = float(ligne.split(":")[1])
+                elif ligne.startswith("Lower bound:"):
+                    borne = float(ligne.split(":")[1])
+                elif "best possible" in ligne and borne is None:
+                    try:
+                        borne_noeud = float(ligne.split("best possible")[1].split()[0].rstrip(","))
+                    except (IndexError, ValueError):
+                        continue
+                    borne = borne_noeud
+    except OSError:
+        return None
+    if optimal and objectif is not None:
+        return objectif
+    return borne
+
+
+# Solution de départ d'une résolution exacte (fournie, ou heuristique + amélioration locale)
+def _solution_de_depart(probleme, p, depart, echeance=None):
+    matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
+    if depart is None and p is None:
+        budget = None if echeance is None else echeance.restant()
+        arret = None if echeance is None else echeance.arret
+        depart = amelioration_locale_optimisee(probleme, strategie="section_doree", verbeux=False, budget=budget,
+                                               arret=arret)[1:3]
+    elif depart is None:
+        depart = heuristique_puis_amelioration(probleme, p, echeance=echeance)[:2]
+    cycle, stations = _listes_depart(depart, index_to_node)
+    if p is not None and len(stations) != p:
+        cycle, stations = ajuster_nombre_stations(probleme, cycle, stations, p)
+    cout = cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index)
+    return list(cycle), list(stations), cout
+
+
+# Temps minimal laissé au solveur : en dessous, un appel ne donnerait rien de mieux que le départ
+TEMPS_MIN_SOLVEUR = 1.0
+
+
+# Fin d'une résolution (horloge time.perf_counter) : la plus proche du temps limite et de l'échéance
+def _fin_resolution(temps_limite, echeance):
+    fin = None if temps_limite is None else time.perf_counter() + temps_limite
+    restant = None if echeance is None else echeance.restant()
+    if restant is not None:
+        fin = time.perf_counter() + restant if fin is None else min(fin, time.perf_counter() + restant)
+    return fin
+
+
+# Vrai si la fin de la résolution est passée ou si l'annulation est demandée
+def _temps_ecoule(fin, echeance):
+    return fin is not None and time.perf_counter() >= fin or echeanceDepassee(echeance)
+
+
+# Temps accordé au prochain appel du solveur (None = sans limite), 0 si la fin est passée
+def _temps_restant(fin):
+    return None if fin is None else max(0.0, fin - time.perf_counter())
+
+
+# Faux si l'annulation est demandée ou si la fin est trop proche pour un nouvel appel au solveur
+def _temps_pour_solveur(fin, echeance):
+    restant = _temps_restant(fin)
+    return not echeanceDepassee(echeance) and (restant is None or restant >= TEMPS_MIN_SOLVEUR)
+
+
+class _ModeleExactBase:
+    """
+    Boucle de résolution commune aux modèles exacts : solution de départ, coupes
+    de connexité sur la relaxation continue, résolutions entières successives avec
+    séparation des sous-tours, temps limite et échéance, bornes par valeur de p.
+
+    Chaque backend construit son modèle (_construire) et fournit les appels au
+    solveur : _fixer_nombre_stations, _resoudre_lp puis _valeurs (relaxation),
+    _resoudre_mip puis _extraire (solution entière) et _ajouter_coupe.
+    """
+
+    def __init__(self, probleme, formulation="mtz", temps_limite=None, gap=None, threads=None):
+        if formulation not in ("mtz", "coupes"):
+            raise ValueError(f"Formulation inconnue : {formulation}")
+        self.probleme = probleme
+        self.formulation = formulation
+        self.temps_limite = temps_limite
+        self.gap = gap
+        self.threads = threads
+        self.meilleur_cout = float('inf')
+        # Borne inférieure obtenue pour chaque valeur de p résolue (clé None : p variable)
+        self.bornes = {}
+        # Coupes de connexité (S, i, k) ajoutées au modèle, valables pour toutes les valeurs de p
+        self.coupes_connexite = []
+        self._cles_coupes = set()
+        self._construire(*obtenirMatriceDistances(probleme))
+
+    # Ajoute au modèle les coupes qu'il n'a pas encore
+    def ajouter_coupes(self, coupes):
+        for S, i, k in coupes:
+            if (S, i, k) not in self._cles_coupes:
+                self._cles_coupes.add((S, i, k))
+                self.coupes_connexite.append((S, i, k))
+                self._ajouter_coupe(S, i, k)
+
+    def etat_partage(self):
+        """
+        Ce qu'une résolution apprend et qui sert aux suivantes : meilleur coût (coupure),
+        coupes de connexité et bornes par p. Le balayage parallèle de
+        optimiserNombreStations le transmet aux copies du modèle des autres processus.
+        """
+        return self.meilleur_cout, list(self.coupes_connexite), dict(self.bornes)
+
+    def fusionner_etat(self, etat):
+        meilleur_cout, coupes, bornes = etat
+        self.meilleur_cout = min(self.meilleur_cout, meilleur_cout)
+        self.ajouter_coupes(coupes)
+        self.bornes.update(bornes)
+
+    # Appels au solveur encadrés par le backend (fichier journal de CBC...)
+    def _session(self):
+        return contextlib.nullcontext()
+
+    def resoudre(self, p, depart=None, borne_sup=None, temps_limite=None, max_tours_lp=50, max_tours_mip=200,
+                 echeance=None, progression=None):
+        """
+        Résout le modèle pour p stations.
+
+        Args:
+            p: Nombre de stations, ou None pour laisser le solveur le choisir (p >= 3)
+            depart: Solution (cycle, stations) fournie comme MIP start ; par défaut
+                heuristique rapide suivie de l'amélioration locale (avec recherche
+                de p par section dorée si p est None)
+            borne_sup: Coupure (cutoff) ; par défaut le meilleur coût déjà trouvé par ce modèle
+            temps_limite: Temps limite en secondes (par défaut celui du modèle), coupes
+                de la relaxation comprises
+            echeance: Echeance (date limite et/ou annulation). Chaque appel au solveur
+                reçoit au plus le temps restant avant la première des deux fins, et aucun
+                appel MIP n'est lancé à moins de TEMPS_MIN_SOLVEUR de celle-ci : la
+                meilleure solution connue est alors renvoyée
+            progression: Fonction appelée avec (p, cycle, stations, cout) pour la solution
+                de départ puis pour chaque solution meilleure trouvée par le solveur
+
+        Returns:
+            (cycle, stations, cout, borne) où borne est la meilleure borne inférieure
+            connue pour ce p (None si le solveur n'en a pas donné). Si le solveur ne
+            trouve rien de mieux sous la coupure, la solution de départ est renvoyée.
+        """
+        matrice, index_to_node, node_to_index = obtenirMatriceDistances(self.probleme)
+        if temps_limite is None:
+            temps_limite = self.temps_limite
+        cycle_depart, stations_depart, cout_depart = _solution_de_depart(self.probleme, p, depart, echeance)
+        if progression is not None:
+            progression(len(stations_depart), cycle_depart, stations_depart, cout_depart)
+        if borne_sup is None:
+            borne_sup = self.meilleur_cout
+
+        self._fixer_nombre_stations(p)
+        anneau_connexe = self.formulation == "coupes" and (p is None or p >= 3)
+        fin = _fin_resolution(temps_limite, echeance)
+        borne = None
+        with self._session():
+            if anneau_connexe:
+                # Coupes de connexité sur la relaxation continue
+                for _ in range(max_tours_lp):
+                    if _temps_ecoule(fin, echeance) or not self._resoudre_lp(_temps_restant(fin)):
+                        break
+                    valeurs_x, valeurs_z = self._valeurs()
+                    coupes = separer_coupes_connexite(valeurs_x, valeurs_z, list(valeurs_z))
+                    if not coupes:
+                        break
+                    self.ajouter_coupes(coupes)
+
+            for _ in range(max_tours_mip):
+                if not _temps_pour_solveur(fin, echeance):
+                    break
+                # Chaque nouvel appel ne reçoit que le temps qui reste avant la fin
+                trouvee, borne_mip, sous_coupure = self._resoudre_mip(cycle_depart, stations_depart, borne_sup,
+                                                                       _temps_restant(fin))
+                if borne_mip is not None:
+                    borne = borne_mip
+                if sous_coupure and math.isfinite(borne_sup):
+                    # Rien sous la coupure : l'optimum pour ce p vaut au moins borne_sup
+                    borne = borne_sup if borne is None or not math.isfinite(borne) else max(borne, borne_sup)
+                if not trouvee:
+                    break
+                sommets, liens, stations, cycle = self._extraire()
+                if anneau_connexe:
+                    graphe = nx.Graph()
+                    graphe.add_nodes_from(sommets)
+                    graphe.add_edges_from(liens)
+                    composantes = [frozenset(c) for c in nx.connected_components(graphe)]
+                    if len(composantes) > 1:
+                        # Sous-tours : chaque composante doit être reliée au reste des stations
+                        self.ajouter_coupes([(S, next(iter(S)), next(v for v in sommets if v not in S))
+                                             for S in composantes])
+                        if _temps_ecoule(fin, echeance):
+                            break
+                        continue
+                if stations and len(cycle) == len(stations):
+                    cout = cout_solution(self.probleme, cycle, stations, matrice, index_to_node, node_to_index)
+                    if cout < cout_depart:
+                        cycle_depart, stations_depart, cout_depart = cycle, stations, cout
+                        if progression is not None:
+                            progression(len(stations), cycle, stations, cout)
+                break
+
+        if borne is not None and math.isfinite(borne):
+            borne = min(float(borne), cout_depart)
+        else:
+            borne = None
+        self.bornes[p] = borne
+        self.meilleur_cout = min(self.meilleur_cout, cout_depart)
+        return cycle_depart, stations_depart, cout_depart, borne
+
+    def __call__(self, probleme, p, depart=None, echeance=None):
+        # Utilisable directement comme methode_resolution de optimiserNombreStations
+        cycle, stations, cout, _ = self.resoudre(p, depart=depart, echeance=echeance)
+        return cycle, stations, cout
+
+
+class ModeleExact(_ModeleExactBase):
+    """
+    Modèle PLNE anneau-étoiles construit une seule fois pour une instance.
+
+    D'une valeur de p à l'autre, seul le second membre de la contrainte
+    "nombre de stations = p" change. Avec p=None, cette contrainte devient
+    "au moins 3 stations" et le nombre de stations est choisi par le solveur. Chaque résolution part d'une solution
+    heuristique (MIP start) et reçoit comme borne de coupure (cutoff) le meilleur
+    coût déjà trouvé, toutes valeurs de p confondues.
+
+    Formulations :
+        "mtz": arcs orientés. Une variable r désigne la station de départ de
+            l'anneau, seule station dont les arcs entrants échappent aux
+            contraintes MTZ, qui ne dépendent donc pas de p.
+        "coupes": arêtes non orientées. Les contraintes de connexité sont ajoutées
+            à la demande (coupes min-cut sur la relaxation continue, puis coupes
+            de sous-tours sur les solutions entières). Les coupes trouvées pour
+            une valeur de p restent valables pour les suivantes.
+    """
+
+    def _construire(self, matrice, index_to_node, node_to_index):
+        self.noeuds = list(index_to_node.values())
+        self.model = pulp.LpProblem("RingStar", pulp.LpMinimize)
+        if self.formulation == "mtz":
+            self._construire_mtz(matrice, node_to_index)
+        else:
+            self._construire_coupes(matrice, node_to_index)
+
+    @chronometrer("construction_modele")
+    def _construire_mtz(self, matrice, node_to_index):
+        noeuds = self.noeuds
+        n = len(noeuds)
+        model = self.model
+
+        # Variables
+        x = pulp.LpVariable.dicts("x", (noeuds, noeuds), 0, 1, cat="Binary")  # arêtes orientées de l'anneau
+        z = pulp.LpVariable.dicts("z", noeuds, 0, 1, cat="Binary")  # station ou non
+        y = pulp.LpVariable.dicts("y", (noeuds, noeuds), 0, 1, cat="Binary")  # affectation client -> station
+        u = pulp.LpVariable.dicts("u", noeuds, lowBound=0, upBound=n, cat="Continuous")  # MTZ
+        r = pulp.LpVariable.dicts("r", noeuds, 0, 1, cat="Binary")  # station de départ de l'anneau
+
+        # Objectif : coût anneau + coût étoiles
+        cout_anneau = pulp.lpSum(
+            matrice[node_to_index[i]][node_to_index[j]] * x[i][j] for i in noeuds for j in noeuds if i != j
+        )
+        cout_etoiles = pulp.lpSum(
+            matrice[node_to_index[i]][node_to_index[j]] * y[i][j] for i in noeuds for j in noeuds
+        )
+        model += cout_anneau + cout_etoiles
+
+        # 1) nombre de stations = p (second membre mis à jour à chaque résolution)
+        model.addConstraint(pulp.lpSum(z[i] for i in noeuds) == 0, "nb_stations")
+
+        # 2) affectation unique de chaque noeud à une station
+        for i in noeuds:
+            model += pulp.lpSum(y[i][j] for j in noeuds) == 1
+
+        # 3) affectation seulement si j est station
+        for i in noeuds:
+            for j in noeuds:
+                model += y[i][j] <= z[j]
+
+        # 4) contraintes d'anneau : degré entrant = 1 et sortant = 1 pour les stations, 0 sinon
+        for i in noeuds:
+            model += pulp.lpSum(x[i][j] for j in noeuds if i != j) == z[i]
+            model += pulp.lpSum(x[j][i] for j in noeuds if i != j) == z[i]
+
+        # 5) l'arête ne peut exister que si les deux sont stations
+        for i in noeuds:
+            for j in noeuds:
+                if i == j:
+                    model += x[i][j] == 0
+                else:
+                    model += x[i][j] <= z[i]
+                    model += x[i][j] <= z[j]
+
+        # 6) élimination des sous-tours (MTZ) sur les stations
+        #    Une seule station de départ r, qui doit être une station
+        model += pulp.lpSum(r[i] for i in noeuds) == 1
+        for i in noeuds:
+            model += r[i] <= z[i]
+            model += u[i] <= n * z[i]
+            model += u[i] >= z[i]  # u[i] >= 1 si z[i] = 1, sinon u[i] >= 0
+
+        # Contrainte MTZ : u[i] - u[j] + M*x[i][j] <= M - 1 + M*r[j], avec M = n + 1
+        # Si x[i][j] = 1 et que j n'est pas la station de départ, alors u[j] >= u[i] + 1 :
+        # l'ordre croît le long de l'anneau et seul le retour à la station de départ y échappe
+        M = n + 1
+        for i in noeuds:
+            for j in noeuds:
+                if i != j:
+                    model += u[i] - u[j] + M * x[i][j] <= M - 1 + M * r[j]
+
+        self.variables = {"x": x, "y": y, "z": z, "u": u, "r": r}
+
+    @chronometrer("construction_modele")
+    def _construire_coupes(self, matrice, node_to_index):
+        # Formulation non orientée : x[e] arêtes de l'anneau, y[i, j] affectation, z[i] station
+        noeuds = self.noeuds
+        model = self.model
+        aretes = [(i, j) for a, i in enumerate(noeuds) for j in noeuds[a + 1:]]
+
+        def d(i, j):
+            return float(matrice[node_to_index[i]][node_to_index[j]])
+
+        x = {e: pulp.LpVariable(f"x_{e[0]}_{e[1]}", 0, 1, cat="Binary") for e in aretes}
+        y = {(i, j): pulp.LpVariable(f"y_{i}_{j}", 0, 1, cat="Binary") for i in noeuds for j in noeuds if i != j}
+        z = pulp.LpVariable.dicts("z", noeuds, 0, 1, cat="Binary")
+        incidentes = {i: [] for i in noeuds}
+        for e in aretes:
+            incidentes[e[0]].append(x[e])
+            incidentes[e[1]].append(x[e])
+
+        # Objectif : coût anneau + coût étoiles
+        model += pulp.lpSum(d(*e) * x[e] for e in aretes) + pulp.lpSum(d(i, j) * y[i, j] for (i, j) in y)
+
+        # 1) nombre de stations = p (second membre mis à jour à chaque résolution)
+        model.addConstraint(pulp.lpSum(z[i] for i in noeuds) == 0, "nb_stations")
+        for i in noeuds:
+            # 2) chaque noeud est une station ou est affecté à une station
+            model += z[i] + pulp.lpSum(y[i, j] for j in noeuds if j != i) == 1
+            # 3) degré 2 dans l'anneau pour les stations, 0 sinon
+            model += pulp.lpSum(incidentes[i]) == 2 * z[i]
+        for (i, j) in y:
+            model += y[i, j] <= z[j]
+        for (i, j) in aretes:
+            model += x[i, j] <= z[i]
+            model += x[i, j] <= z[j]
+
+        self.aretes = aretes
+        self.variables = {"x": x, "y": y, "z": z}
+
+    def _ajouter_coupe(self, S, i, k):
+        # L'anneau traverse au moins deux fois la frontière de S si i est dans S et k hors de S
+        x = self.variables["x"]
+        z = self.variables["z"]
+        self.model.addConstraint(
+            pulp.lpSum(x[e] for e in self.aretes if (e[0] in S) != (e[1] in S)) >= 2 * (z[i] + z[k] - 1)
+        )
+
+    def _fixer_depart(self, cycle, stations):
+        # Valeurs initiales de toutes les variables à partir d'une solution (MIP start)
+        matrice, _, node_to_index = obtenirMatriceDistances(self.probleme)
+        for v in self.model.variables():
+            v.setInitialValue(0)
+        x, y, z = self.variables["x"], self.variables["y"], self.variables["z"]
+        idx_stations = [node_to_index[s] for s in stations]
+        ensemble_stations = set(stations)
+        for s in stations:
+            z[s].setInitialValue(1)
+        for i in self.noeuds:
+            if i in ensemble_stations:
+                if self.formulation == "mtz":
+                    y[i][i].setInitialValue(1)
+                continue
+            ligne = np.asarray(matrice[node_to_index[i]])[idx_stations]
+            j = stations[int(np.argmin(ligne))]
+            if self.formulation == "mtz":
+                y[i][j].setInitialValue(1)
+            else:
+                y[i, j].setInitialValue(1)
+        p = len(cycle)
+        for k in range(p):
+            a, b = cycle[k], cycle[(k + 1) % p]
+            if self.formulation == "mtz":
+                x[a][b].setInitialValue(1)
+                self.variables["u"][a].setInitialValue(k + 1)
+            else:
+                x[(a, b) if (a, b) in x else (b, a)].setInitialValue(1)
+        if self.formulation == "mtz":
+            self.variables["r"][cycle[0]].setInitialValue(1)
+
+    def _solveur(self, depart, borne_sup, temps_limite, chemin_log, mip=True):
+        options = []
+        if borne_sup is not None and math.isfinite(borne_sup):
+            options.append(f"cutoff {borne_sup}")
+        return pulp.PULP_CBC_CMD(
+            msg=False, mip=mip, warmStart=depart and mip, timeLimit=temps_limite, gapRel=self.gap,
+            threads=self.threads, options=options, logPath=chemin_log,
+        )
+
+    def _extraire(self):
+        # (stations et liens dans les numéros du modèle, stations, anneau) de la solution courante
+        z = self.variables["z"]
+        x = self.variables["x"]
+        stations = [i for i in self.noeuds if z[i].value() is not None and z[i].value() > 0.5]
+        if self.formulation == "mtz":
+            arcs = [(i, j) for i in self.noeuds for j in self.noeuds
+                    if i != j and x[i][j].value() is not None and x[i][j].value() > 0.5]
+            return stations, arcs, stations, reconstruire_cycle_depuis_arcs(arcs, stations)
+        aretes = [e for e in self.aretes if x[e].value() is not None and x[e].value() > 0.5]
+        return stations, aretes, stations, reconstruire_cycle_depuis_aretes(aretes, stations)
+
+    # Journal de CBC, relu pour la borne inférieure après chaque résolution entière
+    @contextlib.contextmanager
+    def _session(self):
+        fd, self.chemin_log = tempfile.mkstemp(suffix=".log")
+        os.close(fd)
+        try:
+            yield
+        finally:
+            os.remove(self.chemin_log)
+
+    def _fixer_nombre_stations(self, p):
+        contrainte_p = self.model.constraints["nb_stations"]
+        if p is None:
+            contrainte_p.sense = pulp.LpConstraintGE
+            contrainte_p.constant = -NOMBRE_MIN_STATIONS
+        else:
+            contrainte_p.sense = pulp.LpConstraintEQ
+            contrainte_p.constant = -p
+
+    def _resoudre_lp(self, temps_limite):
+        with chronometre("resolution_solveur"):
+            self.model.solve(self._solveur(False, None, temps_limite, self.chemin_log, mip=False))
+        return self.model.status == pulp.LpStatusOptimal
+
+    def _valeurs(self):
+        valeurs_x = {e: self.variables["x"][e].value() or 0.0 for e in self.aretes}
+        valeurs_z = {i: self.variables["z"][i].value() or 0.0 for i in self.noeuds}
+        return valeurs_x, valeurs_z
+
+    def _resoudre_mip(self, cycle, stations, borne_sup, temps_limite):
+        # Renvoie (solution entière trouvée, borne inférieure, rien sous la coupure)
+        self._fixer_depart(cycle, stations)
+        try:
+            with chronometre("resolution_solveur"):
+                self.model.solve(self._solveur(True, borne_sup, temps_limite, self.chemin_log))
+        except pulp.PulpSolverError:
+            # CBC peut s'arrêter brutalement (segfault) quand la limite de temps tombe
+            # pendant la lecture de la solution de départ : on garde la meilleure connue
+            if temps_limite is None:
+                raise
+            return False, None, False
+        trouvee = self.model.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible)
+        sous_coupure = not trouvee and self.model.status == pulp.LpStatusInfeasible
+        return trouvee, _lire_borne_cbc(self.chemin_log), sous_coupure
+
+
+class ModeleExactHighs(_ModeleExactBase):
+    """
+    Même modèle que ModeleExact, assemblé directement en matrices creuses et
+    résolu en mémoire par scipy.optimize.milp (HiGHS), sans PuLP ni fichier LP.
+
+    scipy.optimize.milp n'accepte ni MIP start ni nombre de threads : la solution
+    de départ sert seulement de solution de repli, la coupure est ajoutée comme
+    contrainte "objectif <= borne" et threads est ignoré.
+    """
+
+    def _construire(self, matrice, index_to_node, node_to_index):
+        self.index_to_node = index_to_node
+        distances = np.asarray(matrice, dtype=np.float64)
+        n = distances.shape[0]
+        self.n = n
+        # Couples orientés (i, j), i != j, pour les affectations (et les arcs en MTZ)
+        self.I, self.J = np.nonzero(~np.eye(n, dtype=bool))
+        # Coupes de connexité déjà trouvées (formulation "coupes")
+        self.coupes = []
+
+        blocs = []
+        if self.formulation == "mtz":
+            self._construire_mtz(distances, blocs)
+        else:
+            self._construire_coupes(distances, blocs)
+
+        lignes = np.concatenate([b[0] for b in blocs])
+        colonnes = np.concatenate([b[1] for b in blocs])
+        valeurs = np.concatenate([b[2] for b in blocs]).astype(np.float64)
+        self.A = sparse.csr_array((valeurs, (lignes, colonnes)), shape=(self.n_lignes, self.n_variables))
+        self.lb = np.concatenate(self._lb)
+        self.ub = np.concatenate(self._ub)
+
+    def _ajouter_lignes(self, blocs, nombre, entrees, lb, ub):
+        # entrees : liste de (lignes locales, colonnes, coefficients) pour un groupe de contraintes
+        debut = self.n_lignes
+        for lignes, colonnes, coefs in entrees:
+            lignes = np.asarray(lignes)
+            blocs.append((debut + lignes, np.asarray(colonnes), np.broadcast_to(coefs, lignes.shape)))
+        self._lb.append(np.broadcast_to(np.asarray(lb, dtype=np.float64), (nombre,)))
+        self._ub.append(np.broadcast_to(np.asarray(ub, dtype=np.float64), (nombre,)))
+        self.n_lignes += nombre
+
+    @chronometrer("construction_modele")
+    def _construire_mtz(self, distances, blocs):
+        n, I, J = self.n, self.I, self.J
+        K = len(I)
+        ox, oy, oz, ou, orr = 0, K, 2 * K, 2 * K + n, 2 * K + 2 * n
+        self.ox, self.oy, self.oz = ox, oy, oz
+        self.n_variables = 2 * K + 3 * n
+        self.c = np.concatenate([distances[I, J], distances[I, J], np.zeros(3 * n)])
+        self.integralite = np.ones(self.n_variables)
+        self.integralite[ou:ou + n] = 0
+        self.bornes_variables = (np.zeros(self.n_variables), np.ones(self.n_variables))
+        self.bornes_variables[1][ou:ou + n] = n
+        self.n_lignes, self._lb, self._ub = 0, [], []
+        noeuds = np.arange(n)
+        paires = np.arange(K)
+        M = n + 1
+
+        # 1) nombre de stations (bornes mises à jour à chaque résolution)
+        self._ajouter_lignes(blocs, 1, [(np.zeros(n, dtype=int), oz + noeuds, 1)], 0, 0)
+        # 2) chaque noeud est une station ou est affecté à une station
+        self._ajouter_lignes(blocs, n, [(noeuds, oz + noeuds, 1), (I, oy + paires, 1)], 1, 1)
+        # 3) affectation seulement si j est station
+        self._ajouter_lignes(blocs, K, [(paires, oy + paires, 1), (paires, oz + J, -1)], -np.inf, 0)
+        # 4) degrés sortant et entrant = z
+        self._ajouter_lignes(blocs, n, [(I, ox + paires, 1), (noeuds, oz + noeuds, -1)], 0, 0)
+        self._ajouter_lignes(blocs, n, [(J, ox + paires, 1), (noeuds, oz + noeuds, -1)], 0, 0)
+        # 5) l'arc ne peut exister que si les deux extrémités sont stations
+        self._ajouter_lignes(blocs, K, [(paires, ox + paires, 1), (paires, oz + I, -1)], -np.inf, 0)
+        self._ajouter_lignes(blocs, K, [(paires, ox + paires, 1), (paires, oz + J, -1)], -np.inf, 0)
+        # 6) station de départ unique, u dans [z, n z]
+        self._ajouter_lignes(blocs, 1, [(np.zeros(n, dtype=int), orr + noeuds, 1)], 1, 1)
+        self._ajouter_lignes(blocs, n, [(noeuds, orr + noeuds, 1), (noeuds, oz + noeuds, -1)], -np.inf, 0)
+        self._ajouter_lignes(blocs, n, [(noeuds, ou + noeuds, 1), (noeuds, oz + noeuds, -n)], -np.inf, 0)
+        self._ajouter_lignes(blocs, n, [(noeuds, ou + noeuds, 1), (noeuds, oz + noeuds, -1)], 0, np.inf)
+        # 7) MTZ : u[i] - u[j] + M x[i][j] - M r[j] <= M - 1
+        self._ajouter_lignes(blocs, K, [
+            (paires, ou + I, 1), (paires, ou + J, -1), (paires, ox + paires, M), (paires, orr + J, -M),
+        ], -np.inf, M - 1)
+
+    @chronometrer("construction_modele")
+    def _construire_coupes(self, distances, blocs):
+        n, I, J = self.n, self.I, self.J
+        K = len(I)
+        self.a, self.b = np.triu_indices(n, 1)
+        m = len(self.a)
+        ox, oy, oz = 0, m, m + K
+        self.ox, self.oy, self.oz = ox, oy, oz
+        self.n_variables = m + K + n
+        self.c = np.concatenate([distances[self.a, self.b], distances[I, J], np.zeros(n)])
+        self.integralite = np.ones(self.n_variables)
+        self.bornes_variables = (np.zeros(self.n_variables), np.ones(self.n_variables))
+        self.n_lignes, self._lb, self._ub = 0, [], []
+        noeuds = np.arange(n)
+        paires = np.arange(K)
+        aretes = np.arange(m)
+
+        # 1) nombre de stations (bornes mises à jour à chaque résolution)
+        self._ajouter_lignes(blocs, 1, [(np.zeros(n, dtype=int), oz + noeuds, 1)], 0, 0)
+        # 2) chaque noeud est une station ou est affecté à une station
+        self._ajouter_lignes(blocs, n, [(noeuds, oz + noeuds, 1), (I, oy + paires, 1)], 1, 1)
+        # 3) degré 2 dans l'anneau pour les stations, 0 sinon
+        self._ajouter_lignes(blocs, n, [
+            (self.a, ox + aretes, 1), (self.b, ox + aretes, 1), (noeuds, oz + noeuds, -2),
+        ], 0, 0)
+        # 4) affectation seulement si j est station
+        self._ajouter_lignes(blocs, K, [(paires, oy + paires, 1), (paires, oz + J, -1)], -np.inf, 0)
+        # 5) l'arête ne peut exister que si les deux extrémités sont stations
+        self._ajouter_lignes(blocs, m, [(aretes, ox + aretes, 1), (aretes, oz + self.a, -1)], -np.inf, 0)
+        self._ajouter_lignes(blocs, m, [(aretes, ox + aretes, 1), (aretes, oz + self.b, -1)], -np.inf, 0)
+
+    def _ajouter_coupe(self, S, i, k):
+        # x(δ(S)) - 2 z_i - 2 z_k >= -2
+        dans_S = np.zeros(self.n, dtype=bool)
+        dans_S[list(S)] = True
+        traversees = np.flatnonzero(dans_S[self.a] != dans_S[self.b])
+        colonnes = np.concatenate([self.ox + traversees, [self.oz + i, self.oz + k]])
+        coefs = np.concatenate([np.ones(len(traversees)), [-2.0, -2.0]])
+        self.coupes.append((colonnes, coefs))
+
+    def _resoudre_milp(self, p, borne_sup, temps_limite, relaxation=False):
+        lb = self.lb.copy()
+        ub = self.ub.copy()
+        # Ligne 0 : nombre de stations
+        if p is None:
+            lb[0], ub[0] = NOMBRE_MIN_STATIONS, np.inf
+        else:
+            lb[0], ub[0] = p, p
+        matrices = [self.A]
+        if self.coupes:
+            lignes = np.concatenate([np.full(len(c), k) for k, (c, _) in enumerate(self.coupes)])
+            colonnes = np.concatenate([c for c, _ in self.coupes])
+            coefs = np.concatenate([v for _, v in self.coupes])
+            matrices.append(sparse.csr_array((coefs, (lignes, colonnes)), shape=(len(self.coupes), self.n_variables)))
+            lb = np.concatenate([lb, np.full(len(self.coupes), -2.0)])
+            ub = np.concatenate([ub, np.full(len(self.coupes), np.inf)])
+        if borne_sup is not None and math.isfinite(borne_sup):
+            # Coupure exprimée comme une contrainte sur l'objectif
+            matrices.append(sparse.csr_array(self.c.reshape(1, -1)))
+            lb = np.concatenate([lb, [-np.inf]])
+            ub = np.concatenate([ub, [borne_sup]])
+        options = {"disp": False}
+        if temps_limite is not None:
+            options["time_limit"] = temps_limite
+        if self.gap is not None:
+            options["mip_rel_gap"] = self.gap
+        contraintes = LinearConstraint(sparse.vstack(matrices, format="csr"), lb, ub)
+        with chronometre("resolution_solveur"):
+            return milp(
+                self.c,
+                integrality=np.zeros(self.n_variables) if relaxation else self.integralite,
+                bounds=Bounds(*self.bornes_variables),
+                constraints=contraintes,
+                options=options,
+            )
+
+    def _fixer_nombre_stations(self, p):
+        # Appliqué à la ligne 0 par _resoudre_milp
+        self.p = p
+
+    def _resoudre_lp(self, temps_limite):
+        self.res = self._resoudre_milp(self.p, None, temps_limite, relaxation=True)
+        return self.res.x is not None
+
+    def _valeurs(self):
+        x = self.res.x[self.ox:self.oy]
+        z = self.res.x[self.oz:self.oz + self.n]
+        return {(self.a[e], self.b[e]): x[e] for e in np.flatnonzero(x > 1e-6)}, dict(enumerate(z))
+
+    def _resoudre_mip(self, cycle, stations, borne_sup, temps_limite):
+        # Renvoie (solution entière trouvée, borne inférieure, rien sous la coupure) ;
+        # pas de MIP start avec scipy.optimize.milp, la solution de départ n'est pas transmise
+        self.res = self._resoudre_milp(self.p, borne_sup, temps_limite)
+        return self.res.x is not None, getattr(self.res, "mip_dual_bound", None), self.res.status == 2
+
+    def _extraire(self):
+        # (stations et liens en index de la matrice, stations, anneau) de la solution courante
+        valeurs = self.res.x
+        z = valeurs[self.oz:self.oz + self.n]
+        x = valeurs[self.ox:self.oy]
+        stations_idx = np.flatnonzero(z > 0.5)
+        stations = [self.index_to_node[i] for i in stations_idx]
+        if self.formulation == "mtz":
+            actifs = np.flatnonzero(x > 0.5)
+            arcs = [(self.index_to_node[self.I[k]], self.index_to_node[self.J[k]]) for k in actifs]
+            return stations_idx, arcs, stations, reconstruire_cycle_depuis_arcs(arcs, stations)
+        actifs = np.flatnonzero(x > 0.5)
+        aretes = [(self.a[e], self.b[e]) for e in actifs]
+        aretes_noeuds = [(self.index_to_node[i], self.index_to_node[j]) for i, j in aretes]
+        return stations_idx, aretes, stations, reconstruire_cycle_depuis_aretes(aretes_noeuds, stations)
+
+
+# Modèles exacts disponibles : PuLP + CBC, ou matrices creuses + HiGHS (SciPy)
+MODELES_EXACTS = {"cbc": ModeleExact, "highs": ModeleExactHighs}
+
+
+def creerModeleExact(probleme, formulation="mtz", temps_limite=None, gap=None, threads=None, backend="cbc"):
+    if backend not in MODELES_EXACTS:
+        raise ValueError(f"Solveur inconnu : {backend}")
+    return MODELES_EXACTS[backend](probleme, formulation, temps_limite, gap, threads)
+
+
+def methode_exacte(probleme, p, formulation="mtz", temps_limite=None, gap=None, threads=None, depart=None,
+                   backend="cbc", echeance=None):
+    """
+    Résolution exacte du problème d'anneau-étoiles pour p stations.
+
+    Args:
+        formulation: "mtz" ou "coupes" (voir ModeleExact) ; la formulation par coupes
+            demande p >= 3 et retombe sur MTZ sinon
+        temps_limite: Temps limite du solveur en secondes (None = sans limite)
+        gap: Écart relatif toléré pour arrêter le solveur
+        threads: Nombre de threads de CBC
+        depart: Solution de départ pour le solveur, (cycle, stations) ou objet Solution
+        backend: "cbc" (modèle PuLP résolu par CBC) ou "highs" (matrices creuses
+            résolues en mémoire par scipy.optimize.milp)
+        echeance: Echeance à laquelle la meilleure solution connue est renvoyée
+    """
+    if formulation == "coupes" and p < 3:
+        formulation = "mtz"
+    modele = creerModeleExact(probleme, formulation, temps_limite, gap, threads, backend)
+    cycle, stations, _, _ = modele.resoudre(p, depart=depart, echeance=echeance)
+    return cycle, stations
+
+
+# Wrapper pour l'optimisation sur p avec méthode exacte
+def methode_exacte_optimisee(probleme, n_max_tests=10, n_workers=1, strategie="exhaustive", formulation="mtz",
+                             reutiliser_modele=True, temps_limite=None, gap=None, threads=None, p_variable=True,
+                             backend="cbc", depart=None, budget=None, arret=None, progression=None):
+    """
+    Méthode exacte avec optimisation du nombre de stations p.
+
+    Avec p_variable (par défaut), p est une variable du modèle : une seule résolution
+    donne directement le nombre de stations optimal (voir ModeleExact.resoudre avec
+    p=None). n_max_tests, strategie et reutiliser_modele ne servent alors pas, et
+    n_workers devient le nombre de threads de CBC si threads n'est pas donné.
+
+    Sinon, on résout un modèle par valeur de p testée, en limitant par défaut à 10
+    tests car la méthode exacte est très lente. Avec reutiliser_modele, le modèle est construit une seule fois (ModeleExact) :
+    seul le nombre de stations change entre deux résolutions, chaque résolution
+    part d'une solution heuristique et le meilleur coût déjà trouvé sert de coupure.
+    temps_limite, gap et threads sont passés à CBC pour chaque valeur de p.
+    backend="highs" remplace PuLP + CBC par le modèle en matrices creuses résolu par HiGHS.
+    depart (cycle, stations), utilisé avec p_variable, remplace la solution de départ heuristique.
+    budget (secondes) et arret (threading.Event) bornent toute la résolution : à l'échéance,
+    la meilleure solution trouvée est renvoyée. progression est appelée avec
+    (p, cycle, stations, cout) à chaque nouvelle meilleure solution.
+    """
+    if p_variable:
+        if threads is None and n_workers is not None and n_workers > 1:
+            threads = n_workers
+        print("Résolution d'un seul modèle avec p variable...")
+        # Le budget compte aussi la construction du modèle
+        echeance = None if budget is None and arret is None else Echeance(budget, arret)
+        modele = creerModeleExact(probleme, formulation, temps_limite, gap, threads, backend)
+        cycle, stations, cout, borne = modele.resoudre(None, depart=depart, echeance=echeance,
+                                                       progression=progression)
+        if borne is not None and cout > 0:
+            print(f"Borne inférieure : {borne:.2f} (écart {100 * (cout - borne) / cout:.2f} %)")
+        return len(stations), cycle, stations, cout
+
+    # Pour la méthode exacte, on limite le nombre de tests par défaut
+    n = probleme.dimension
+    if n_max_tests is None:
+        n_max_tests = min(10, n - 2)  # Maximum 10 tests ou n-2 si plus petit
+
+    if not reutiliser_modele:
+        methode = functools.partial(methode_exacte, formulation=formulation, temps_limite=temps_limite,
+                                    gap=gap, threads=threads, backend=backend)
+        return optimiserNombreStations(probleme, methode, n_max_tests, n_workers=n_workers, strategie=strategie,
+                                       budget=budget, arret=arret, progression=progression)
+
+    modele = creerModeleExact(probleme, formulation, temps_limite, gap, threads, backend)
+    resultat = optimiserNombreStations(probleme, modele, n_max_tests, n_workers=n_workers, strategie=strategie,
+                                       budget=budget, arret=arret, progression=progression)
+    p_optimal, _, _, cout = resultat
+    borne = modele.bornes.get(p_optimal)
+    if borne is not None and cout > 0:
+        print(f"Borne inférieure pour p={p_optimal} : {borne:.2f} (écart {100 * (cout - borne) / cout:.2f} %)")
+    return resultat
@@ -1,39 +1,65 @@
 import sys
 import time
 
-from instance import (
-    chargerInstance,
-    methode_exacte_optimisee,
-    afficherSolution,
-)
+from exact import methode_exacte_optimisee
+from instance import affectationEnMemoire, chargerInstance, cheminInstance
+from instrumentation import instrumenter, optionsInstrumentation
+from stockage import optionsBudget, optionsStockage
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage : python exactPlne.py <fichier.tsp>")
+    # --rapport <fichier.json> et --profil <fichier.prof> peuvent être placés n'importe où
+    argv, chemin_rapport, chemin_profil = optionsInstrumentation(sys.argv)
+    # --no-plot : pas de schéma de la solution (ni matplotlib ni networkx importés)
+    sans_affichage = "--no-plot" in argv
+    argv = [a for a in argv if a != "--no-plot"]
+    # --solutions <dossier>, --sans-stockage, --recalculer : reprise des solutions enregistrées
+    argv, stockage, recalculer = optionsStockage(argv)
+    # --budget <secondes> : arrêt à l'échéance avec la meilleure solution trouvée
+    argv, budget = optionsBudget(argv)
+
+    if len(argv) < 2:
+        print("Usage : python exactPlne.py <fichier.tsp> [nombre_processus] [--no-plot] [--budget secondes] [--solutions dossier] [--sans-stockage] [--recalculer] [--rapport fichier.json] [--profil fichier.prof]")
         sys.exit(1)
 
-    fichier = sys.argv[1]
+    fichier = argv[1]
+    # Nombre de processus pour le balayage des valeurs de p (1 = séquentiel)
+    n_workers = int(argv[2]) if len(argv) > 2 else 1
+
+    # Nom d'une instance de data/ ou chemin vers un fichier .tsp
+    chemin = cheminInstance(fichier)
 
-    chemin = f"data/{fichier}"
+    with instrumenter(chemin_rapport, chemin_profil, instance=fichier, methode="exacte") as rapport:
+        probleme = chargerInstance(chemin)
 
-    probleme = chargerInstance(chemin)
+        print(f"=== Méthode exacte (PLNE avec optimisation du nombre de stations) ===")
+        print(f"Fichier : {fichier}, Nombre de nœuds : {probleme.dimension}")
+        print("Résolution en cours... (peut prendre du temps)")
 
-    print(f"=== Méthode exacte (PLNE avec optimisation du nombre de stations) ===")
-    print(f"Fichier : {fichier}, Nombre de nœuds : {len(probleme.node_coords)}")
-    print("Résolution en cours... (peut prendre du temps)")
-    
-    debut = time.time()
-    p_optimal, cycle, stations, cout = methode_exacte_optimisee(probleme)
-    temps = time.time() - debut
+        debut = time.time()
+        # Départ à chaud depuis la meilleure solution déjà enregistrée pour l'instance
+        p_optimal, cycle, stations, cout = stockage.resoudre(
+            probleme, "exacte",
+            lambda depart: methode_exacte_optimisee(probleme, n_workers=n_workers, formulation="coupes",
+                                                    depart=depart, budget=budget),
+            # Une résolution interrompue par le budget n'est pas reprise comme résolution complète
+            parametres={"formulation": "coupes", "backend": "cbc", **({"budget": budget} if budget else {})},
+            recalculer=recalculer,
+        )
+        temps = time.time() - debut
+        rapport.update(p=p_optimal, cout=cout, temps_resolution=temps)
 
     print(f"\n=== Résultat ===")
     print(f"Nombre optimal de stations : {p_optimal}")
     print(f"Coût de la solution optimale : {cout:.2f}")
     print(f"Temps de résolution : {temps:.4f} secondes")
     print(f"Stations : {stations}")
-    
-    afficherSolution(probleme, cycle, stations, methode="exact")
+
+    if not sans_affichage:
+        from affichage import afficherSolution
+        # Affectation gardée par le calcul du coût final : le schéma ne la recalcule pas
+        afficherSolution(probleme, cycle, stations, methode="exact",
+                         affectation=affectationEnMemoire(probleme, stations))
 
 
 if __name__ == "__main__":
@@ -1,32 +1,499 @@
-import tsplib95 as tsp
-import networkx as nx
-import matplotlib.pyplot as plt
 import numpy as np
-import pulp
 import random
-import sys
 import math
 import os
+import hashlib
+import importlib
+import weakref
+import functools
+import inspect
+import time
+import json
+import contextlib
+import warnings
+from collections import OrderedDict, deque
+
+# Instrumentation et échéances : modules sans dépendance, repris ici pour les scripts
+from instrumentation import (
+    CHRONOMETRES,
+    COMPTEURS,
+    chronometre,
+    chronometrer,
+    instrumenter,
+    optionsInstrumentation,
+    rapportInstrumentation,
+    reinitialiserCompteurs,
+)
+from echeances import Echeance, echeanceDepassee
+
+# Le coeur du solveur (lecture, distances, heuristiques, coûts) ne dépend que de NumPy.
+# scipy.spatial (arbres k-d) et tsplib95 sont importés à la première utilisation ;
+# l'affichage (matplotlib, networkx) est dans affichage.py et la méthode exacte
+# (PuLP, HiGHS) dans exact.py. Leurs fonctions restent accessibles depuis ce module,
+# qui n'importe le module concerné qu'au premier accès. Il en va de même du stockage des
+# solutions (stockage.py) et du balayage parallèle (balayage.py, pool de processus et
+# mémoire partagée), importés seulement quand ils servent.
+_EXPORTS_DIFFERES = {
+    "creerGraphe": "affichage",
+    "afficherGraphe": "affichage",
+    "afficherSolution": "affichage",
+    "reconstruire_cycle_depuis_arcs": "exact",
+    "reconstruire_cycle_depuis_aretes": "exact",
+    "separer_coupes_connexite": "exact",
+    "ModeleExact": "exact",
+    "ModeleExactHighs": "exact",
+    "MODELES_EXACTS": "exact",
+    "creerModeleExact": "exact",
+    "methode_exacte": "exact",
+    "methode_exacte_optimisee": "exact",
+    "DOSSIER_SOLUTIONS": "stockage",
+    "StockageSolutions": "stockage",
+    "optionsStockage": "stockage",
+    "optionsBudget": "stockage",
+}
+
+
+def __getattr__(nom):
+    module = _EXPORTS_DIFFERES.get(nom)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
+    return getattr(importlib.import_module(module), nom)
+
+
+# =========================
+# Lecture des instances
+# =========================
+# Écrit et relit le cache binaire des coordonnées (fichier .npz à côté du .tsp)
+CACHE_INSTANCES = True
+
+# Version du format du cache : un cache d'une autre version est ignoré
+VERSION_CACHE_INSTANCES = 1
+
+# Nombre d'instances gardées en mémoire par processus par instanceChargee (les moins
+# récemment utilisées sont libérées, avec leur matrice et leurs listes de candidats)
+MAX_INSTANCES_CHARGEES = 16
+
+# Instances chargées par le processus : chemin réel -> (taille, date du fichier, instance)
+_instances_chargees = OrderedDict()
+
+
+class InstanceTSP:
+    """
+    Instance TSPLIB à coordonnées, stockée en tableaux NumPy contigus.
+
+    ids contient les numéros des noeuds triés (int64) et coords leurs coordonnées
+    (float64, forme (n, 2)) dans le même ordre, qui est celui des index de la matrice
+    de distances. name, dimension et edge_weight_type reprennent l'en-tête du fichier.
+
+    node_coords (dictionnaire) et get_graph() sont gardés pour compatibilité avec
+    tsplib95 : ils sont construits à la demande et ne servent pas au calcul.
+    """
+
+    def __init__(self, name, edge_weight_type, ids, coords, chemin_fichier=None, empreinte=None):
+        ordre = np.argsort(ids, kind="stable")
+        self.name = name
+        self.edge_weight_type = edge_weight_type
+        self.ids = np.ascontiguousarray(ids[ordre], dtype=np.int64)
+        self.coords = np.ascontiguousarray(coords[ordre], dtype=np.float64)
+        self.dimension = len(self.ids)
+        self.chemin_fichier = chemin_fichier
+        self.empreinte = empreinte
+        self._noeuds = None
+        self._probleme_tsplib = None
+
+    # Numéros des noeuds en liste d'entiers Python (clés des dictionnaires index <-> noeud)
+    @property
+    def noeuds(self):
+        if self._noeuds is None:
+            self._noeuds = self.ids.tolist()
+        return self._noeuds
+
+    @property
+    def node_coords(self):
+        return dict(zip(self.noeuds, self.coords.tolist()))
+
+    # Graphe complet pondéré : délégué à tsplib95, qui relit le fichier source
+    def get_graph(self):
+        if self._probleme_tsplib is None:
+            import tsplib95
+            self._probleme_tsplib = tsplib95.load(self.chemin_fichier)
+        return self._probleme_tsplib.get_graph()
+
+    def __getstate__(self):
+        # L'objet tsplib95 n'est pas picklable (pools de processus) : il sera relu si besoin
+        etat = dict(self.__dict__)
+        etat["_probleme_tsplib"] = None
+        return etat
+
+
+# Empreinte SHA-1 du contenu d'un fichier
+def _empreinteFichier(chemin):
+    h = hashlib.sha1()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+# Lecture directe d'un fichier TSPLIB à coordonnées 2D ; None si le format n'est pas pris en charge
+def _lireInstanceCoordonnees(fichier):
+    with open(fichier) as f:
+        lignes = f.read().splitlines()
+
+    entete = {}
+    debut_section = None
+    for i, ligne in enumerate(lignes):
+        ligne = ligne.strip()
+        if not ligne:
+            continue
+        if ligne.startswith("NODE_COORD_SECTION"):
+            debut_section = i + 1
+            break
+        if ":" not in ligne:
+            # Autre section (EDGE_WEIGHT_SECTION...) ou EOF avant les coordonnées
+            return None
+        cle, valeur = ligne.split(":", 1)
+        entete[cle.strip()] = valeur.strip()
+    if debut_section is None or entete.get("NODE_COORD_TYPE", "TWOD_COORDS") != "TWOD_COORDS":
+        return None
+
+    # La section s'arrête à EOF ou à la section suivante (DISPLAY_DATA_SECTION...)
+    fin_section = len(lignes)
+    for j in range(debut_section, len(lignes)):
+        mot = lignes[j].strip()
+        if mot and not (mot[0].isdigit() or mot[0] in "+-."):
+            fin_section = j
+            break
+    valeurs = np.array(" ".join(lignes[debut_section:fin_section]).split(), dtype=np.float64)
+    if valeurs.size % 3:
+        return None
+    valeurs = valeurs.reshape(-1, 3)
+    dimension = int(entete.get("DIMENSION", len(valeurs)))
+    if len(valeurs) != dimension:
+        return None
+    return entete.get("NAME", ""), entete.get("EDGE_WEIGHT_TYPE"), valeurs[:, 0].astype(np.int64), valeurs[:, 1:]
+
+
+# Relit le cache s'il correspond au fichier source (taille + date, puis empreinte si la date a changé)
+def _lireCacheInstance(chemin_cache, etat_source, fichier):
+    try:
+        with np.load(chemin_cache) as cache:
+            meta = json.loads(str(cache["meta"]))
+            if meta.get("version") != VERSION_CACHE_INSTANCES:
+                return None
+            empreinte = meta["empreinte"]
+            if (meta["taille"], meta["mtime_ns"]) != (etat_source.st_size, etat_source.st_mtime_ns):
+                # Fichier touché sans être modifié (copie, checkout) : on compare le contenu
+                if meta["taille"] != etat_source.st_size or _empreinteFichier(fichier) != empreinte:
+                    return None
+            return InstanceTSP(meta["name"], meta["edge_weight_type"], cache["ids"], cache["coords"],
+                               fichier, empreinte)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# Écrit un fichier via ecrire(f) : d'abord dans un fichier temporaire, puis renommage, pour
+# qu'un lecteur concurrent (autre processus, autre script) ne voie jamais un fichier partiel
+def _ecrireAtomique(chemin, ecrire, mode="wb"):
+    chemin_tmp = f"{chemin}.{os.getpid()}.tmp"
+    try:
+        with open(chemin_tmp, mode) as f:
+            ecrire(f)
+        os.replace(chemin_tmp, chemin)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(chemin_tmp)
+        raise
+
+
+def _ecrireCacheInstance(chemin_cache, instance, etat_source):
+    meta = {
+        "version": VERSION_CACHE_INSTANCES,
+        "name": instance.name,
+        "edge_weight_type": instance.edge_weight_type,
+        "taille": etat_source.st_size,
+        "mtime_ns": etat_source.st_mtime_ns,
+        "empreinte": instance.empreinte,
+    }
+    try:
+        _ecrireAtomique(chemin_cache, lambda f: np.savez(f, ids=instance.ids, coords=instance.coords,
+                                                         meta=np.array(json.dumps(meta))))
+    except OSError:
+        # Dossier en lecture seule : on se passe du cache
+        pass
+
+
+# Chemin d'une instance donnée par un chemin existant, ou par son seul nom de fichier dans data/
+def cheminInstance(fichier):
+    if os.path.exists(fichier):
+        return fichier
+    return os.path.join("data", fichier)
+
 
 # Fonction pour charger une instance de TSP
-def chargerInstance(fichier):
-    probleme = tsp.load(fichier)
+@chronometrer("lecture_instance")
+def chargerInstance(fichier, cache=None):
+    """
+    Charge une instance TSPLIB.
+
+    Les instances à coordonnées 2D (NODE_COORD_SECTION) sont lues directement en
+    tableaux NumPy (InstanceTSP) et mises en cache dans <fichier>.npz : les lectures
+    suivantes ne font que recharger les tableaux. Le cache est invalidé si la taille
+    ou la date du fichier changent et que son contenu (empreinte SHA-1) a changé.
+    Les autres formats (matrice explicite...) passent par tsplib95.
+
+    Args:
+        fichier: Chemin du fichier .tsp
+        cache: Utilise le cache binaire (None = CACHE_INSTANCES)
+
+    Returns:
+        InstanceTSP, ou l'objet tsplib95 pour les formats sans coordonnées
+    """
+    if cache is None:
+        cache = CACHE_INSTANCES
+    etat_source = os.stat(fichier)
+    chemin_cache = f"{fichier}.npz"
+
+    if cache and os.path.exists(chemin_cache):
+        instance = _lireCacheInstance(chemin_cache, etat_source, fichier)
+        if instance is not None:
+            return instance
+
+    lu = _lireInstanceCoordonnees(fichier)
+    if lu is None:
+        import tsplib95
+        probleme = tsplib95.load(fichier)
+        # On garde le chemin du fichier pour les caches (clé = empreinte du fichier)
+        probleme.chemin_fichier = fichier
+        return probleme
+
+    name, edge_weight_type, ids, coords = lu
+    instance = InstanceTSP(name, edge_weight_type, ids, coords, fichier, _empreinteFichier(fichier))
+    if cache:
+        _ecrireCacheInstance(chemin_cache, instance, etat_source)
+    return instance
+
+
+# Nombre de noeuds annoncé par l'entête TSPLIB (DIMENSION), sans lire les coordonnées
+def dimensionInstance(chemin):
+    with open(chemin, encoding="utf-8", errors="replace") as f:
+        for ligne in f:
+            cle, separateur, valeur = ligne.partition(":")
+            cle = cle.strip()
+            if cle == "DIMENSION" and separateur:
+                return int(valeur)
+            if cle.endswith("_SECTION") or cle == "EOF":
+                break
+    return None
+
+
+# Instance déjà chargée par instanceChargee, ou None (jamais chargée, libérée ou fichier modifié depuis)
+def instanceEnMemoire(fichier):
+    cle = os.path.realpath(fichier)
+    entree = _instances_chargees.get(cle)
+    if entree is None:
+        return None
+    etat_source = os.stat(cle)
+    if entree[:2] != (etat_source.st_size, etat_source.st_mtime_ns):
+        del _instances_chargees[cle]
+        return None
+    _instances_chargees.move_to_end(cle)
+    return entree[2]
+
+
+# Fonction pour charger une instance une seule fois par processus (scripts en lot, serveur) :
+# le même objet est renvoyé tant que le fichier n'a pas changé, et les caches rattachés à
+# l'instance (matrice de distances, listes de candidats) restent valables
+def instanceChargee(fichier):
+    probleme = instanceEnMemoire(fichier)
+    if probleme is None:
+        etat_source = os.stat(fichier)
+        probleme = chargerInstance(fichier)
+        _instances_chargees[os.path.realpath(fichier)] = (etat_source.st_size, etat_source.st_mtime_ns, probleme)
+        while len(_instances_chargees) > MAX_INSTANCES_CHARGEES:
+            _instances_chargees.popitem(last=False)
     return probleme
 
+
+# =========================
+# Nombre de stations p
+# =========================
+# Plus petit nombre de stations testé (un anneau a au moins 3 stations)
+NOMBRE_MIN_STATIONS = 3
+
 # Fonction pour calculer automatiquement le nombre de stations K
 # Formule : K = max(3, ⌈√n⌉) où n est le nombre de nœuds
 # Cela garantit K >= 3 et est proportionnel à la taille de l'instance
 # NOTE: Cette fonction donne une valeur initiale, mais pour vraiment minimiser le coût,
 # il faut utiliser optimiserNombreStations() qui teste différentes valeurs de p
 def calculerNombreStations(probleme):
-    n = len(probleme.node_coords)
+    n = probleme.dimension
     k = max(3, math.ceil(math.sqrt(n)))
     return k
 
+# Valeurs de p testées par optimiserNombreStations
+# Avec une matrice implicite (n > SEUIL_MATRICE_IMPLICITE), p ne dépasse pas P_MAX_MATRICE_IMPLICITE :
+# un avertissement le signale quand toutes les valeurs de 3 à n étaient demandées
+def valeursNombreStations(n, n_max_tests=None):
+    p_max = P_MAX_MATRICE_IMPLICITE if n > SEUIL_MATRICE_IMPLICITE else n
+    if n_max_tests is None or n <= 50:
+        # Pour les petites instances, tester toutes les valeurs de 3 à n
+        if p_max < n:
+            warnings.warn(f"{n} noeuds : matrice de distances implicite, seules les valeurs de p de 3 à {p_max} "
+                          f"sont testées (P_MAX_MATRICE_IMPLICITE) au lieu de 3 à {n}", RuntimeWarning, stacklevel=3)
+        return list(range(3, p_max + 1))
+
+    # Pour les grandes instances, tester un échantillon autour de √n
+    p_centre = max(3, math.ceil(math.sqrt(n)))
+    # Tester autour de √n avec un rayon
+    rayon = min(n_max_tests // 2, n // 4)
+    valeurs_p = []
+    # Ajouter des valeurs autour de √n
+    for i in range(max(3, p_centre - rayon), min(p_max + 1, p_centre + rayon + 1)):
+        valeurs_p.append(i)
+    # Ajouter quelques valeurs aux extrémités
+    if 3 not in valeurs_p:
+        valeurs_p.append(3)
+    if p_max not in valeurs_p and p_max >= 3:
+        valeurs_p.append(p_max)
+    return sorted(set(valeurs_p))
+
+
+# Vrai si la méthode de résolution accepte l'argument nommé nom
+def accepteParametre(methode_resolution, nom):
+    try:
+        return nom in inspect.signature(methode_resolution).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+# Vrai si la méthode de résolution accepte un départ à chaud (argument depart=(cycle, stations))
+def accepteDepart(methode_resolution):
+    return accepteParametre(methode_resolution, "depart")
+
+
+# Résolution pour une valeur de p, ramenée au format (cycle, stations, cout)
+# L'échéance n'est transmise qu'aux méthodes qui l'acceptent (argument echeance=)
+def evaluerNombreStations(probleme, methode_resolution, p, ameliorer_anneau=False, depart=None, echeance=None):
+    matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
+    options = {}
+    if depart is not None:
+        options["depart"] = depart
+    if echeance is not None and accepteParametre(methode_resolution, "echeance"):
+        options["echeance"] = echeance
+    result = methode_resolution(probleme, p, **options)
+    # Gérer les deux formats de retour possibles
+    if len(result) == 3:
+        cycle, stations, cout = result
+    else:
+        cycle, stations = result
+        cout = cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index)
+    if ameliorer_anneau:
+        cycle = optimiser_anneau(matrice, cycle, node_to_index)
+        cout = cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index)
+    return cycle, stations, cout
+
+
+# Balayage des valeurs de p une par une (interrompu à l'échéance)
+def _balayage_sequentiel(probleme, methode_resolution, valeurs_p, ameliorer_anneau, echeance=None):
+    for p in valeurs_p:
+        if echeanceDepassee(echeance):
+            return
+        try:
+            cycle, stations, cout = evaluerNombreStations(probleme, methode_resolution, p, ameliorer_anneau,
+                                                          echeance=echeance)
+            yield p, cycle, stations, cout, None
+        except Exception as e:
+            yield p, None, None, None, str(e)
+
+
+# Recherche de p par section dorée avec départs à chaud, résultats au fil de l'eau
+def _recherche_section_doree(probleme, methode_resolution, valeurs_p, ameliorer_anneau, afficher=print,
+                             echeance=None):
+    a_chaud = accepteDepart(methode_resolution)
+    evaluees = {}
+    temps_appels = []
+
+    def evaluer(p):
+        if p in evaluees:
+            return evaluees[p][2]
+        if echeanceDepassee(echeance):
+            # Plus de temps : p n'est pas évalué, la recherche s'arrête au prochain point de contrôle
+            return float('inf')
+        depart = None
+        if a_chaud and evaluees:
+            # Départ depuis la solution évaluée la plus proche en p (la moins chère à égalité)
+            p_proche = min(evaluees, key=lambda q: (abs(q - p), evaluees[q][2]))
+            cycle, stations, _ = evaluees[p_proche]
+            depart = ajuster_nombre_stations(probleme, cycle, stations, p, echeance)
+            if depart is None:
+                return float('inf')
+        debut = time.perf_counter()
+        try:
+            cycle, stations, cout = evaluerNombreStations(probleme, methode_resolution, p, ameliorer_anneau, depart,
+                                                          echeance)
+            resultat = (p, cycle, stations, cout, None)
+        except Exception as e:
+            cout = float('inf')
+            resultat = (p, None, None, None, str(e))
+        temps_appels.append(time.perf_counter() - debut)
+        evaluees[p] = (resultat[1], resultat[2], cout)
+        a_signaler.append(resultat)
+        return cout
+
+    a_signaler = []
+    a, b = valeurs_p[0], valeurs_p[-1]
+    ratio = (math.sqrt(5) - 1) / 2
+    # Section dorée sur les entiers, tant que l'intervalle contient plus de 4 valeurs
+    while b - a > 3:
+        if echeanceDepassee(echeance):
+            return
+        c = a + int(round((1 - ratio) * (b - a)))
+        d = a + int(round(ratio * (b - a)))
+        if c == d:
+            d = c + 1
+        if evaluer(c) <= evaluer(d):
+            b = d
+        else:
+            a = c
+        yield from a_signaler
+        a_signaler.clear()
+    for p in range(a, b + 1):
+        evaluer(p)
+    yield from a_signaler
+    a_signaler.clear()
+
+    if not evaluees:
+        return
+    # Confirmation : on se déplace d'un cran tant que le voisin fait mieux
+    meilleur = min(evaluees, key=lambda q: evaluees[q][2])
+    while not echeanceDepassee(echeance):
+        voisins = [q for q in (meilleur - 1, meilleur + 1) if valeurs_p[0] <= q <= valeurs_p[-1]]
+        for q in voisins:
+            evaluer(q)
+        # Un voisin non évalué (échéance atteinte entre-temps) n'est pas candidat
+        voisins = [q for q in voisins if q in evaluees]
+        yield from a_signaler
+        a_signaler.clear()
+        # À égalité on reste sur place, sinon la confirmation pourrait osciller
+        suivant = min([meilleur] + voisins, key=lambda q: evaluees[q][2])
+        if suivant == meilleur:
+            break
+        meilleur = suivant
+
+    n_appels = len(temps_appels)
+    temps_total = sum(temps_appels)
+    estimation = temps_total / max(1, n_appels) * len(valeurs_p)
+    afficher(f"Section dorée : {n_appels} appels à la méthode au lieu de {len(valeurs_p)} "
+          f"({'départs à chaud' if a_chaud else 'départs à froid'}), "
+          f"{temps_total:.2f} s au lieu d'environ {estimation:.2f} s (gain ≈ {estimation - temps_total:.2f} s)")
+
+
 # Fonction pour optimiser le nombre de stations p en testant différentes valeurs
 # et en choisissant celle qui minimise le coût total
 # Pour les grandes instances, on teste un échantillon de valeurs autour de √n
-def optimiserNombreStations(probleme, methode_resolution, n_max_tests=None):
+def optimiserNombreStations(probleme, methode_resolution, n_max_tests=None, ameliorer_anneau=False, n_workers=1,
+                            strategie="exhaustive", verbeux=True, budget=None, arret=None, progression=None):
     """
     Optimise le nombre de stations p en testant différentes valeurs.
     
@@ -34,66 +501,86 @@ def optimiserNombreStations(probleme, methode_resolution, n_max_tests=None):
         probleme: Instance TSP
         methode_resolution: Fonction qui prend (probleme, p) et retourne (cycle, stations) ou (cycle, stations, cout)
         n_max_tests: Nombre maximum de valeurs de p à tester (None = tester toutes de 3 à n)
+        ameliorer_anneau: Repasse l'anneau de chaque solution au 2-opt / Or-opt avant de comparer les coûts
+        n_workers: Nombre de processus (1 = séquentiel, None = tous les cœurs). En parallèle,
+            methode_resolution doit être picklable (fonction de module ou functools.partial)
+            et la matrice de distances est partagée entre les processus
+        strategie: "exhaustive" pour tester toutes les valeurs retenues, ou "section_doree"
+            pour une recherche par section dorée sur [min, max] de ces valeurs (coût supposé
+            à peu près unimodal en p), suivie d'une confirmation autour du meilleur p.
+            Si la méthode accepte un départ à chaud, chaque p part de la solution déjà
+            évaluée la plus proche, complétée ou réduite d'une station à la fois
+        verbeux: Affiche la progression (False pour un appel silencieux)
+        budget: Temps total en secondes (None = sans limite). À l'échéance, les valeurs
+            de p restantes ne sont pas testées et la meilleure solution trouvée est
+            renvoyée ; une méthode qui accepte l'argument echeance s'arrête aussi en
+            cours de résolution avec sa meilleure solution
+        arret: Événement (threading.Event) dont is_set() interrompt le balayage de la même façon
+        progression: Fonction appelée avec (p, cycle, stations, cout) à chaque nouvelle
+            meilleure solution
     
     Returns:
         (p_optimal, cycle, stations, cout_optimal)
     """
-    n = len(probleme.node_coords)
+    n = probleme.dimension
     matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
     
     # Déterminer les valeurs de p à tester
-    if n_max_tests is None or n <= 50:
-        # Pour les petites instances, tester toutes les valeurs de 3 à n
-        valeurs_p = list(range(3, n + 1))
-    else:
-        # Pour les grandes instances, tester un échantillon autour de √n
-        p_centre = max(3, math.ceil(math.sqrt(n)))
-        # Tester autour de √n avec un rayon
-        rayon = min(n_max_tests // 2, n // 4)
-        valeurs_p = []
-        # Ajouter des valeurs autour de √n
-        for i in range(max(3, p_centre - rayon), min(n + 1, p_centre + rayon + 1)):
-            valeurs_p.append(i)
-        # Ajouter quelques valeurs aux extrémités
-        if 3 not in valeurs_p:
-            valeurs_p.append(3)
-        if n not in valeurs_p and n >= 3:
-            valeurs_p.append(n)
-        valeurs_p = sorted(set(valeurs_p))
+    valeurs_p = valeursNombreStations(n, n_max_tests)
+    afficher = print if verbeux else (lambda *args, **kwargs: None)
+    echeance = None if budget is None and arret is None else Echeance(budget, arret)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(valeurs_p)))
     
     meilleur_p = None
     meilleur_cycle = None
     meilleures_stations = None
     meilleur_cout = float('inf')
     
-    print(f"Optimisation du nombre de stations : test de {len(valeurs_p)} valeurs de p...")
+    if strategie == "section_doree":
+        afficher(f"Optimisation du nombre de stations : section dorée sur p ∈ [{valeurs_p[0]}, {valeurs_p[-1]}]...")
+        resultats = _recherche_section_doree(probleme, methode_resolution, valeurs_p, ameliorer_anneau, afficher,
+                                             echeance)
+    elif strategie != "exhaustive":
+        raise ValueError(f"Stratégie inconnue : {strategie}")
+    elif n_workers > 1:
+        afficher(f"Optimisation du nombre de stations : test de {len(valeurs_p)} valeurs de p "
+              f"sur {n_workers} processus...")
+        from balayage import _balayage_parallele
+        resultats = _balayage_parallele(probleme, methode_resolution, valeurs_p, ameliorer_anneau, n_workers,
+                                        echeance)
+    else:
+        afficher(f"Optimisation du nombre de stations : test de {len(valeurs_p)} valeurs de p...")
+        resultats = _balayage_sequentiel(probleme, methode_resolution, valeurs_p, ameliorer_anneau, echeance)
     
-    for p in valeurs_p:
-        try:
-            result = methode_resolution(probleme, p)
-            # Gérer les deux formats de retour possibles
-            if len(result) == 3:
-                cycle, stations, cout = result
-            else:
-                cycle, stations = result
-                cout = cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index)
-            
-            if cout < meilleur_cout:
-                meilleur_cout = cout
-                meilleur_p = p
-                meilleur_cycle = cycle
-                meilleures_stations = stations
-                print(f"  p={p}: coût={cout:.2f} ✓ (nouveau meilleur)")
-            else:
-                print(f"  p={p}: coût={cout:.2f}")
-        except Exception as e:
-            print(f"  p={p}: erreur - {e}")
+    for p, cycle, stations, cout, erreur in resultats:
+        if erreur is not None:
+            afficher(f"  p={p}: erreur - {erreur}")
             continue
+
+        if cout < meilleur_cout:
+            meilleur_cout = cout
+            meilleur_p = p
+            meilleur_cycle = cycle
+            meilleures_stations = stations
+            afficher(f"  p={p}: coût={cout:.2f} ✓ (nouveau meilleur)")
+            if progression is not None:
+                progression(p, cycle, stations, cout)
+        else:
+            afficher(f"  p={p}: coût={cout:.2f}")
+
+    if echeanceDepassee(echeance):
+        afficher("Échéance atteinte : meilleure solution trouvée jusqu'ici")
     
     if meilleur_p is None:
         # Fallback : utiliser la valeur par défaut
         p_default = calculerNombreStations(probleme)
-        result = methode_resolution(probleme, p_default)
+        if echeanceDepassee(echeance):
+            # Échéance passée sans aucune solution : l'heuristique rapide, sans amélioration
+            result = heuristique_rapide(probleme, p_default)
+        else:
+            result = methode_resolution(probleme, p_default)
         if len(result) == 3:
             cycle, stations, _ = result
         else:
@@ -102,373 +589,1693 @@ def optimiserNombreStations(probleme, methode_resolution, n_max_tests=None):
         meilleur_cycle = cycle
         meilleures_stations = stations
         meilleur_cout = cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index)
+        if progression is not None:
+            progression(meilleur_p, meilleur_cycle, meilleures_stations, meilleur_cout)
+    else:
+        # Coût final repris par cout_solution : l'affectation de la solution gardée reste en mémoire
+        meilleur_cout = cout_solution(probleme, meilleur_cycle, meilleures_stations, matrice, index_to_node,
+                                      node_to_index)
     
     return meilleur_p, meilleur_cycle, meilleures_stations, meilleur_cout
 
-# Fonction pour créer le graphe de l'instance
-def creerGraphe(probleme):
-    g = probleme.get_graph()
-    return g
 
-# Fonction pour afficher le graphe
-def afficherGraphe(graphe, probleme):
+# =========================
+# Moteur de distances
+# =========================
+# Types de distance TSPLIB reconnus quand on demande type_distance="TSPLIB"
+TYPES_DISTANCE_TSPLIB = ("EUC_2D", "CEIL_2D", "ATT", "GEO")
+
+# Dossier du cache disque des matrices (None = pas de cache disque par défaut)
+DOSSIER_CACHE_DISTANCES = None
+
+# Au-delà de ce nombre de noeuds, la matrice euclidienne n'est plus stockée (MatriceImplicite) :
+# 8000 noeuds font déjà 512 Mo en float64
+SEUIL_MATRICE_IMPLICITE = 8000
+
+# Plus grand p testé par optimiserNombreStations au-delà de ce seuil : l'anneau (plus proche
+# voisin, 2-opt) travaille sur la sous-matrice p × p des stations, qui doit rester petite
+P_MAX_MATRICE_IMPLICITE = 2000
+
+# Matrices déjà calculées, rattachées à l'objet probleme (libérées avec lui)
+_matrices_en_memoire = weakref.WeakKeyDictionary()
+
+# Listes de candidats déjà calculées, rattachées à l'objet probleme
+_candidats_en_memoire = weakref.WeakKeyDictionary()
+
+# Dernière affectation aux stations calculée par affectationPlusProches, par objet probleme
+_affectations_en_memoire = weakref.WeakKeyDictionary()
+
+
+# Fonction pour extraire les coordonnées sous forme de tableau NumPy (noeuds triés)
+def coordonneesInstance(probleme):
+    if isinstance(probleme, InstanceTSP):
+        # Déjà en tableaux, triés à la lecture : rien à reconstruire
+        return probleme.noeuds, probleme.coords
     coords = probleme.node_coords
-    pos = {}
-    if coords:
-        # Utilise les coordonnées de l'instance quand elles existent
-        for node in graphe.nodes():
-            if node in coords:
-                pos[node] = coords[node]
+    noeuds = sorted(coords.keys())
+    tableau = np.array([coords[n] for n in noeuds], dtype=np.float64).reshape(len(noeuds), 2)
+    return noeuds, tableau
+
+
+# Carrés des distances euclidiennes, calculés par blocs de lignes pour borner la mémoire
+# temporaire (mêmes valeurs, au bit près, que scipy cdist en "sqeuclidean")
+def _distances_carrees(coords, taille_bloc=512):
+    x, y = coords[:, 0], coords[:, 1]
+    carres = np.empty((len(coords), len(coords)))
+    for debut in range(0, len(coords), taille_bloc):
+        bloc = carres[debut:debut + taille_bloc]
+        dx = x[debut:debut + taille_bloc, None] - x[None, :]
+        dy = y[debut:debut + taille_bloc, None] - y[None, :]
+        np.multiply(dx, dx, out=bloc)
+        bloc += dy * dy
+    return carres
+
+
+# Conversion TSPLIB d'une coordonnée GEO (DDD.MM) en radians
+def _geo_en_radians(valeurs):
+    degres = np.trunc(valeurs)
+    minutes = valeurs - degres
+    return 3.141592 * (degres + 5.0 * minutes / 3.0) / 180.0
+
+
+# Fonction pour calculer la matrice de distances en une seule passe vectorisée
+@chronometrer("matrice_distances")
+def calculerMatriceDistances(coords, type_distance="EUCLIDIENNE", dtype=np.float64):
+    """
+    Calcule la matrice des distances entre tous les points.
 
-    if len(pos) != len(graphe.nodes()):
-        pos = nx.spring_layout(graphe, seed=4)
+    Args:
+        coords: Tableau (n, 2) des coordonnées
+        type_distance: "EUCLIDIENNE" (distance réelle, sans arrondi) ou un type
+            TSPLIB parmi EUC_2D, CEIL_2D, ATT et GEO
+        dtype: Type des éléments de la matrice (np.float64 ou np.float32)
+
+    Returns:
+        Matrice numpy (n, n) de diagonale nulle
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+
+    if type_distance in ("EUCLIDIENNE", "EUC_2D", "CEIL_2D"):
+        matrice = np.sqrt(_distances_carrees(coords))
+        if type_distance == "EUC_2D":
+            matrice = np.floor(matrice + 0.5)
+        elif type_distance == "CEIL_2D":
+            matrice = np.ceil(matrice)
+    elif type_distance == "ATT":
+        # Distance pseudo-euclidienne : on arrondit à l'entier supérieur si besoin
+        r = np.sqrt(_distances_carrees(coords) / 10.0)
+        t = np.floor(r + 0.5)
+        matrice = np.where(t < r, t + 1.0, t)
+    elif type_distance == "GEO":
+        lat = _geo_en_radians(coords[:, 0])
+        lon = _geo_en_radians(coords[:, 1])
+        q1 = np.cos(lon[:, None] - lon[None, :])
+        q2 = np.cos(lat[:, None] - lat[None, :])
+        q3 = np.cos(lat[:, None] + lat[None, :])
+        arg = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+        matrice = np.trunc(6378.388 * np.arccos(arg) + 1.0)
+    else:
+        raise ValueError(f"Type de distance non pris en charge : {type_distance}")
+
+    np.fill_diagonal(matrice, 0)
+    return matrice.astype(dtype, copy=False)
+
+
+class MatriceImplicite:
+    """
+    Matrice des distances euclidiennes calculée à la demande depuis les coordonnées.
+
+    S'indexe comme la matrice dense (matrice[i, j], matrice[np.ix_(I, J)],
+    matrice[:, J], matrice[a:b, J], matrice[I, J] élément par élément) et donne
+    les mêmes valeurs au bit près, mais n'occupe que O(n) en mémoire : chaque
+    accès calcule seulement les distances demandées. Les heuristiques et
+    l'amélioration locale n'en lisent que des blocs n × p ou n × k, ce qui rend
+    utilisables les instances dont la matrice dense ne tiendrait pas en mémoire.
+    """
 
-    nx.draw(graphe, pos, with_labels=True)
-    plt.savefig(f"img/{probleme.name}.png")
-    plt.show()
-    plt.close()
+    ndim = 2
+
+    def __init__(self, coords, dtype=np.float64):
+        coords = np.asarray(coords, dtype=np.float64)
+        self.x = np.ascontiguousarray(coords[:, 0])
+        self.y = np.ascontiguousarray(coords[:, 1])
+        self.dtype = np.dtype(dtype)
+        self.shape = (len(coords), len(coords))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _indices(self, cle):
+        if isinstance(cle, slice):
+            return np.arange(*cle.indices(self.shape[0]))
+        return np.asarray(cle, dtype=np.intp)
+
+    def __getitem__(self, cle):
+        if not isinstance(cle, tuple):
+            cle = (cle, slice(None))
+        lignes, colonnes = cle
+        i, j = self._indices(lignes), self._indices(colonnes)
+        if isinstance(lignes, slice) or isinstance(colonnes, slice):
+            # Avec une tranche, NumPy croise les deux index (forme lignes + colonnes)
+            i = i.reshape(i.shape + (1,) * j.ndim)
+        # Mêmes opérations que _distances_carrees puis np.sqrt : valeurs identiques à la matrice dense
+        dx = self.x[i] - self.x[j]
+        dy = self.y[i] - self.y[j]
+        carres = dx * dx
+        carres += dy * dy
+        distances = np.sqrt(carres)
+        return distances.astype(self.dtype, copy=False) if isinstance(distances, np.ndarray) else distances
+
+
+# Empreinte de l'instance : hash du fichier source s'il est connu, sinon des coordonnées
+def empreinteInstance(probleme, coords=None):
+    # Empreinte déjà calculée à la lecture du fichier (InstanceTSP)
+    if getattr(probleme, "empreinte", None):
+        return probleme.empreinte
+    chemin = getattr(probleme, "chemin_fichier", None)
+    h = hashlib.sha1()
+    if chemin and os.path.exists(chemin):
+        with open(chemin, "rb") as f:
+            for bloc in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloc)
+    else:
+        if coords is None:
+            _, coords = coordonneesInstance(probleme)
+        h.update(np.ascontiguousarray(coords).tobytes())
+    return h.hexdigest()
 
 
 # Fonction pour obtenir la matrice de distances
-def obtenirMatriceDistances(probleme):
+def obtenirMatriceDistances(probleme, type_distance="EUCLIDIENNE", dtype=np.float64, dossier_cache=None):
+    """
+    Renvoie la matrice de distances de l'instance, calculée une seule fois.
 
-    coords = probleme.node_coords
-    noeuds = sorted(list(coords.keys()))
+    La matrice est gardée en mémoire pour l'objet probleme, et peut aussi être
+    stockée sur disque (fichier .npy relu en mémoire mappée) pour les exécutions
+    suivantes. La clé du cache disque est l'empreinte du fichier de l'instance.
+    Au-delà de SEUIL_MATRICE_IMPLICITE noeuds, la distance euclidienne est
+    renvoyée sous forme de MatriceImplicite (calculée à la demande, sans cache).
+
+    Args:
+        probleme: Instance TSP
+        type_distance: "EUCLIDIENNE" (par défaut) ou "TSPLIB" pour respecter
+            l'EDGE_WEIGHT_TYPE de l'instance, ou directement un type TSPLIB
+        dtype: np.float64 (par défaut) ou np.float32 pour diviser la mémoire par deux
+        dossier_cache: Dossier du cache disque (None = DOSSIER_CACHE_DISTANCES)
+
+    Returns:
+        (matrice, index_to_node, node_to_index)
+    """
+    if type_distance == "TSPLIB":
+        type_distance = probleme.edge_weight_type
+        if type_distance not in TYPES_DISTANCE_TSPLIB:
+            raise ValueError(f"EDGE_WEIGHT_TYPE non pris en charge : {type_distance}")
+    dtype = np.dtype(dtype)
+    cle = (type_distance, dtype.str)
+
+    deja_calculees = _matrices_en_memoire.setdefault(probleme, {})
+    if cle in deja_calculees:
+        return deja_calculees[cle]
+
+    noeuds, coords = coordonneesInstance(probleme)
     n = len(noeuds)
 
     # Dictionnaires utiles pour passer d'un index à un numéro de noeud et inversement
     index_to_node = {i: noeuds[i] for i in range(n)}
     node_to_index = {noeuds[i]: i for i in range(n)}
 
-    matrice = np.zeros((n, n))
+    if dossier_cache is None:
+        dossier_cache = DOSSIER_CACHE_DISTANCES
+
+    matrice = None
+    if type_distance == "EUCLIDIENNE" and n > SEUIL_MATRICE_IMPLICITE:
+        matrice = MatriceImplicite(coords, dtype)
+    elif dossier_cache:
+        empreinte = empreinteInstance(probleme, coords)
+        nom_fichier = f"{probleme.name}_{empreinte[:16]}_{type_distance}_{dtype.name}.npy"
+        chemin_cache = os.path.join(dossier_cache, nom_fichier)
+        if os.path.exists(chemin_cache):
+            matrice = np.load(chemin_cache, mmap_mode="r")
+            if matrice.shape != (n, n):
+                matrice = None
+        if matrice is None:
+            matrice = calculerMatriceDistances(coords, type_distance, dtype)
+            os.makedirs(dossier_cache, exist_ok=True)
+            _ecrireAtomique(chemin_cache, lambda f: np.save(f, matrice))
+    else:
+        matrice = calculerMatriceDistances(coords, type_distance, dtype)
 
-    for i in range(n):
-        ni = index_to_node[i]
-        xi, yi = coords[ni]
-        for j in range(n):
-            nj = index_to_node[j]
-            if i == j:
-                matrice[i][j] = 0
-            else:
-                xj, yj = coords[nj]
-                matrice[i][j] = np.sqrt((xi - xj) ** 2 + (yi - yj) ** 2)
+    resultat = (matrice, index_to_node, node_to_index)
+    deja_calculees[cle] = resultat
+    return resultat
 
-    return matrice, index_to_node, node_to_index
 
+# Fonction pour obtenir les k plus proches voisins de chaque noeud (listes de candidats)
+def obtenirListesCandidats(probleme, k=10):
+    """
+    Renvoie, pour chaque noeud, ses k plus proches voisins (lui-même exclu).
 
-# Affichage d'une solution anneau + étoiles
-def afficherSolution(probleme, cycle, stations, methode="solution"):
-    coords = probleme.node_coords
-    pos = {node: (x, y) for node, (x, y) in coords.items()}
-    graphe = nx.Graph()
+    Les listes sont calculées une seule fois par un arbre k-d (scipy cKDTree) sur
+    les coordonnées, en O(n log n) et sans passer par la matrice de distances.
 
-    # Ajout des noeuds
-    for node in coords.keys():
-        graphe.add_node(node)
+    Returns:
+        Tableau (n, k) d'index de la matrice de distances, du plus proche au plus lointain
+    """
+    deja_calculees = _candidats_en_memoire.setdefault(probleme, {})
+    if k in deja_calculees:
+        return deja_calculees[k]
 
-    # Arêtes de l'anneau (métro)
-    edges_metro = []
-    p = len(cycle)
-    for k in range(p):
-        u = cycle[k]
-        v = cycle[(k + 1) % p]
-        graphe.add_edge(u, v)
-        edges_metro.append((u, v))
+    from scipy.spatial import cKDTree
 
-    # Arêtes des étoiles (clients -> station la plus proche)
-    matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
-    clients = [n for n in coords.keys() if n not in stations]
-    edges_etoiles = []
-    for c in clients:
-        i = node_to_index[c]
-        best_station = None
-        best_dist = float("inf")
-        for s in stations:
-            j = node_to_index[s]
-            d = matrice[i][j]
-            if d < best_dist:
-                best_dist = d
-                best_station = s
-        graphe.add_edge(c, best_station)
-        edges_etoiles.append((c, best_station))
-
-    plt.figure(figsize=(12, 10))
-    nx.draw_networkx_nodes(graphe, pos, nodelist=stations, node_color="red", node_size=100)
-    nx.draw_networkx_nodes(graphe, pos, nodelist=clients, node_color="blue", node_size=50)
-    nx.draw_networkx_edges(graphe, pos, edgelist=edges_metro, width=2, edge_color="red", style="solid")
-    nx.draw_networkx_edges(graphe, pos, edgelist=edges_etoiles, width=1, edge_color="gray", style="dotted")
-    nx.draw_networkx_labels(graphe, pos, font_size=8)
-    plt.axis("equal")
-    plt.title(f"Solution {methode} - {probleme.name}")
-    
-    # Créer le dossier img/ s'il n'existe pas
-    os.makedirs("img", exist_ok=True)
-    
-    # Sauvegarder l'image
-    nom_fichier = f"img/Solution_{methode}_{probleme.name}.png"
-    plt.savefig(nom_fichier, dpi=150, bbox_inches='tight')
-    print(f"Schéma sauvegardé : {nom_fichier}")
-    
-    plt.show()
-    plt.close()
+    _, coords = coordonneesInstance(probleme)
+    n = len(coords)
+    k_effectif = min(k, n - 1)
+    if k_effectif <= 0:
+        voisins = np.empty((n, 0), dtype=np.intp)
+    else:
+        # Le premier voisin renvoyé est en principe le noeud lui-même (distance nulle)
+        _, voisins = cKDTree(coords).query(coords, k=k_effectif + 1)
+        voisins = np.asarray(voisins, dtype=np.intp).reshape(n, k_effectif + 1)
+        propres = voisins != np.arange(n)[:, None]
+        # En cas de points confondus, le noeud n'est pas forcément en première colonne
+        voisins = np.array([ligne[garde][:k_effectif] for ligne, garde in zip(voisins, propres)], dtype=np.intp)
+
+    deja_calculees[k] = voisins
+    return voisins
+
+
+# Fonction pour rattacher chaque noeud à sa station la plus proche (arbre k-d sur les stations)
+def affectationPlusProches(probleme, stations):
+    """
+    Station la plus proche de chaque noeud, pour la distance euclidienne.
+
+    Un arbre k-d est construit sur les seules stations, puis tous les noeuds sont
+    interrogés en un appel vectorisé : O(n log p) en temps et O(n) en mémoire,
+    sans matrice de distances.
+
+    La dernière affectation calculée pour l'instance est gardée : le coût puis le
+    schéma d'une même solution ne la calculent qu'une fois.
+
+    Returns:
+        (noeuds, plus_proches, distances) : noeuds triés (ordre des index de la matrice),
+        numéro de la station la plus proche de chacun et distance à cette station
+    """
+    from scipy.spatial import cKDTree
+
+    cle = tuple(stations)
+    derniere = _affectations_en_memoire.get(probleme)
+    if derniere is not None and derniere[0] == cle:
+        return derniere[1]
+    noeuds, coords = coordonneesInstance(probleme)
+    stations = np.asarray(cle)
+    idx_stations = np.searchsorted(noeuds, stations)
+    distances, k = cKDTree(coords[idx_stations]).query(coords)
+    resultat = (noeuds, stations[k], distances)
+    _affectations_en_memoire[probleme] = (cle, resultat)
+    return resultat
+
+
+# Fonction pour reprendre l'affectation aux stations déjà calculée pour une solution (ou None)
+def affectationEnMemoire(probleme, stations):
+    """
+    Affectation gardée par le dernier calcul de coût (cout_solution ou
+    affectationPlusProches), si elle porte sur ces stations.
+
+    Returns:
+        Numéro de la station la plus proche de chaque noeud, noeuds dans l'ordre trié
+        (l'argument affectation de afficherSolution), ou None
+    """
+    derniere = _affectations_en_memoire.get(probleme)
+    if derniere is None or derniere[0] != tuple(stations):
+        return None
+    return derniere[1][1]
+
+
+# Coût d'une solution sans matrice de distances (distance euclidienne, grandes instances)
+@chronometrer("cout_solution")
+def cout_solution_kdtree(probleme, cycle, stations):
+    if not stations or not cycle:
+        return float('inf')
+    COMPTEURS["cout"] += 1
+    noeuds, coords = coordonneesInstance(probleme)
+    _, _, distances = affectationPlusProches(probleme, stations)
+    points_anneau = coords[np.searchsorted(noeuds, np.asarray(cycle))]
+    cout_cycle = 0.0
+    if len(cycle) > 1:
+        cout_cycle = float(np.linalg.norm(points_anneau - np.roll(points_anneau, -1, axis=0), axis=1).sum())
+    return cout_cycle + float(distances.sum())
+
+
+# =========================
+# Représentation compacte d'une solution
+# =========================
+class Solution:
+    """
+    Solution anneau + étoiles stockée en tableaux, en index de la matrice de distances.
+
+    est_station est le masque booléen des stations, anneau l'ordre des stations
+    (int32), position la place de chaque station dans l'anneau (-1 pour un client)
+    et cout le coût total en cache (None tant qu'il n'est pas calculé). Les tests
+    d'appartenance et la recherche d'une station dans l'anneau sont en O(1).
+
+    depuis_listes et vers_listes font le lien avec l'API à base de listes de noeuds.
+    """
+
+    __slots__ = ("est_station", "anneau", "position", "cout")
+
+    def __init__(self, n, anneau, cout=None):
+        self.anneau = np.array(anneau, dtype=np.int32)
+        self.est_station = np.zeros(n, dtype=bool)
+        self.est_station[self.anneau] = True
+        self.position = np.full(n, -1, dtype=np.int32)
+        self.position[self.anneau] = np.arange(len(self.anneau), dtype=np.int32)
+        self.cout = cout
+
+    @classmethod
+    def depuis_listes(cls, cycle, stations, node_to_index, cout=None):
+        """Construit une Solution à partir de listes de noeuds (les stations sont celles de l'anneau)."""
+        if len(cycle) != len(stations) or set(cycle) != set(stations):
+            raise ValueError("L'anneau doit passer exactement par les stations")
+        anneau = np.fromiter((node_to_index[u] for u in cycle), dtype=np.int32, count=len(cycle))
+        return cls(len(node_to_index), anneau, cout)
+
+    def vers_listes(self, index_to_node):
+        """Renvoie (cycle, stations) en listes de noeuds."""
+        cycle = [index_to_node[i] for i in self.anneau.tolist()]
+        return cycle, list(cycle)
+
+    @property
+    def p(self):
+        return len(self.anneau)
+
+    def copie(self):
+        autre = Solution.__new__(Solution)
+        autre.est_station = self.est_station.copy()
+        autre.anneau = self.anneau.copy()
+        autre.position = self.position.copy()
+        autre.cout = self.cout
+        return autre
+
+    def evaluer(self, matrice):
+        """Coût total (mis en cache jusqu'à la prochaine modification)."""
+        if self.cout is None:
+            self.cout = _cout_indices(matrice, self.anneau, np.flatnonzero(self.est_station))
+        return self.cout
+
+    def _renumeroter(self, debut=0):
+        # Positions à jour à partir de l'indice debut de l'anneau
+        self.position[self.anneau[debut:]] = np.arange(debut, len(self.anneau), dtype=np.int32)
+
+    def reordonner(self, ordre):
+        """Remplace l'anneau par anneau[ordre] (même ensemble de stations)."""
+        self.anneau = self.anneau[np.asarray(ordre, dtype=np.intp)]
+        self._renumeroter()
+        self.cout = None
+
+    def inserer(self, apres, i):
+        """Ouvre la station i et l'insère dans l'anneau après la position apres."""
+        self.anneau = np.insert(self.anneau, apres + 1, i)
+        self.est_station[i] = True
+        self._renumeroter(apres + 1)
+        self.cout = None
+
+    def retirer(self, pos):
+        """Ferme la station en position pos en raccordant ses deux voisins."""
+        i = self.anneau[pos]
+        self.anneau = np.delete(self.anneau, pos)
+        self.est_station[i] = False
+        self.position[i] = -1
+        self._renumeroter(pos)
+        self.cout = None
+
+    def remplacer_anneau(self, anneau):
+        """Remplace l'anneau et l'ensemble des stations."""
+        self.est_station[self.anneau] = False
+        self.position[self.anneau] = -1
+        self.anneau = np.array(anneau, dtype=np.int32)
+        self.est_station[self.anneau] = True
+        self._renumeroter()
+        self.cout = None
+
+    def echanger(self, pos_s, i_c, apres):
+        """Ferme la station en position pos_s et ouvre i_c après la position apres de l'anneau privé de s."""
+        self.retirer(pos_s)
+        self.inserer(apres, i_c)
+
+
+# Coût d'une solution donnée en index : anneau + chaque noeud vers sa station la plus proche.
+# Avec avec_affectation, renvoie (coût, index de la station la plus proche, distances)
+@chronometrer("cout_solution")
+def _cout_indices(matrice, idx_cycle, idx_stations, avec_affectation=False):
+    if len(idx_stations) == 0 or len(idx_cycle) == 0:
+        return (float('inf'), None, None) if avec_affectation else float('inf')
+    COMPTEURS["cout"] += 1
+    idx_cycle = np.asarray(idx_cycle, dtype=np.intp)
+    idx_stations = np.asarray(idx_stations, dtype=np.intp)
+    cout_cycle = _longueur_anneau(matrice, idx_cycle)
+    # Une station est à distance nulle d'elle-même : le minimum par ligne vaut 0 pour
+    # les stations et la distance à la station la plus proche pour les clients
+    cout_etoiles = 0.0
+    n = matrice.shape[0]
+    if avec_affectation:
+        plus_proches = np.empty(n, dtype=np.intp)
+        distances = np.empty(n, dtype=matrice.dtype)
+    pas = max(1, (1 << 22) // len(idx_stations))
+    for debut in range(0, n, pas):
+        sous = matrice[debut:debut + pas, idx_stations]
+        if avec_affectation:
+            k = sous.argmin(axis=1)
+            plus_proches[debut:debut + pas] = idx_stations[k]
+            distances[debut:debut + pas] = np.take_along_axis(sous, k[:, None], axis=1)[:, 0]
+            cout_etoiles += float(distances[debut:debut + pas].sum())
+        else:
+            cout_etoiles += float(sous.min(axis=1).sum())
+    if avec_affectation:
+        return cout_cycle + cout_etoiles, plus_proches, distances
+    return cout_cycle + cout_etoiles
+
+
+# Départ fourni sous forme de Solution ou de couple (cycle, stations), ramené en listes
+def _listes_depart(depart, index_to_node):
+    if isinstance(depart, Solution):
+        return depart.vers_listes(index_to_node)
+    return list(depart[0]), list(depart[1])
 
 
 # =========================
 # Brique B : heuristique rapide
 # =========================
 def choisirStations_aleatoire(probleme, p):
-    noeuds = list(probleme.node_coords.keys())
+    noeuds, _ = coordonneesInstance(probleme)
     return random.sample(noeuds, p)
 
 
+# Fonction pour choisir p stations par k-means++ suivi de quelques itérations de Lloyd
+def choisirStations_kmeans(probleme, p, n_iterations=10):
+    """
+    Centres tirés par k-means++ sur le tableau des coordonnées, affinés par Lloyd
+    (affectation par arbre k-d), puis ramenés chacun au noeud le plus proche.
+    Les stations couvrent ainsi les amas de clients : les étoiles sont courtes dès le départ.
+    """
+    from scipy.spatial import cKDTree
+
+    noeuds, coords = coordonneesInstance(probleme)
+    n = len(noeuds)
+    p = min(p, n)
+    # Graine tirée du module random pour que random.seed reste le seul réglage
+    rng = np.random.default_rng(random.getrandbits(32))
+
+    centres = np.empty((p, 2))
+    centres[0] = coords[rng.integers(n)]
+    d2 = ((coords - centres[0]) ** 2).sum(axis=1)
+    for k in range(1, p):
+        total = d2.sum()
+        i = rng.choice(n, p=d2 / total) if total > 0 else rng.integers(n)
+        centres[k] = coords[i]
+        d2 = np.minimum(d2, ((coords - centres[k]) ** 2).sum(axis=1))
+
+    for _ in range(n_iterations):
+        _, etiquettes = cKDTree(centres).query(coords)
+        effectifs = np.bincount(etiquettes, minlength=p)
+        sommes = np.zeros((p, 2))
+        np.add.at(sommes, etiquettes, coords)
+        nouveaux = centres.copy()
+        non_vides = effectifs > 0
+        nouveaux[non_vides] = sommes[non_vides] / effectifs[non_vides, None]
+        if np.allclose(nouveaux, centres):
+            break
+        centres = nouveaux
+
+    # Noeud le plus proche de chaque centre, sans prendre deux fois le même
+    _, proches = cKDTree(coords).query(centres, k=min(n, 8))
+    proches = np.asarray(proches).reshape(p, -1)
+    pris = np.zeros(n, dtype=bool)
+    for k in range(p):
+        libres = proches[k][~pris[proches[k]]]
+        i = libres[0] if len(libres) else rng.choice(np.flatnonzero(~pris))
+        pris[i] = True
+    return [noeuds[i] for i in np.flatnonzero(pris)]
+
+
+# Fonction pour choisir p stations par p-médiane gloutonne tenant compte de l'anneau
+def choisirStations_glouton(probleme, p):
+    # Ajout à chaque étape de la station qui augmente le moins étoiles + anneau (GRASP sans hasard)
+    _, index_to_node, _ = obtenirMatriceDistances(probleme)
+    rng = np.random.default_rng(random.getrandbits(32))
+    solution = construction_grasp(probleme, p, rng, alpha=0.0)
+    return [index_to_node[i] for i in solution.anneau.tolist()]
+
+
+# Stratégies de choix des stations de départ de heuristique_rapide
+STRATEGIES_INITIALISATION = {
+    "aleatoire": choisirStations_aleatoire,
+    "kmeans": choisirStations_kmeans,
+    "glouton": choisirStations_glouton,
+}
+
+
 def tsp_plus_proche_voisin(matrice, stations, node_to_index):
-    non_visites = set(stations)
-    courant = stations[0]
-    cycle = [courant]
-    non_visites.remove(courant)
-
-    while non_visites:
-        i = node_to_index[courant]
-        meilleur = None
-        best_dist = float("inf")
-        for s in non_visites:
-            j = node_to_index[s]
-            d = matrice[i][j]
-            if d < best_dist:
-                best_dist = d
-                meilleur = s
-        cycle.append(meilleur)
-        non_visites.remove(meilleur)
-        courant = meilleur
-
-    return cycle
-
-
-def heuristique_rapide(probleme, p):
-    matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
-    stations = choisirStations_aleatoire(probleme, p)
-    cycle = tsp_plus_proche_voisin(matrice, stations, node_to_index)
-    return cycle, stations
+    idx = np.fromiter((node_to_index[s] for s in stations), dtype=np.intp, count=len(stations))
+    noeud = dict(zip(idx.tolist(), stations))
+    return [noeud[i] for i in anneau_plus_proche_voisin(matrice, idx).tolist()]
+
+
+# Anneau au plus proche voisin, en index de la matrice (part de la première station)
+@chronometrer("anneau_plus_proche_voisin")
+def anneau_plus_proche_voisin(matrice, idx_stations):
+    COMPTEURS["reconstructions_anneau"] += 1
+    idx = np.asarray(idx_stations, dtype=np.intp)
+    p = len(idx)
+    if p == 0:
+        return np.empty(0, dtype=np.int32)
+    dist = np.asarray(matrice[np.ix_(idx, idx)], dtype=np.float64).tolist()
+    restants = list(range(1, p))
+    ordre = [0]
+    while restants:
+        courant = min(restants, key=dist[ordre[-1]].__getitem__)
+        restants.remove(courant)
+        ordre.append(courant)
+    return idx[ordre].astype(np.int32)
+
+
+# Listes des k plus proches voisins (en positions locales 0..p-1) de chaque station de l'anneau
+def voisins_anneau(matrice, idx_cycle, k_voisins):
+    p = len(idx_cycle)
+    k = min(k_voisins, p - 1)
+    voisins = np.empty((p, k), dtype=np.intp)
+    pas = max(1, (1 << 22) // p)
+    for debut in range(0, p, pas):
+        lignes = np.arange(debut, min(p, debut + pas))
+        sous = np.array(matrice[np.ix_(idx_cycle[lignes], idx_cycle)], dtype=np.float64)
+        sous[np.arange(len(lignes)), lignes] = np.inf
+        proches = np.argpartition(sous, k - 1, axis=1)[:, :k]
+        ordre = np.argsort(np.take_along_axis(sous, proches, axis=1), axis=1, kind="stable")
+        voisins[lignes] = np.take_along_axis(proches, ordre, axis=1)
+    return voisins
+
+
+def _inverser_segment(ordre, pos, i, j):
+    # Inverse le segment de positions i..j (sens direct, cyclique), ou son complémentaire s'il est plus court
+    p = len(ordre)
+    longueur = (j - i) % p + 1
+    if 2 * longueur > p:
+        i, j = (j + 1) % p, (i - 1) % p
+        longueur = p - longueur
+    for _ in range(longueur // 2):
+        a = ordre[i]
+        b = ordre[j]
+        ordre[i] = b
+        pos[b] = i
+        ordre[j] = a
+        pos[a] = j
+        i = (i + 1) % p
+        j = (j - 1) % p
+
+
+def optimiser_anneau(matrice, cycle, node_to_index, k_voisins=10, or_opt=True, epsilon=1e-9):
+    """
+    Améliore l'anneau par 2-opt et Or-opt jusqu'à un optimum local.
 
-# Wrapper pour l'optimisation sur p avec heuristique rapide
-def heuristique_rapide_optimisee(probleme, n_max_tests=None):
-    """Heuristique rapide avec optimisation du nombre de stations p"""
-    def methode(prob, p_val):
-        return heuristique_rapide(prob, p_val)
-    
-    return optimiserNombreStations(probleme, methode, n_max_tests)
+    Le tour est stocké en tableaux (ordre et position de chaque station). Les
+    mouvements ne sont cherchés que parmi les k plus proches voisins de chaque
+    station, et des bits "don't look" évitent de réexaminer les stations dont
+    l'entourage n'a pas changé : chaque passe est quasi linéaire en p.
 
-# Wrapper pour l'optimisation sur p avec amélioration locale
-def amelioration_locale_optimisee(probleme, n_max_tests=None, max_iter=100):
-    """Amélioration locale avec optimisation du nombre de stations p"""
-    def methode(prob, p_val):
-        # On part d'une heuristique rapide pour cette valeur de p
-        cycle_init, stations_init = heuristique_rapide(prob, p_val)
-        cycle, stations, cout = amelioration_locale(prob, p_val, cycle_init, stations_init, max_iter)
-        return cycle, stations, cout
-    
-    return optimiserNombreStations(probleme, methode, n_max_tests)
+    Args:
+        matrice: Matrice de distances
+        cycle: Anneau (liste de noeuds)
+        node_to_index: Dictionnaire noeud -> index de la matrice
+        k_voisins: Taille des listes de voisins candidats
+        or_opt: Active les déplacements de segments de 1 à 3 stations
 
-# Wrapper pour l'optimisation sur p avec méthode exacte
-def methode_exacte_optimisee(probleme, n_max_tests=10):
+    Returns:
+        Le nouvel anneau (liste de noeuds)
     """
-    Méthode exacte avec optimisation du nombre de stations p.
-    Par défaut, limite à 10 tests car la méthode exacte est très lente.
+    idx_cycle = np.fromiter((node_to_index[u] for u in cycle), dtype=np.intp, count=len(cycle))
+    ordre = ordre_anneau_optimise(matrice, idx_cycle, k_voisins, or_opt, epsilon)
+    return [cycle[v] for v in ordre]
+
+
+# 2-opt / Or-opt sur un anneau donné en index : renvoie l'ordre des positions de l'anneau amélioré
+@chronometrer("optimisation_anneau")
+def ordre_anneau_optimise(matrice, idx_cycle, k_voisins=10, or_opt=True, epsilon=1e-9):
+    p = len(idx_cycle)
+    if p < 4:
+        return list(range(p))
+
+    idx_cycle = np.asarray(idx_cycle, dtype=np.intp)
+    voisins = voisins_anneau(matrice, idx_cycle, k_voisins).tolist()
+    # Distances en local pour éviter l'indexation de la matrice complète dans la boucle
+    sous = matrice[np.ix_(idx_cycle, idx_cycle)]
+    dist = np.asarray(sous, dtype=np.float64).tolist()
+
+    ordre = list(range(p))
+    pos = list(range(p))
+    a_examiner = [True] * p
+    file = list(range(p))
+
+    while file:
+        a = file.pop()
+        if not a_examiner[a]:
+            continue
+        a_examiner[a] = False
+        amelioration = False
+        da = dist[a]
+
+        # 2-opt : on remplace (a, succ a) et (c, succ c) par (a, c) et (succ a, succ c),
+        # puis la même chose du côté des prédécesseurs
+        for sens in (1, -1):
+            b = ordre[(pos[a] + sens) % p]
+            d_ab = da[b]
+            for c in voisins[a]:
+                g1 = d_ab - da[c]
+                if g1 <= epsilon:
+                    break
+                d = ordre[(pos[c] + sens) % p]
+                if d == a or c == b:
+                    continue
+                gain = g1 + dist[c][d] - dist[b][d]
+                if gain > epsilon:
+                    if sens == 1:
+                        _inverser_segment(ordre, pos, pos[b], pos[c])
+                    else:
+                        _inverser_segment(ordre, pos, pos[c], pos[b])
+                    for v in (a, b, c, d):
+                        if not a_examiner[v]:
+                            a_examiner[v] = True
+                            file.append(v)
+                    amelioration = True
+                    break
+            if amelioration:
+                break
+
+        # Or-opt : déplacement d'un segment de 1 à 3 stations commençant en a,
+        # inséré (éventuellement retourné) entre un voisin c et son successeur
+        if not amelioration and or_opt:
+            i = pos[a]
+            for longueur in (1, 2, 3):
+                if longueur > p - 3:
+                    break
+                segment = [ordre[(i + k) % p] for k in range(longueur)]
+                s1 = segment[0]
+                sl = segment[-1]
+                prec = ordre[(i - 1) % p]
+                suiv = ordre[(i + longueur) % p]
+                g_retrait = dist[prec][s1] + dist[sl][suiv] - dist[prec][suiv]
+                if g_retrait <= epsilon:
+                    continue
+                meilleur = None
+                for extremite in (s1, sl):
+                    for c in voisins[extremite]:
+                        if c in segment:
+                            continue
+                        for d in (ordre[(pos[c] + 1) % p], ordre[(pos[c] - 1) % p]):
+                            if d in segment:
+                                continue
+                            # Insertion entre c et d, extrémité voisine de c
+                            autre = sl if extremite == s1 else s1
+                            gain = g_retrait - (dist[c][extremite] + dist[autre][d] - dist[c][d])
+                            if gain > epsilon and (meilleur is None or gain > meilleur[0]):
+                                meilleur = (gain, c, d, extremite)
+                if meilleur is None:
+                    continue
+                _, c, d, extremite = meilleur
+                reste = [v for v in ordre if v not in segment]
+                j = reste.index(c)
+                bloc = segment if extremite == s1 else segment[::-1]
+                # On insère le bloc du côté de d, en gardant extremite collée à c
+                if reste[(j + 1) % len(reste)] == d:
+                    ordre = reste[:j + 1] + bloc + reste[j + 1:]
+                else:
+                    ordre = reste[:j] + bloc[::-1] + reste[j:]
+                for k, v in enumerate(ordre):
+                    pos[v] = k
+                for v in segment + [prec, suiv, c, d]:
+                    if not a_examiner[v]:
+                        a_examiner[v] = True
+                        file.append(v)
+                amelioration = True
+                break
+
+        if amelioration and not a_examiner[a]:
+            a_examiner[a] = True
+            file.append(a)
+
+    return ordre
+
+
+def heuristique_rapide(probleme, p, ameliorer_anneau=True, depart=None, initialisation="aleatoire"):
     """
-    def methode(prob, p_val):
-        return methode_exacte(prob, p_val)
-    
-    # Pour la méthode exacte, on limite le nombre de tests par défaut
-    n = len(probleme.node_coords)
-    if n_max_tests is None:
-        n_max_tests = min(10, n - 2)  # Maximum 10 tests ou n-2 si plus petit
-    
-    return optimiserNombreStations(probleme, methode, n_max_tests)
+    Stations choisies selon la stratégie initialisation, anneau au plus proche voisin
+    puis amélioré par 2-opt / Or-opt.
+
+    Args:
+        initialisation: "aleatoire" (tirage uniforme), "kmeans" (k-means++ et Lloyd sur
+            les coordonnées) ou "glouton" (p-médiane gloutonne, étoiles + anneau)
+    """
+    _, index_to_node, _ = obtenirMatriceDistances(probleme)
+    solution = solution_heuristique_rapide(probleme, p, ameliorer_anneau, depart, initialisation)
+    return solution.vers_listes(index_to_node)
+
+
+# Même heuristique, résultat sous forme de Solution
+def solution_heuristique_rapide(probleme, p, ameliorer_anneau=True, depart=None, initialisation="aleatoire"):
+    if initialisation not in STRATEGIES_INITIALISATION:
+        raise ValueError(f"Initialisation inconnue : {initialisation}")
+    matrice, _, node_to_index = obtenirMatriceDistances(probleme)
+    if isinstance(depart, Solution):
+        solution = depart.copie()
+    elif depart is not None:
+        # Départ à chaud : on reprend l'anneau et les stations fournis
+        solution = Solution.depuis_listes(depart[0], depart[1], node_to_index)
+    else:
+        stations = STRATEGIES_INITIALISATION[initialisation](probleme, p)
+        idx = np.fromiter((node_to_index[s] for s in stations), dtype=np.intp, count=len(stations))
+        solution = Solution(len(node_to_index), anneau_plus_proche_voisin(matrice, idx))
+    if ameliorer_anneau:
+        solution.reordonner(ordre_anneau_optimise(matrice, solution.anneau))
+    return solution
 
+# Wrapper pour l'optimisation sur p avec heuristique rapide
+def heuristique_rapide_optimisee(probleme, n_max_tests=None, n_workers=1, strategie="exhaustive",
+                                 initialisation="aleatoire", budget=None, arret=None, progression=None,
+                                 verbeux=True):
+    """Heuristique rapide avec optimisation du nombre de stations p (budget, arret, progression :
+    voir optimiserNombreStations)"""
+    methode = functools.partial(heuristique_rapide, initialisation=initialisation)
+    return optimiserNombreStations(probleme, methode, n_max_tests, n_workers=n_workers, strategie=strategie,
+                                   verbeux=verbeux, budget=budget, arret=arret, progression=progression)
+
+# Heuristique rapide suivie de l'amélioration locale, pour une valeur de p
+# (fonction de module pour pouvoir être envoyée aux processus du balayage parallèle)
+def heuristique_puis_amelioration(prob, p_val, max_iter=100, depart=None, initialisation="aleatoire",
+                                  echeance=None):
+    # On part d'une heuristique rapide pour cette valeur de p (ou du départ à chaud fourni)
+    cycle_init, stations_init = heuristique_rapide(prob, p_val, depart=depart, initialisation=initialisation)
+    cycle, stations, cout = amelioration_locale(prob, p_val, cycle_init, stations_init, max_iter,
+                                                echeance=echeance)
+    return cycle, stations, cout
+
+# Wrapper pour l'optimisation sur p avec amélioration locale
+def amelioration_locale_optimisee(probleme, n_max_tests=None, max_iter=100, n_workers=1, strategie="exhaustive",
+                                  verbeux=True, initialisation="aleatoire", budget=None, arret=None, progression=None):
+    """Amélioration locale avec optimisation du nombre de stations p (budget, arret, progression :
+    voir optimiserNombreStations ; la descente en cours s'arrête aussi à l'échéance)"""
+    methode = functools.partial(heuristique_puis_amelioration, max_iter=max_iter, initialisation=initialisation)
+    return optimiserNombreStations(probleme, methode, n_max_tests, n_workers=n_workers, strategie=strategie,
+                                   verbeux=verbeux, budget=budget, arret=arret, progression=progression)
 
 # =========================
 # Brique C : amélioration locale
 # =========================
-def cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index):
+def cout_anneau(matrice, cycle, node_to_index):
+    idx = np.fromiter((node_to_index[u] for u in cycle), dtype=np.intp, count=len(cycle))
+    return _longueur_anneau(matrice, idx)
+
+
+# Longueur d'un anneau donné en index de la matrice
+def _longueur_anneau(matrice, idx_cycle):
+    if len(idx_cycle) < 2:
+        return 0.0
+    idx = np.asarray(idx_cycle, dtype=np.intp)
+    return float(matrice[idx[:-1], idx[1:]].sum() + matrice[idx[-1], idx[0]])
+
+
+def cout_solution(probleme, cycle, stations, matrice=None, index_to_node=None, node_to_index=None):
+    # Sans matrice, les étoiles sont évaluées par arbre k-d (distance euclidienne)
+    if matrice is None:
+        return cout_solution_kdtree(probleme, cycle, stations)
     if not stations or not cycle:
         return float('inf')
-    
-    cout_anneau = 0.0
-    p = len(cycle)
-    for k in range(p):
-        u = cycle[k]
-        v = cycle[(k + 1) % p]
-        cout_anneau += matrice[node_to_index[u]][node_to_index[v]]
 
-    coords = probleme.node_coords
-    clients = [n for n in coords if n not in stations]
-    cout_etoiles = 0.0
-    for c in clients:
-        i = node_to_index[c]
-        best = min(matrice[i][node_to_index[s]] for s in stations)
-        cout_etoiles += best
+    idx_cycle = np.fromiter((node_to_index[u] for u in cycle), dtype=np.intp, count=len(cycle))
+    idx_stations = np.fromiter((node_to_index[s] for s in stations), dtype=np.intp, count=len(stations))
+    # La station la plus proche de chaque noeud est gardée (affectationEnMemoire) : le
+    # schéma de la solution n'a pas à la recalculer
+    cout, plus_proches, distances = _cout_indices(matrice, idx_cycle, idx_stations, avec_affectation=True)
+    n = matrice.shape[0]
+    noeuds = np.fromiter((index_to_node[i] for i in range(n)), dtype=np.int64, count=n)
+    _affectations_en_memoire[probleme] = (tuple(stations), (noeuds, noeuds[plus_proches], distances))
+    return cout
 
-    return cout_anneau + cout_etoiles
 
+class AffectationEtoiles:
+    """
+    Station la plus proche et deuxième plus proche de chaque noeud.
 
-def amelioration_locale(probleme, p, cycle_init, stations_init, max_iter=100):
+    Tout est stocké en index de la matrice de distances. Une station est sa propre
+    station la plus proche (distance nulle), ce qui permet d'évaluer le coût des
+    étoiles après l'échange "fermer s, ouvrir c" en O(n), sans tout recalculer.
+    """
+
+    def __init__(self, matrice, indices_stations):
+        self.matrice = matrice
+        n = matrice.shape[0]
+        self.est_station = np.zeros(n, dtype=bool)
+        self.est_station[np.asarray(indices_stations, dtype=np.intp)] = True
+        self.plus_proche = np.empty(n, dtype=np.intp)
+        self.second = np.empty(n, dtype=np.intp)
+        self.d1 = np.empty(n, dtype=np.float64)
+        self.d2 = np.empty(n, dtype=np.float64)
+        self._recalculer(np.arange(n))
+        self.cout = float(self.d1.sum())
+
+    def _recalculer(self, lignes):
+        # Plus proche et deuxième plus proche station pour les lignes données, par blocs
+        # de lignes pour que la sous-matrice lignes × stations reste de taille bornée
+        stations = np.flatnonzero(self.est_station)
+        pas = max(1, (1 << 22) // max(1, len(stations)))
+        for debut in range(0, len(lignes), pas):
+            self._recalculer_bloc(lignes[debut:debut + pas], stations)
+
+    def _recalculer_bloc(self, lignes, stations):
+        sous = self.matrice[np.ix_(lignes, stations)]
+        if len(stations) == 1:
+            self.plus_proche[lignes] = stations[0]
+            self.d1[lignes] = sous[:, 0]
+            self.second[lignes] = -1
+            self.d2[lignes] = np.inf
+            return
+        deux = np.argpartition(sous, 1, axis=1)[:, :2]
+        dist = np.take_along_axis(sous, deux, axis=1)
+        ordre = np.argsort(dist, axis=1, kind="stable")
+        deux = np.take_along_axis(deux, ordre, axis=1)
+        dist = np.take_along_axis(dist, ordre, axis=1)
+        self.plus_proche[lignes] = stations[deux[:, 0]]
+        self.second[lignes] = stations[deux[:, 1]]
+        self.d1[lignes] = dist[:, 0]
+        self.d2[lignes] = dist[:, 1]
+
+    def deltas_echange(self, s, candidats):
+        """Variation du coût des étoiles pour chaque échange (fermer s, ouvrir c)."""
+        candidats = np.asarray(candidats, dtype=np.intp)
+        COMPTEURS["delta"] += len(candidats)
+        # Coût de chaque noeud une fois s fermée, avant l'ouverture de c
+        base = np.where(self.plus_proche == s, self.d2, self.d1)
+        deltas = np.empty(len(candidats), dtype=np.float64)
+        pas = max(1, (1 << 22) // len(base))
+        for debut in range(0, len(candidats), pas):
+            bloc = candidats[debut:debut + pas]
+            nouveau = np.minimum(base[:, None], self.matrice[:, bloc])
+            deltas[debut:debut + pas] = nouveau.sum(axis=0)
+        return deltas - self.cout
+
+    def deltas_ajout(self, candidats):
+        """Variation du coût des étoiles pour chaque ouverture d'une station c."""
+        candidats = np.asarray(candidats, dtype=np.intp)
+        COMPTEURS["delta"] += len(candidats)
+        deltas = np.empty(len(candidats), dtype=np.float64)
+        pas = max(1, (1 << 22) // len(self.d1))
+        for debut in range(0, len(candidats), pas):
+            bloc = candidats[debut:debut + pas]
+            deltas[debut:debut + pas] = np.minimum(self.d1[:, None], self.matrice[:, bloc]).sum(axis=0)
+        return deltas - self.cout
+
+    def deltas_retrait(self, stations):
+        """Variation du coût des étoiles pour chaque fermeture d'une station s."""
+        # Les noeuds rattachés à s passent sur leur deuxième station la plus proche
+        COMPTEURS["delta"] += len(stations)
+        pertes = np.bincount(self.plus_proche, weights=self.d2 - self.d1, minlength=len(self.d1))
+        return pertes[np.asarray(stations, dtype=np.intp)]
+
+    def _ouvrir(self, c, lignes):
+        # Ouverture de c : seul le classement des lignes données peut changer
+        d_c = np.asarray(self.matrice[:, c], dtype=np.float64)
+        premier = lignes & (d_c < self.d1)
+        deuxieme = lignes & ~premier & (d_c < self.d2)
+        self.second[premier] = self.plus_proche[premier]
+        self.d2[premier] = self.d1[premier]
+        self.plus_proche[premier] = c
+        self.d1[premier] = d_c[premier]
+        self.second[deuxieme] = c
+        self.d2[deuxieme] = d_c[deuxieme]
+
+    def appliquer_ajout(self, c):
+        """Met à jour l'affectation en place après l'ouverture de c."""
+        self.est_station[c] = True
+        self._ouvrir(c, np.ones(len(self.d1), dtype=bool))
+        self.cout = float(self.d1.sum())
+
+    def appliquer_retrait(self, s):
+        """Met à jour l'affectation en place après la fermeture de s."""
+        self.est_station[s] = False
+        touches = (self.plus_proche == s) | (self.second == s)
+        self._recalculer(np.flatnonzero(touches))
+        self.cout = float(self.d1.sum())
+
+    def appliquer_echange(self, s, c):
+        """Met à jour l'affectation en place après l'échange (fermer s, ouvrir c)."""
+        self.est_station[s] = False
+        self.est_station[c] = True
+
+        # Les noeuds qui dépendaient de s sont recalculés entièrement,
+        # pour les autres seule l'ouverture de c peut changer le classement
+        touches = (self.plus_proche == s) | (self.second == s)
+        self._ouvrir(c, ~touches)
+        self._recalculer(np.flatnonzero(touches))
+        self.cout = float(self.d1.sum())
+
+
+def deltas_insertion_anneau(matrice, idx_cycle, candidats):
+    """
+    Surcoût de l'insertion de chaque candidat à sa position la moins chère dans l'anneau.
+
+    Returns:
+        (deltas, positions) où positions[k] est l'indice de l'anneau après lequel
+        insérer le candidat k
+    """
+    candidats = np.asarray(candidats, dtype=np.intp)
+    if len(idx_cycle) == 0:
+        return np.zeros(len(candidats)), np.zeros(len(candidats), dtype=np.intp)
+
+    apres = np.roll(idx_cycle, -1)
+    longueurs = matrice[idx_cycle, apres]
+    deltas = np.empty(len(candidats), dtype=np.float64)
+    positions = np.empty(len(candidats), dtype=np.intp)
+    pas = max(1, (1 << 22) // len(idx_cycle))
+    for debut in range(0, len(candidats), pas):
+        bloc = candidats[debut:debut + pas]
+        surcouts = matrice[np.ix_(idx_cycle, bloc)] + matrice[np.ix_(apres, bloc)] - longueurs[:, None]
+        meilleures = surcouts.argmin(axis=0)
+        positions[debut:debut + pas] = meilleures
+        deltas[debut:debut + pas] = surcouts[meilleures, np.arange(len(bloc))]
+    return deltas, positions
+
+
+def delta_retrait_anneau(matrice, idx_cycle, pos_s):
+    # Retrait de la station en position pos_s par raccordement de ses deux voisins
+    p = len(idx_cycle)
+    if p <= 2:
+        return -float(matrice[idx_cycle, np.roll(idx_cycle, -1)].sum())
+    s = idx_cycle[pos_s]
+    prec = idx_cycle[pos_s - 1]
+    suiv = idx_cycle[(pos_s + 1) % p]
+    return float(matrice[prec, suiv] - matrice[prec, s] - matrice[s, suiv])
+
+
+def deltas_anneau_echange(matrice, idx_cycle, pos_s, candidats):
+    """
+    Variation du coût de l'anneau pour chaque échange (fermer s, ouvrir c).
+
+    La station en position pos_s est retirée par raccordement de ses deux voisins,
+    puis chaque candidat est inséré à sa position la moins chère : O(p) par candidat.
+
+    Returns:
+        (deltas, positions) où positions[k] est l'indice, dans l'anneau privé de s,
+        après lequel insérer le candidat k
+    """
+    candidats = np.asarray(candidats, dtype=np.intp)
+    if len(idx_cycle) == 1:
+        return np.zeros(len(candidats)), np.zeros(len(candidats), dtype=np.intp)
+
+    delta_retrait = delta_retrait_anneau(matrice, idx_cycle, pos_s)
+    deltas, positions = deltas_insertion_anneau(matrice, np.delete(idx_cycle, pos_s), candidats)
+    return deltas + delta_retrait, positions
+
+
+def ajuster_nombre_stations(probleme, cycle, stations, p_cible, echeance=None):
+    """
+    Amène une solution à p_cible stations en ouvrant ou en fermant une station à la fois.
+
+    À chaque étape on choisit, parmi toutes les ouvertures (insertion la moins chère
+    dans l'anneau) ou toutes les fermetures (raccordement de l'anneau), celle qui
+    dégrade le moins le coût total. Sert de départ à chaud pour une valeur voisine de p.
+
+    Returns:
+        (cycle, stations) avec p_cible stations, ou None si l'échéance est atteinte avant
+    """
     matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
-    cycle = cycle_init[:]
-    stations = stations_init[:]
-    cout_actuel = cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index)
+    cycle = list(cycle)
+    stations = list(stations)
+    etoiles = AffectationEtoiles(matrice, [node_to_index[s] for s in stations])
+
+    while len(stations) < p_cible:
+        if echeanceDepassee(echeance):
+            return None
+        candidats = np.flatnonzero(~etoiles.est_station)
+        idx_cycle = np.array([node_to_index[u] for u in cycle], dtype=np.intp)
+        deltas_anneau, positions = deltas_insertion_anneau(matrice, idx_cycle, candidats)
+        k = int(np.argmin(etoiles.deltas_ajout(candidats) + deltas_anneau))
+        c = index_to_node[candidats[k]]
+        cycle.insert(positions[k] + 1, c)
+        stations.append(c)
+        etoiles.appliquer_ajout(candidats[k])
+
+    while len(stations) > max(p_cible, 1):
+        if echeanceDepassee(echeance):
+            return None
+        idx_cycle = np.array([node_to_index[u] for u in cycle], dtype=np.intp)
+        deltas = etoiles.deltas_retrait(idx_cycle) + np.array(
+            [delta_retrait_anneau(matrice, idx_cycle, k) for k in range(len(idx_cycle))]
+        )
+        k = int(np.argmin(deltas))
+        s = cycle.pop(k)
+        stations.remove(s)
+        etoiles.appliquer_retrait(idx_cycle[k])
+
+    return cycle, stations
 
-    coords = probleme.node_coords
-    tous = list(coords.keys())
+
+# Au-delà de ce nombre de noeuds, voisinage="auto" restreint les échanges aux listes de candidats
+SEUIL_VOISINAGE_GRANULAIRE = 1000
+
+# Nombre d'ensembles de stations gardés par le mémo des anneaux de chaque instance
+TAILLE_MEMO_ANNEAUX = 10000
+# Nombre total de stations gardées par un mémo (borne la mémoire quand p est grand)
+TAILLE_MEMO_STATIONS = 2_000_000
+
+# Mémos des anneaux, rattachés à l'objet probleme : un par usage ("optimise" : anneau
+# 2-opt / Or-opt d'un ensemble de stations, "plus_proche_voisin" : anneau reconstruit
+# par le mode_anneau="reconstruction")
+_memos_anneaux = weakref.WeakKeyDictionary()
+
+
+class MemoAnneaux:
+    """
+    Mémo LRU borné : ensemble de stations -> (anneau, longueur de l'anneau).
+
+    Un ensemble de stations déjà rencontré (retour en arrière, nouvelle descente ou
+    nouveau départ sur la même instance) n'a pas besoin d'un nouvel anneau. La clé
+    est un hachage de Zobrist, XOR d'une valeur aléatoire de 64 bits par noeud, mis
+    à jour en O(1) quand une station est remplacée ; l'ensemble est gardé avec
+    l'anneau et comparé à la lecture, une collision n'est donc jamais prise pour un
+    succès.
+    """
+
+    def __init__(self, n, capacite=TAILLE_MEMO_ANNEAUX, capacite_stations=TAILLE_MEMO_STATIONS):
+        # Générateur dédié : le mémo ne consomme pas l'aléa du module random
+        generateur = random.Random(n)
+        self.valeurs = [generateur.getrandbits(64) for _ in range(n)]
+        self.capacite = capacite
+        self.capacite_stations = capacite_stations
+        self._entrees = OrderedDict()
+        self._stations_gardees = 0
+
+    def cle(self, idx_stations):
+        cle = 0
+        for i in idx_stations.tolist():
+            cle ^= self.valeurs[i]
+        return cle
+
+    def obtenir(self, cle, stations):
+        """(anneau, longueur) gardé pour l'ensemble stations (frozenset), ou None."""
+        entree = self._entrees.get(cle)
+        if entree is None or entree[0] != stations:
+            COMPTEURS["memo_anneaux_echecs"] += 1
+            return None
+        COMPTEURS["memo_anneaux_succes"] += 1
+        self._entrees.move_to_end(cle)
+        return entree[1], entree[2]
+
+    def enregistrer(self, cle, stations, anneau, longueur):
+        ancienne = self._entrees.pop(cle, None)
+        if ancienne is not None:
+            self._stations_gardees -= len(ancienne[0])
+        self._entrees[cle] = (stations, anneau, longueur)
+        self._stations_gardees += len(stations)
+        while len(self._entrees) > 1 and (len(self._entrees) > self.capacite
+                                          or self._stations_gardees > self.capacite_stations):
+            self._stations_gardees -= len(self._entrees.popitem(last=False)[1][0])
+
+
+# Fonction pour obtenir le mémo des anneaux d'une instance pour un usage (créé au premier appel)
+def obtenirMemoAnneaux(probleme, usage="optimise"):
+    memos = _memos_anneaux.get(probleme)
+    if memos is None:
+        memos = _memos_anneaux[probleme] = {}
+    memo = memos.get(usage)
+    if memo is None:
+        memo = memos[usage] = MemoAnneaux(probleme.dimension)
+    return memo
+
+
+# Anneau 2-opt / Or-opt sur les stations de anneau et sa longueur. Avec un mémo, un
+# ensemble de stations déjà optimisé reprend l'anneau gardé s'il n'est pas plus long
+def anneau_optimise(matrice, anneau, memo=None):
+    if memo is not None:
+        stations = frozenset(anneau.tolist())
+        cle = memo.cle(anneau)
+        connu = memo.obtenir(cle, stations)
+        if connu is not None and connu[1] <= _longueur_anneau(matrice, anneau) + 1e-9:
+            return connu
+    nouvel_anneau = anneau[np.asarray(ordre_anneau_optimise(matrice, anneau), dtype=np.intp)]
+    longueur = _longueur_anneau(matrice, nouvel_anneau)
+    if memo is not None:
+        memo.enregistrer(cle, stations, nouvel_anneau, longueur)
+    return nouvel_anneau, longueur
+
+
+def _descente_granulaire(matrice, solution, etoiles, cout_cycle, voisins, max_iter, ameliorer_anneau,
+                         echeance=None, memo=None):
+    """
+    Descente par échanges (fermer s, ouvrir c) restreinte aux candidats c voisins de s.
+
+    Les stations à examiner sont dans une file : une station sans échange améliorant
+    en sort, et après chaque échange accepté seules la station ouverte et les stations
+    voisines de s et de c y sont remises. La recherche reprend donc là où elle en était
+    au lieu de repartir du début de la double boucle. La descente s'arrête à
+    l'échéance, sur la solution courante.
+
+    Returns:
+        Le coût total de la solution, modifiée en place
+    """
+    cout_actuel = cout_cycle + etoiles.cout
+    file = deque(solution.anneau.tolist())
+    en_file = solution.est_station.copy()
+    mouvements = 0
+
+    while mouvements < max_iter and not echeanceDepassee(echeance):
+        if not file:
+            if ameliorer_anneau:
+                nouvel_anneau, nouveau_cout_cycle = anneau_optimise(matrice, solution.anneau, memo)
+                if nouveau_cout_cycle < cout_cycle - 1e-9:
+                    solution.remplacer_anneau(nouvel_anneau)
+                    cout_actuel += nouveau_cout_cycle - cout_cycle
+                    cout_cycle = nouveau_cout_cycle
+                    # Nouvel anneau : toutes les stations sont à réexaminer
+                    file.extend(solution.anneau.tolist())
+                    en_file[:] = solution.est_station
+                    continue
+            break
+
+        i_s = file.popleft()
+        en_file[i_s] = False
+        if not solution.est_station[i_s]:
+            continue
+        candidats = voisins[i_s]
+        candidats = candidats[~solution.est_station[candidats]]
+        if len(candidats) == 0:
+            continue
+
+        couts_etoiles = etoiles.cout + etoiles.deltas_echange(i_s, candidats)
+        pos_s = int(solution.position[i_s])
+        deltas_anneau, positions = deltas_anneau_echange(matrice, solution.anneau, pos_s, candidats)
+        couts = couts_etoiles + cout_cycle + deltas_anneau
+        # Les candidats sont peu nombreux : on garde le meilleur échange de s
+        k = int(np.argmin(couts))
+        if couts[k] >= cout_actuel - 1e-9:
+            continue
+
+        i_c = candidats[k]
+        solution.echanger(pos_s, i_c, positions[k])
+        etoiles.appliquer_echange(i_s, i_c)
+        COMPTEURS["mouvements_acceptes"] += 1
+        cout_cycle += float(deltas_anneau[k])
+        cout_actuel = float(couts[k])
+        mouvements += 1
+
+        for j in np.concatenate(([i_c], voisins[i_s], voisins[i_c])):
+            if solution.est_station[j] and not en_file[j]:
+                file.append(j)
+                en_file[j] = True
+
+    return cout_actuel
+
+
+def amelioration_locale(probleme, p, cycle_init, stations_init, max_iter=100, mode_anneau="insertion",
+                        ameliorer_anneau=True, voisinage="auto", k_candidats=10, echeance=None):
+    """
+    Descente par échanges de stations (fermer s, ouvrir c), en première amélioration.
+
+    Args:
+        mode_anneau: "insertion" pour réparer l'anneau (retrait de s puis insertion
+            de c à la position la moins chère, coût évalué en delta), ou
+            "reconstruction" pour reconstruire l'anneau au plus proche voisin
+            à chaque échange candidat
+        ameliorer_anneau: Passe l'anneau au 2-opt / Or-opt au départ et à chaque
+            optimum local des échanges, puis reprend la descente s'il a été raccourci
+        voisinage: "complet" pour essayer tous les noeuds à la place de chaque station,
+            "granulaire" pour n'essayer que les k_candidats plus proches voisins de la
+            station (avec une file de stations à examiner, grandes instances), ou "auto"
+            pour choisir "granulaire" au-delà de SEUIL_VOISINAGE_GRANULAIRE noeuds
+        k_candidats: Taille des listes de candidats du voisinage granulaire
+        echeance: Echeance à laquelle la descente s'arrête sur la meilleure solution
+            trouvée (celle en cours, chaque mouvement accepté étant améliorant)
+
+    Returns:
+        (cycle, stations, cout)
+    """
+    _, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
+    solution = Solution.depuis_listes(cycle_init, stations_init, node_to_index)
+    solution = ameliorer_solution(probleme, solution, max_iter, mode_anneau, ameliorer_anneau, voisinage,
+                                  k_candidats, echeance)
+    cycle, stations = solution.vers_listes(index_to_node)
+    return cycle, stations, solution.cout
+
+
+# Même descente qu'amelioration_locale, sur une Solution modifiée en place (renvoyée avec son coût)
+@chronometrer("amelioration_locale")
+def ameliorer_solution(probleme, solution, max_iter=100, mode_anneau="insertion", ameliorer_anneau=True,
+                       voisinage="auto", k_candidats=10, echeance=None):
+    if mode_anneau not in ("insertion", "reconstruction"):
+        raise ValueError(f"Mode d'anneau inconnu : {mode_anneau}")
+    if voisinage not in ("auto", "complet", "granulaire"):
+        raise ValueError(f"Voisinage inconnu : {voisinage}")
+
+    matrice = obtenirMatriceDistances(probleme)[0]
+    # Anneaux 2-opt / Or-opt déjà calculés pour un ensemble de stations (toutes descentes confondues)
+    memo = obtenirMemoAnneaux(probleme)
+    if ameliorer_anneau:
+        solution.remplacer_anneau(anneau_optimise(matrice, solution.anneau, memo)[0])
+    etoiles = AffectationEtoiles(matrice, solution.anneau)
+    cout_cycle = _longueur_anneau(matrice, solution.anneau)
+    cout_actuel = cout_cycle + etoiles.cout
+
+    n = len(solution.est_station)
+    if voisinage == "auto":
+        voisinage = "granulaire" if n > SEUIL_VOISINAGE_GRANULAIRE else "complet"
+    if voisinage == "granulaire":
+        if mode_anneau != "insertion":
+            raise ValueError("Le voisinage granulaire n'est disponible qu'avec mode_anneau=\"insertion\"")
+        solution.cout = _descente_granulaire(matrice, solution, etoiles, cout_cycle,
+                                             obtenirListesCandidats(probleme, k_candidats), max_iter,
+                                             ameliorer_anneau, echeance, memo)
+        return solution
+
+    if mode_anneau == "reconstruction":
+        memo_reconstruction = obtenirMemoAnneaux(probleme, "plus_proche_voisin")
+        cle_anneau = memo_reconstruction.cle(solution.anneau)
 
     for _ in range(max_iter):
         amelioration = False
-        for s in stations:
-            for c in tous:
-                if c in stations:
+        interrompue = False
+        for i_s in solution.anneau.tolist():
+            if echeanceDepassee(echeance):
+                interrompue = True
+                break
+            candidats = np.flatnonzero(~solution.est_station)
+            # Coût des étoiles de tous les échanges (s, c) en une seule passe
+            couts_etoiles = etoiles.cout + etoiles.deltas_echange(i_s, candidats)
+            pos_s = int(solution.position[i_s])
+
+            if mode_anneau == "insertion":
+                deltas_anneau, positions = deltas_anneau_echange(matrice, solution.anneau, pos_s, candidats)
+                couts = couts_etoiles + cout_cycle + deltas_anneau
+                ameliorants = np.flatnonzero(couts < cout_actuel)
+                if len(ameliorants) == 0:
                     continue
-                nouvelles_stations = stations[:]
-                nouvelles_stations.remove(s)
-                nouvelles_stations.append(c)
+                # Première amélioration dans l'ordre des candidats : seul l'échange retenu
+                # modifie l'anneau
+                k = ameliorants[0]
+                solution.echanger(pos_s, candidats[k], positions[k])
+                etoiles.appliquer_echange(i_s, candidats[k])
+                COMPTEURS["mouvements_acceptes"] += 1
+                cout_cycle += float(deltas_anneau[k])
+                cout_actuel = float(couts[k])
+                amelioration = True
+                break
 
-                nouveau_cycle = tsp_plus_proche_voisin(matrice, nouvelles_stations, node_to_index)
-                cout_new = cout_solution(
-                    probleme, nouveau_cycle, nouvelles_stations, matrice, index_to_node, node_to_index
-                )
+            # Stations après l'échange : s est remplacée sur place par chaque candidat
+            nouvelles_stations = solution.anneau.copy()
+            for j, cout_etoiles in zip(candidats.tolist(), couts_etoiles):
+                # L'anneau coûte au moins 0 : inutile de le reconstruire si les étoiles suffisent à perdre
+                if cout_etoiles >= cout_actuel:
+                    continue
+                cle = cle_anneau ^ memo_reconstruction.valeurs[i_s] ^ memo_reconstruction.valeurs[j]
+                nouvelles_stations[pos_s] = j
+                ensemble = frozenset(nouvelles_stations.tolist())
+                connu = memo_reconstruction.obtenir(cle, ensemble)
+                if connu is None:
+                    nouvel_anneau = anneau_plus_proche_voisin(matrice, nouvelles_stations)
+                    nouveau_cout_cycle = _longueur_anneau(matrice, nouvel_anneau)
+                    memo_reconstruction.enregistrer(cle, ensemble, nouvel_anneau, nouveau_cout_cycle)
+                else:
+                    nouvel_anneau, nouveau_cout_cycle = connu
+                cout_new = nouveau_cout_cycle + cout_etoiles
 
                 if cout_new < cout_actuel:
-                    stations = nouvelles_stations
-                    cycle = nouveau_cycle
+                    solution.remplacer_anneau(nouvel_anneau)
+                    etoiles.appliquer_echange(i_s, j)
+                    COMPTEURS["mouvements_acceptes"] += 1
+                    cle_anneau = cle
+                    cout_cycle = nouveau_cout_cycle
                     cout_actuel = cout_new
                     amelioration = True
                     break
             if amelioration:
                 break
+        if interrompue:
+            break
         if not amelioration:
+            if ameliorer_anneau:
+                nouvel_anneau, nouveau_cout_cycle = anneau_optimise(matrice, solution.anneau, memo)
+                if nouveau_cout_cycle < cout_cycle - 1e-9:
+                    solution.remplacer_anneau(nouvel_anneau)
+                    cout_actuel += nouveau_cout_cycle - cout_cycle
+                    cout_cycle = nouveau_cout_cycle
+                    continue
             break
 
-    return cycle, stations, cout_actuel
+    solution.cout = cout_actuel
+    return solution
 
 
 # =========================
-# Brique D : méthode exacte (PLNE)
+# Brique E : métaheuristique
 # =========================
-def reconstruire_cycle_depuis_arcs(edges_metro, stations):
-    succ = {s: None for s in stations}
-    for (i, j) in edges_metro:
-        if i in succ:
-            succ[i] = j
-
-    if not stations:
-        return []
-
-    start = stations[0]
-    cycle = [start]
-    courant = start
+class EtatRecherche:
+    """
+    Solution courante d'une métaheuristique avec tout ce qu'il faut pour évaluer
+    un mouvement en delta : affectation des étoiles (AffectationEtoiles) et coût
+    de l'anneau tenu à jour.
+
+    Mouvements de stations : échange (fermer s, ouvrir c), ajout de c (insertion la
+    moins chère dans l'anneau) et retrait de s (raccordement de ses voisins). Les
+    évaluations sont vectorisées sur une liste de candidats.
+    """
+
+    def __init__(self, matrice, solution, memo=None):
+        self.matrice = matrice
+        self.solution = solution
+        # Mémo des anneaux 2-opt / Or-opt (MemoAnneaux), partagé entre les états d'une instance
+        self.memo = memo
+        self.etoiles = AffectationEtoiles(matrice, solution.anneau)
+        self.cout_cycle = _longueur_anneau(matrice, solution.anneau)
+
+    @property
+    def cout(self):
+        return self.cout_cycle + self.etoiles.cout
+
+    def deltas_echanges(self, s, candidats):
+        pos_s = int(self.solution.position[s])
+        deltas_anneau, positions = deltas_anneau_echange(self.matrice, self.solution.anneau, pos_s, candidats)
+        return self.etoiles.deltas_echange(s, candidats) + deltas_anneau, positions
+
+    def deltas_ajouts(self, candidats):
+        deltas_anneau, positions = deltas_insertion_anneau(self.matrice, self.solution.anneau, candidats)
+        return self.etoiles.deltas_ajout(candidats) + deltas_anneau, positions
+
+    def delta_retrait(self, s):
+        pos_s = int(self.solution.position[s])
+        return float(self.etoiles.deltas_retrait([s])[0]) + delta_retrait_anneau(
+            self.matrice, self.solution.anneau, pos_s)
+
+    def appliquer_echange(self, s, c, apres):
+        self.solution.echanger(int(self.solution.position[s]), c, apres)
+        self.etoiles.appliquer_echange(s, c)
+        self._fin_mouvement()
+
+    def appliquer_ajout(self, c, apres):
+        self.solution.inserer(apres, c)
+        self.etoiles.appliquer_ajout(c)
+        self._fin_mouvement()
+
+    def appliquer_retrait(self, s):
+        self.solution.retirer(int(self.solution.position[s]))
+        self.etoiles.appliquer_retrait(s)
+        self._fin_mouvement()
+
+    def _fin_mouvement(self):
+        # Recalcul exact de l'anneau (O(p)) pour ne pas accumuler d'erreurs d'arrondi
+        self.cout_cycle = _longueur_anneau(self.matrice, self.solution.anneau)
+        self.solution.cout = self.cout
+
+    def optimiser_anneau(self):
+        """2-opt / Or-opt sur l'anneau ; renvoie vrai s'il a été raccourci."""
+        nouvel_anneau, nouveau_cout_cycle = anneau_optimise(self.matrice, self.solution.anneau, self.memo)
+        if nouveau_cout_cycle < self.cout_cycle - 1e-9:
+            self.solution.remplacer_anneau(nouvel_anneau)
+            self.cout_cycle = nouveau_cout_cycle
+            self.solution.cout = self.cout
+            return True
+        return False
+
+    def mouvement_aleatoire(self, voisins, rng, force=False):
+        """
+        Tire une station s, évalue les mouvements vers ses voisins et garde le meilleur.
+
+        Returns:
+            (delta, application, nombre de mouvements évalués) ; application est None
+            s'il n'y a aucun mouvement possible. Avec force, le mouvement est appliqué
+            directement (perturbation).
+        """
+        solution = self.solution
+        s = int(solution.anneau[rng.integers(solution.p)])
+        type_mouvement = rng.random()
+        if type_mouvement < 0.15 and solution.p > NOMBRE_MIN_STATIONS:
+            delta = self.delta_retrait(s)
+            application = (self.appliquer_retrait, s)
+            evalues = 1
+        else:
+            candidats = voisins[s]
+            candidats = candidats[~solution.est_station[candidats]]
+            if len(candidats) == 0:
+                return 0.0, None, 0
+            if type_mouvement < 0.3:
+                deltas, positions = self.deltas_ajouts(candidats)
+                k = int(rng.integers(len(candidats))) if force else int(np.argmin(deltas))
+                application = (self.appliquer_ajout, int(candidats[k]), int(positions[k]))
+            else:
+                deltas, positions = self.deltas_echanges(s, candidats)
+                k = int(rng.integers(len(candidats))) if force else int(np.argmin(deltas))
+                application = (self.appliquer_echange, s, int(candidats[k]), int(positions[k]))
+            delta = float(deltas[k])
+            evalues = len(candidats)
+        if force:
+            application[0](*application[1:])
+        return delta, application, evalues
+
+    def descente(self, voisins, rng, fin=None, epsilon=1e-9):
+        """
+        Descente en première amélioration sur échanges, ajouts et retraits restreints
+        aux voisins de chaque station, puis 2-opt / Or-opt de l'anneau.
+
+        Returns:
+            Nombre de mouvements évalués
+        """
+        evalues = 0
+        while fin is None or time.perf_counter() < fin:
+            amelioration = False
+            for s in rng.permutation(self.solution.anneau).tolist():
+                if fin is not None and time.perf_counter() >= fin:
+                    break
+                if not self.solution.est_station[s]:
+                    continue
+                candidats = voisins[s]
+                candidats = candidats[~self.solution.est_station[candidats]]
+                if len(candidats):
+                    deltas, positions = self.deltas_echanges(s, candidats)
+                    evalues += len(candidats)
+                    k = int(np.argmin(deltas))
+                    if deltas[k] < -epsilon:
+                        self.appliquer_echange(s, int(candidats[k]), int(positions[k]))
+                        COMPTEURS["mouvements_acceptes"] += 1
+                        amelioration = True
+                        continue
+                    deltas, positions = self.deltas_ajouts(candidats)
+                    evalues += len(candidats)
+                    k = int(np.argmin(deltas))
+                    if deltas[k] < -epsilon:
+                        self.appliquer_ajout(int(candidats[k]), int(positions[k]))
+                        COMPTEURS["mouvements_acceptes"] += 1
+                        amelioration = True
+                        continue
+                if self.solution.p > NOMBRE_MIN_STATIONS:
+                    evalues += 1
+                    if self.delta_retrait(s) < -epsilon:
+                        self.appliquer_retrait(s)
+                        COMPTEURS["mouvements_acceptes"] += 1
+                        amelioration = True
+            if not amelioration and not self.optimiser_anneau():
+                break
+        return evalues
+
+
+# Construction gloutonne randomisée (GRASP) d'une solution à p stations
+def construction_grasp(probleme, p, rng, alpha=0.3, taille_echantillon=32, fin=None):
+    """
+    Ajoute les stations une à une : à chaque étape, les candidats (un échantillon
+    de taille_echantillon noeuds) sont classés selon le coût d'ajout (étoiles +
+    insertion dans l'anneau) et la station est tirée au hasard dans la liste
+    restreinte des candidats à moins de alpha * (pire - meilleur) du meilleur.
+    La construction s'arrête plus tôt si l'instant fin est dépassé, mais jamais
+    avant NOMBRE_MIN_STATIONS stations.
+
+    Returns:
+        Une Solution à p stations, anneau amélioré par 2-opt / Or-opt
+    """
+    matrice = obtenirMatriceDistances(probleme)[0]
+    n = matrice.shape[0]
+    p_min = min(NOMBRE_MIN_STATIONS, n)
+    p = max(p_min, min(p, n))
+    solution = Solution(n, [int(rng.integers(n))])
+    etoiles = AffectationEtoiles(matrice, solution.anneau)
+    while solution.p < p and (solution.p < p_min or fin is None or time.perf_counter() < fin):
+        candidats = np.flatnonzero(~solution.est_station)
+        if len(candidats) > taille_echantillon:
+            candidats = rng.choice(candidats, taille_echantillon, replace=False)
+        deltas_anneau, positions = deltas_insertion_anneau(matrice, solution.anneau, candidats)
+        deltas = etoiles.deltas_ajout(candidats) + deltas_anneau
+        seuil = deltas.min() + alpha * (deltas.max() - deltas.min())
+        k = int(rng.choice(np.flatnonzero(deltas <= seuil)))
+        solution.inserer(int(positions[k]), int(candidats[k]))
+        etoiles.appliquer_ajout(int(candidats[k]))
+    solution.reordonner(ordre_anneau_optimise(matrice, solution.anneau))
+    return solution
+
+
+# Recuit simulé à partir d'un état, jusqu'à l'instant fin ; renvoie (meilleure solution, mouvements évalués)
+def _recuit(etat, voisins, rng, fin, taux_acceptation=0.5, rapport_final=1e-3):
+    # Température initiale : une dégradation moyenne est acceptée avec la probabilité taux_acceptation
+    echantillon = [abs(etat.mouvement_aleatoire(voisins, rng)[0]) for _ in range(50)]
+    degradation = np.mean([d for d in echantillon if d > 0] or [1.0])
+    t_initiale = -degradation / math.log(taux_acceptation)
+    debut = time.perf_counter()
+    duree = max(fin - debut, 1e-9)
+
+    meilleure = etat.solution.copie()
+    meilleure.cout = etat.cout
+    evalues = 0
+    iteration = 0
+    temperature = t_initiale
     while True:
-        suivant = succ.get(courant)
-        if suivant is None or suivant == start:
+        if iteration % 64 == 0:
+            # Refroidissement géométrique en fonction du temps écoulé
+            maintenant = time.perf_counter()
+            if maintenant >= fin:
+                break
+            temperature = t_initiale * rapport_final ** ((maintenant - debut) / duree)
+        iteration += 1
+        delta, application, n_evalues = etat.mouvement_aleatoire(voisins, rng)
+        evalues += n_evalues
+        if application is None:
+            continue
+        if delta < 0 or rng.random() < math.exp(-delta / temperature):
+            application[0](*application[1:])
+            COMPTEURS["mouvements_acceptes"] += 1
+            if etat.cout < meilleure.cout - 1e-9:
+                meilleure = etat.solution.copie()
+                meilleure.cout = etat.cout
+    return meilleure, evalues
+
+
+# Recherche à voisinages variables ; renvoie (meilleure solution, mouvements évalués)
+def _vns(etat, voisins, rng, fin, k_max=5):
+    matrice = etat.matrice
+    evalues = etat.descente(voisins, rng, fin)
+    meilleure = etat.solution.copie()
+    meilleure.cout = etat.cout
+    k = 1
+    while time.perf_counter() < fin:
+        # Perturbation de k mouvements aléatoires autour de la meilleure solution, puis descente
+        essai = EtatRecherche(matrice, meilleure.copie(), etat.memo)
+        for _ in range(k):
+            evalues += essai.mouvement_aleatoire(voisins, rng, force=True)[2]
+        evalues += essai.descente(voisins, rng, fin)
+        if essai.cout < meilleure.cout - 1e-9:
+            meilleure = essai.solution.copie()
+            meilleure.cout = essai.cout
+            k = 1
+        else:
+            k = k % k_max + 1
+    return meilleure, evalues
+
+
+# Une exécution de la métaheuristique (fonction de module pour le pool de processus)
+def _executer_metaheuristique(probleme, methode, temps_limite, graine, k_candidats, n_departs, alpha, k_max,
+                              p_initial, solution_depart=None):
+    matrice = obtenirMatriceDistances(probleme)[0]
+    voisins = obtenirListesCandidats(probleme, k_candidats)
+    memo = obtenirMemoAnneaux(probleme)
+    rng = np.random.default_rng(graine)
+    debut = time.perf_counter()
+    fin_globale = debut + temps_limite
+
+    meilleure = None
+    evalues = 0
+    for depart in range(n_departs):
+        maintenant = time.perf_counter()
+        # Le premier départ a toujours lieu, même budget épuisé : il y a toujours une solution à renvoyer
+        if meilleure is not None and maintenant >= fin_globale:
             break
-        cycle.append(suivant)
-        courant = suivant
+        # Chaque départ GRASP reçoit une part égale du temps restant
+        fin = maintenant + max(fin_globale - maintenant, 0.0) / (n_departs - depart)
+        if meilleure is None and solution_depart is not None:
+            # Départ à chaud : le premier départ remplace la construction GRASP
+            etat = EtatRecherche(matrice, solution_depart.copie(), memo)
+        elif meilleure is None:
+            # La première construction va jusqu'à p_initial stations quelle que soit l'échéance
+            etat = EtatRecherche(matrice, construction_grasp(probleme, p_initial, rng, alpha), memo)
+        else:
+            p = int(rng.integers(max(NOMBRE_MIN_STATIONS, int(0.8 * meilleure.p)), int(1.2 * meilleure.p) + 2))
+            etat = EtatRecherche(matrice, construction_grasp(probleme, p, rng, alpha, fin=fin), memo)
+        if methode == "recuit":
+            # Le recuit finit froid : une descente termine le travail sur sa meilleure solution
+            trouvee, n_evalues = _recuit(etat, voisins, rng, fin - 0.15 * (fin - maintenant))
+            etat = EtatRecherche(matrice, trouvee, memo)
+            n_evalues += etat.descente(voisins, rng, fin)
+            trouvee = etat.solution
+            trouvee.cout = etat.cout
+        else:
+            trouvee, n_evalues = _vns(etat, voisins, rng, fin, k_max)
+        evalues += n_evalues
+        if meilleure is None or trouvee.cout < meilleure.cout:
+            meilleure = trouvee
+    return meilleure, evalues, time.perf_counter() - debut
 
-    return cycle
 
+def metaheuristique(probleme, methode="recuit", temps_limite=10.0, n_workers=1, graine=None, k_candidats=10,
+                    n_departs=4, alpha=0.3, k_max=5, p_initial=None, depart=None, verbeux=True):
+    """
+    Métaheuristique à budget de temps : départs GRASP successifs, chacun amélioré
+    par recuit simulé ou par recherche à voisinages variables (VNS).
+
+    Les mouvements portent sur les stations (échange, ajout, retrait : le nombre de
+    stations p varie librement) et sur l'anneau (insertion au moindre coût, 2-opt,
+    Or-opt). Chaque mouvement est évalué en delta, restreint aux k_candidats plus
+    proches voisins de la station tirée.
 
-def methode_exacte(probleme, p):
+    Args:
+        methode: "recuit" (recuit simulé) ou "vns"
+        temps_limite: Budget en secondes (temps réel, > 0), réparti entre les n_departs départs ;
+            la première construction GRASP va toujours à son terme, quitte à dépasser un budget très court
+        n_workers: Nombre de processus ; chacun fait une exécution indépendante
+            avec sa propre graine et le même budget, la meilleure est gardée
+        graine: Graine aléatoire (None = aléatoire)
+        alpha: Taille relative de la liste restreinte de candidats du GRASP
+        k_max: Plus grande perturbation de la VNS (en nombre de mouvements)
+        p_initial: Nombre de stations du premier départ (défaut calculerNombreStations)
+        depart: Solution de départ, (cycle, stations) ou objet Solution ; elle remplace
+            la construction GRASP du premier départ de chaque processus
+
+    Returns:
+        (p, cycle, stations, cout) de la meilleure solution trouvée
+    """
+    if methode not in ("recuit", "vns"):
+        raise ValueError(f"Méthode inconnue : {methode}")
+    if not temps_limite > 0:
+        raise ValueError(f"Le budget de temps doit être positif : {temps_limite}")
+    if n_departs < 1:
+        raise ValueError(f"Il faut au moins un départ : n_departs={n_departs}")
     matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
-    noeuds = list(index_to_node.values())
-    n = len(noeuds)
+    solution_depart = None
+    if depart is not None:
+        solution_depart = Solution.depuis_listes(*_listes_depart(depart, index_to_node), node_to_index)
+    if p_initial is None:
+        p_initial = solution_depart.p if solution_depart is not None else calculerNombreStations(probleme)
+    p_initial = max(NOMBRE_MIN_STATIONS, p_initial)
+    graines = np.random.SeedSequence(graine).spawn(max(1, n_workers))
+    arguments = (methode, temps_limite)
+    parametres = (k_candidats, n_departs, alpha, k_max, p_initial, solution_depart)
+
+    if n_workers > 1:
+        # Même mise en place que le balayage parallèle : matrice en mémoire partagée
+        from balayage import _metaheuristique_worker, _poolMatricePartagee
+        with _poolMatricePartagee(probleme, n_workers) as pool:
+            taches = [pool.submit(_metaheuristique_worker, *arguments, g, *parametres) for g in graines]
+            resultats = [tache.result() for tache in taches]
+    else:
+        resultats = [_executer_metaheuristique(probleme, *arguments, graines[0], *parametres)]
 
-    model = pulp.LpProblem("RingStar", pulp.LpMinimize)
-
-    # Variables
-    x = pulp.LpVariable.dicts("x", (noeuds, noeuds), 0, 1, cat="Binary")  # arêtes orientées de l'anneau
-    z = pulp.LpVariable.dicts("z", noeuds, 0, 1, cat="Binary")  # station ou non
-    y = pulp.LpVariable.dicts("y", (noeuds, noeuds), 0, 1, cat="Binary")  # affectation client -> station
-    u = pulp.LpVariable.dicts("u", noeuds, lowBound=0, upBound=n, cat="Continuous")  # MTZ
-
-    # Objectif : coût anneau + coût étoiles
-    cout_anneau = pulp.lpSum(
-        matrice[node_to_index[i]][node_to_index[j]] * x[i][j] for i in noeuds for j in noeuds if i != j
-    )
-    cout_etoiles = pulp.lpSum(
-        matrice[node_to_index[i]][node_to_index[j]] * y[i][j] for i in noeuds for j in noeuds
-    )
-    model += cout_anneau + cout_etoiles
-
-    # 1) nombre de stations = p
-    model += pulp.lpSum(z[i] for i in noeuds) == p
-
-    # 2) affectation unique de chaque noeud à une station
-    for i in noeuds:
-        model += pulp.lpSum(y[i][j] for j in noeuds) == 1
-
-    # 3) affectation seulement si j est station
-    for i in noeuds:
-        for j in noeuds:
-            model += y[i][j] <= z[j]
-
-    # 4) contraintes d'anneau : degré entrant = 1 et sortant = 1 pour les stations, 0 sinon
-    for i in noeuds:
-        model += pulp.lpSum(x[i][j] for j in noeuds if i != j) == z[i]
-        model += pulp.lpSum(x[j][i] for j in noeuds if i != j) == z[i]
-
-    # 5) l'arête ne peut exister que si les deux sont stations
-    for i in noeuds:
-        for j in noeuds:
-            if i == j:
-                model += x[i][j] == 0
-            else:
-                model += x[i][j] <= z[i]
-                model += x[i][j] <= z[j]
-
-    # 6) élimination des sous-tours (MTZ) sur les stations
-    #    u est défini pour tous les noeuds mais activé seulement si z=1
-    for i in noeuds:
-        model += u[i] <= p * z[i]
-        model += u[i] >= z[i]  # u[i] >= 1 si z[i] = 1, sinon u[i] >= 0
-    
-    # Contrainte MTZ : u[i] - u[j] + p*x[i][j] <= p - 1
-    # Cette contrainte s'applique seulement quand x[i][j] = 1
-    for i in noeuds:
-        for j in noeuds:
-            if i != j:
-                # Si x[i][j] = 1, alors u[i] - u[j] <= -1, ce qui force un ordre
-                model += u[i] - u[j] + p * x[i][j] <= p - 1
-
-    # Résolution
-    model.solve(pulp.PULP_CBC_CMD(msg=False))
-
-    # Vérifier le statut de la résolution
-    status = model.status
-    if status != pulp.LpStatusOptimal:
-        print(f"Attention : Le solveur n'a pas trouvé de solution optimale. Statut : {pulp.LpStatus[status]}")
-        print("Retour à une solution heuristique...")
-        # Fallback : utiliser l'heuristique
-        cycle, stations = heuristique_rapide(probleme, p)
-        return cycle, stations
-
-    stations = [i for i in noeuds if pulp.value(z[i]) is not None and pulp.value(z[i]) > 0.5]
-
-    if not stations:
-        print("Attention : Aucune station trouvée dans la solution. Retour à une solution heuristique...")
-        cycle, stations = heuristique_rapide(probleme, p)
-        return cycle, stations
-
-    edges_metro = []
-    for i in noeuds:
-        for j in noeuds:
-            if i != j and pulp.value(x[i][j]) is not None and pulp.value(x[i][j]) > 0.5:
-                edges_metro.append((i, j))
-
-    cycle = reconstruire_cycle_depuis_arcs(edges_metro, stations)
-    
-    if not cycle:
-        print("Attention : Cycle vide. Retour à une solution heuristique...")
-        cycle, stations = heuristique_rapide(probleme, p)
-        return cycle, stations
-    
-    return cycle, stations
+    meilleure, _, duree = min(resultats, key=lambda r: r[0].cout)
+    evalues = sum(r[1] for r in resultats)
+    cycle, stations = meilleure.vers_listes(index_to_node)
+    cout = cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index)
+    if verbeux:
+        print(f"{methode} : {evalues} mouvements évalués en {duree:.1f} s "
+              f"({evalues / len(resultats) / max(duree, 1e-9) * 60:.0f} par minute et par processus), "
+              f"p={len(stations)}, coût={cout:.2f}")
+    return len(stations), cycle, stations, cout
 
 
 # Petit main de test
@@ -479,7 +2286,10 @@ def main():
     
     # Calcul automatique du nombre de stations
     p = calculerNombreStations(probleme)
-    print(f"Nombre de nœuds : {len(probleme.node_coords)}, K = {p} (calculé automatiquement)")
+    print(f"Nombre de nœuds : {probleme.dimension}, K = {p} (calculé automatiquement)")
+
+    from affichage import afficherSolution
+    from exact import methode_exacte
 
     # Heuristique rapide
     cycle_h, stations_h = heuristique_rapide(probleme, p)
@@ -0,0 +1,99 @@
+import contextlib
+import functools
+import json
+import time
+from collections import Counter, defaultdict
+
+
+# Compteurs : "cout" pour les coûts complets, "delta" pour les mouvements évalués en
+# variation, "mouvements_acceptes", "reconstructions_anneau"... (remis à zéro par
+# reinitialiserCompteurs)
+COMPTEURS = Counter()
+
+# Temps cumulé (secondes) et nombre d'appels de chaque phase chronométrée
+CHRONOMETRES = defaultdict(lambda: [0.0, 0])
+
+
+def reinitialiserCompteurs():
+    COMPTEURS.clear()
+    CHRONOMETRES.clear()
+
+
+# Chronomètre d'une phase (bloc with) ; les temps sont inclusifs, les phases peuvent s'imbriquer
+@contextlib.contextmanager
+def chronometre(phase):
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        mesure = CHRONOMETRES[phase]
+        mesure[0] += time.perf_counter() - debut
+        mesure[1] += 1
+
+
+# Décorateur : chronomètre chaque appel de la fonction dans la phase donnée
+def chronometrer(phase):
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            with chronometre(phase):
+                return fonction(*args, **kwargs)
+        return enveloppe
+    return decorateur
+
+
+# Rapport structuré des chronomètres et compteurs du processus courant
+def rapportInstrumentation():
+    return {
+        "phases": {phase: {"temps": temps, "appels": appels}
+                   for phase, (temps, appels) in sorted(CHRONOMETRES.items(), key=lambda e: -e[1][0])},
+        "compteurs": dict(sorted(COMPTEURS.items())),
+    }
+
+
+# Retire --rapport <fichier.json> et --profil <fichier.prof> des arguments d'un script
+def optionsInstrumentation(argv):
+    restants = []
+    options = {"rapport": None, "profil": None}
+    i = 0
+    while i < len(argv):
+        nom = argv[i][2:] if argv[i].startswith("--") else None
+        if nom in options and i + 1 < len(argv):
+            options[nom] = argv[i + 1]
+            i += 2
+        else:
+            restants.append(argv[i])
+            i += 1
+    return restants, options["rapport"], options["profil"]
+
+
+# Instrumente une exécution complète : remise à zéro, cProfile optionnel, rapport JSON à la fin
+@contextlib.contextmanager
+def instrumenter(chemin_rapport=None, chemin_profil=None, **infos):
+    """
+    Args:
+        chemin_rapport: Fichier JSON du rapport (phases, compteurs, infos), ou None
+        chemin_profil: Fichier de sortie de cProfile (lisible par pstats ou snakeviz), ou None
+        infos: Informations ajoutées au rapport (instance, méthode...) ; le dictionnaire
+            renvoyé par le with peut être complété pendant l'exécution (résultat...)
+    """
+    reinitialiserCompteurs()
+    profil = None
+    if chemin_profil:
+        import cProfile
+        profil = cProfile.Profile()
+    debut = time.perf_counter()
+    if profil is not None:
+        profil.enable()
+    try:
+        yield infos
+    finally:
+        if profil is not None:
+            profil.disable()
+            profil.dump_stats(chemin_profil)
+        if chemin_rapport:
+            rapport = dict(infos)
+            rapport["temps_total"] = time.perf_counter() - debut
+            rapport.update(rapportInstrumentation())
+            with open(chemin_rapport, "w") as f:
+                json.dump(rapport, f, indent=2, default=str)
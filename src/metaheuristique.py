@@ -2,37 +2,69 @@ import sys
 import time
 
 from instance import (
+    affectationEnMemoire,
     chargerInstance,
-    amelioration_locale_optimisee,
-    afficherSolution,
+    cheminInstance,
+    metaheuristique,
 )
+from instrumentation import instrumenter, optionsInstrumentation
+from stockage import optionsStockage
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage : python metaheuristique.py <fichier.tsp>")
+    # --rapport <fichier.json> et --profil <fichier.prof> peuvent être placés n'importe où
+    argv, chemin_rapport, chemin_profil = optionsInstrumentation(sys.argv)
+    # --no-plot : pas de schéma de la solution (ni matplotlib ni networkx importés)
+    sans_affichage = "--no-plot" in argv
+    argv = [a for a in argv if a != "--no-plot"]
+    # --solutions <dossier>, --sans-stockage, --recalculer : reprise des solutions enregistrées
+    argv, stockage, recalculer = optionsStockage(argv)
+
+    if len(argv) < 2:
+        print("Usage : python metaheuristique.py <fichier.tsp> [nombre_processus] [temps_limite] [recuit|vns] [--no-plot] [--solutions dossier] [--sans-stockage] [--recalculer] [--rapport fichier.json] [--profil fichier.prof]")
+        sys.exit(1)
+
+    fichier = argv[1]
+    # Nombre de processus : chacun lance une recherche indépendante (1 = séquentiel)
+    n_workers = int(argv[2]) if len(argv) > 2 else 1
+    # Budget de temps en secondes et méthode (recuit simulé ou VNS)
+    temps_limite = float(argv[3]) if len(argv) > 3 else 10.0
+    methode = argv[4] if len(argv) > 4 else "recuit"
+    if temps_limite <= 0:
+        print(f"Le temps limite doit être positif : {argv[3]}")
         sys.exit(1)
 
-    fichier = sys.argv[1]
+    # Nom d'une instance de data/ ou chemin vers un fichier .tsp
+    chemin = cheminInstance(fichier)
 
-    chemin = f"data/{fichier}"
+    with instrumenter(chemin_rapport, chemin_profil, instance=fichier, methode="metaheuristique") as rapport:
+        probleme = chargerInstance(chemin)
 
-    probleme = chargerInstance(chemin)
+        print(f"=== Métaheuristique ({methode}, GRASP, budget de {temps_limite:g} s) ===")
+        print(f"Fichier : {fichier}, Nombre de nœuds : {probleme.dimension}")
 
-    print(f"=== Métaheuristique (amélioration locale avec optimisation du nombre de stations) ===")
-    print(f"Fichier : {fichier}, Nombre de nœuds : {len(probleme.node_coords)}")
-    
-    debut = time.time()
-    p_optimal, cycle, stations, cout = amelioration_locale_optimisee(probleme)
-    temps = time.time() - debut
+        debut = time.time()
+        # Départ à chaud depuis la meilleure solution déjà enregistrée pour l'instance
+        p_optimal, cycle, stations, cout = stockage.resoudre(
+            probleme, "metaheuristique",
+            lambda depart: metaheuristique(probleme, methode, temps_limite, n_workers=n_workers, depart=depart),
+            parametres={"methode": methode, "temps_limite": temps_limite, "n_workers": n_workers},
+            recalculer=recalculer, aleatoire=True,
+        )
+        temps = time.time() - debut
+        rapport.update(p=p_optimal, cout=cout, temps_resolution=temps)
 
     print(f"\n=== Résultat ===")
     print(f"Nombre optimal de stations : {p_optimal}")
     print(f"Coût de la solution optimale : {cout:.2f}")
     print(f"Temps de résolution : {temps:.4f} secondes")
     print(f"Stations : {stations}")
-    
-    afficherSolution(probleme, cycle, stations, methode="metaheuristique")
+
+    if not sans_affichage:
+        from affichage import afficherSolution
+        # Affectation gardée par le calcul du coût final : le schéma ne la recalcule pas
+        afficherSolution(probleme, cycle, stations, methode="metaheuristique",
+                         affectation=affectationEnMemoire(probleme, stations))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import METHODES, lireValeursP, resoudre
+from echeances import Echeance
+from instance import (
+    NOMBRE_MIN_STATIONS,
+    dimensionInstance,
+    instanceChargee,
+    instanceEnMemoire,
+    obtenirListesCandidats,
+    obtenirMatriceDistances,
+)
+from instrumentation import rapportInstrumentation, reinitialiserCompteurs
+
+
+# Seul dossier dont les instances peuvent être demandées (défaut de --dossier-instances)
+DOSSIER_INSTANCES = "data"
+
+REPONSES_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class RequeteInvalide(ValueError):
+    """Requête de résolution mal formée (réponse 400)."""
+
+
+# Chemin réel d'une instance demandée ; refusée si elle n'est pas dans le dossier des instances
+def cheminAutorise(fichier, dossier=DOSSIER_INSTANCES):
+    racine = os.path.realpath(dossier)
+    if not isinstance(fichier, str) or not fichier or "\0" in fichier:
+        raise RequeteInvalide("le champ \"instance\" doit être un nom de fichier")
+    # Nom relatif au dossier des instances, ou chemin (relatif au répertoire courant) qui y mène
+    for candidat in (os.path.join(racine, fichier), fichier):
+        chemin = os.path.realpath(candidat)
+        if os.path.commonpath([racine, chemin]) == racine and os.path.isfile(chemin):
+            return chemin
+    raise RequeteInvalide(f"instance introuvable dans {dossier} : {fichier}")
+
+
+# Instance prête à résoudre : lue (instanceChargee), matrice de distances et listes de
+# candidats calculées ; elles restent rattachées à l'instance tant qu'elle est gardée
+def instanceChaude(chemin):
+    probleme = instanceChargee(chemin)
+    obtenirMatriceDistances(probleme)
+    obtenirListesCandidats(probleme)
+    return probleme
+
+
+def _initialiser_worker_serveur(chemins):
+    # Sans cela, tous les processus issus du fork tireraient les mêmes stations aléatoires
+    random.seed()
+    for chemin in chemins:
+        instanceChaude(chemin)
+
+
+# Une requête dans un processus du pool ; les valeurs de p se partagent le budget
+def executerRequete(fichier, chemin, methode, valeurs_p, graine, temps_limite, budget):
+    debut = time.perf_counter()
+    echeance = Echeance(budget)
+    reinitialiserCompteurs()
+    reponse = {"instance": fichier, "methode": methode, "graine": graine, "deja_chargee": False}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            reponse["deja_chargee"] = instanceEnMemoire(chemin) is not None
+            probleme = instanceChaude(chemin)
+            reponse["chargement"] = time.perf_counter() - debut
+            meilleur = None
+            couts = {}
+            for p in valeurs_p:
+                if meilleur is not None and echeance.depassee():
+                    break
+                random.seed(graine)
+                # Le temps restant borne aussi le temps_limite de la métaheuristique (batch.resoudre)
+                resultat = resoudre(probleme, methode, p, graine, temps_limite, echeance.restant())
+                couts[resultat[0]] = resultat[3]
+                if meilleur is None or resultat[3] < meilleur[3]:
+                    meilleur = resultat
+        p_trouve, cycle, stations, cout = meilleur
+        reponse.update(nom=probleme.name, n=probleme.dimension, p=p_trouve, cout=cout,
+                       stations=[int(u) for u in stations], cycle=[int(u) for u in cycle],
+                       couts_par_p={str(p): c for p, c in couts.items()}, interrompue=echeance.depassee())
+    except Exception as e:
+        reponse["erreur"] = f"{type(e).__name__}: {e}"
+    reponse["temps"] = time.perf_counter() - debut
+    reponse["phases"] = {phase: mesure["temps"] for phase, mesure in rapportInstrumentation()["phases"].items()}
+    return reponse
+
+
+# Paramètres d'une requête de résolution, vérifiés avant d'entrer dans la file
+def lireRequete(corps, dossier=DOSSIER_INSTANCES):
+    try:
+        demande = json.loads(corps or b"{}")
+    except json.JSONDecodeError as e:
+        raise RequeteInvalide(f"JSON invalide : {e}")
+    if not isinstance(demande, dict) or "instance" not in demande:
+        raise RequeteInvalide("le champ \"instance\" est obligatoire")
+    fichier = demande["instance"]
+    chemin = cheminAutorise(fichier, dossier)
+    methode = demande.get("methode", "heuristique")
+    if methode not in METHODES:
+        raise RequeteInvalide(f"méthode inconnue : {methode}")
+    p = demande.get("p")
+    try:
+        # p : absent ou "auto" (la méthode choisit), un entier, ou des valeurs et intervalles "3-10,15"
+        valeurs_p = lireValeursP("auto" if p is None else str(p))
+        budget = None if demande.get("budget") is None else float(demande["budget"])
+        temps_limite = float(demande.get("temps_limite", 10.0))
+        graine = int(demande.get("graine", 0))
+        n = dimensionInstance(chemin)
+    except (TypeError, ValueError) as e:
+        raise RequeteInvalide(str(e))
+    if n is None:
+        raise RequeteInvalide(f"pas une instance TSPLIB (DIMENSION absente) : {fichier}")
+    for valeur in valeurs_p:
+        if valeur is not None and not NOMBRE_MIN_STATIONS <= valeur <= n:
+            raise RequeteInvalide(f"p={valeur} hors de l'intervalle {NOMBRE_MIN_STATIONS}..{n} de l'instance")
+    if not temps_limite > 0 or (budget is not None and not budget > 0):
+        raise RequeteInvalide("budget et temps_limite doivent être positifs")
+    return fichier, chemin, methode, valeurs_p, graine, temps_limite, budget
+
+
+class ServeurResolution:
+    """
+    Service local de résolution : les requêtes entrent dans une file bornée et
+    sont traitées par un pool de processus qui gardent les instances en mémoire.
+
+    Chaque processus charge une instance à sa première requête (lecture,
+    matrice de distances, listes de candidats), puis la garde pour les
+    suivantes : seule la résolution reste à payer. Une requête reçue quand la
+    file est pleine est refusée tout de suite (503) plutôt que mise en attente.
+
+    Args:
+        n_workers: Nombre de processus de résolution
+        taille_file: Nombre de requêtes en attente au-delà duquel on refuse
+        precharger: Instances chargées par chaque processus dès son démarrage
+        dossier_instances: Seul dossier dont les instances peuvent être demandées
+    """
+
+    def __init__(self, n_workers=1, taille_file=16, precharger=(), dossier_instances=DOSSIER_INSTANCES):
+        self.n_workers = max(1, n_workers)
+        self.taille_file = taille_file
+        self.dossier_instances = dossier_instances
+        self.precharger = [cheminAutorise(fichier, dossier_instances) for fichier in precharger]
+        self.statistiques = {"recues": 0, "refusees": 0, "terminees": 0, "en_cours": 0}
+
+    async def demarrer(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_initialiser_worker_serveur,
+                                        initargs=(self.precharger,))
+        self.file = asyncio.Queue(maxsize=self.taille_file)
+        self.consommateurs = [asyncio.create_task(self._consommer()) for _ in range(self.n_workers)]
+
+    async def arreter(self):
+        for consommateur in self.consommateurs:
+            consommateur.cancel()
+        await asyncio.gather(*self.consommateurs, return_exceptions=True)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    # Un consommateur par processus : la file ne se vide pas plus vite que le pool ne travaille
+    async def _consommer(self):
+        boucle = asyncio.get_running_loop()
+        while True:
+            parametres, resultat = await self.file.get()
+            self.statistiques["en_cours"] += 1
+            try:
+                resultat.set_result(await boucle.run_in_executor(self.pool, executerRequete, *parametres))
+            except Exception as e:
+                if not resultat.done():
+                    resultat.set_exception(e)
+            finally:
+                self.statistiques["en_cours"] -= 1
+                self.statistiques["terminees"] += 1
+                self.file.task_done()
+
+    # Résolution d'une requête ; renvoie (code HTTP, réponse JSON)
+    async def resoudre(self, corps):
+        try:
+            parametres = lireRequete(corps, self.dossier_instances)
+        except RequeteInvalide as e:
+            return 400, {"erreur": str(e)}
+        self.statistiques["recues"] += 1
+        resultat = asyncio.get_running_loop().create_future()
+        try:
+            self.file.put_nowait((parametres, resultat))
+        except asyncio.QueueFull:
+            self.statistiques["refusees"] += 1
+            return 503, {"erreur": f"file pleine ({self.taille_file} requêtes en attente)"}
+        reponse = await resultat
+        return (500 if "erreur" in reponse else 200), reponse
+
+    def etat(self):
+        return {"workers": self.n_workers, "taille_file": self.taille_file, "en_attente": self.file.qsize(),
+                **self.statistiques}
+
+    # Une connexion HTTP/1.1 : une requête, une réponse JSON, puis fermeture
+    async def traiter_connexion(self, lecteur, ecrivain):
+        try:
+            ligne = (await lecteur.readline()).decode("latin-1").split()
+            entetes = {}
+            while True:
+                entete = (await lecteur.readline()).decode("latin-1").strip()
+                if not entete:
+                    break
+                nom, _, valeur = entete.partition(":")
+                entetes[nom.strip().lower()] = valeur.strip()
+            corps = await lecteur.readexactly(int(entetes.get("content-length", 0)))
+
+            if len(ligne) < 2:
+                code, reponse = 400, {"erreur": "requête HTTP invalide"}
+            elif ligne[1] == "/resoudre" and ligne[0] != "POST":
+                code, reponse = 405, {"erreur": "POST attendu"}
+            elif ligne[1] == "/resoudre":
+                code, reponse = await self.resoudre(corps)
+            elif ligne[1] == "/etat":
+                code, reponse = 200, self.etat()
+            else:
+                code, reponse = 404, {"erreur": f"chemin inconnu : {ligne[1]}",
+                                      "chemins": ["POST /resoudre", "GET /etat"]}
+
+            donnees = json.dumps(reponse).encode()
+            ecrivain.write(f"HTTP/1.1 {code} {REPONSES_HTTP[code]}\r\nContent-Type: application/json\r\n"
+                           f"Content-Length: {len(donnees)}\r\nConnection: close\r\n\r\n".encode() + donnees)
+            await ecrivain.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            ecrivain.close()
+
+
+async def servir(serveur, hote="127.0.0.1", port=8765, socket_unix=None):
+    await serveur.demarrer()
+    if socket_unix:
+        ecoute = await asyncio.start_unix_server(serveur.traiter_connexion, path=socket_unix)
+        adresse = f"unix:{socket_unix}"
+    else:
+        ecoute = await asyncio.start_server(serveur.traiter_connexion, hote, port)
+        adresse = f"http://{hote}:{port}"
+    print(f"Serveur de résolution sur {adresse} ({serveur.n_workers} processus, file de {serveur.taille_file})",
+          file=sys.stderr, flush=True)
+    try:
+        async with ecoute:
+            await ecoute.serve_forever()
+    finally:
+        await serveur.arreter()
+        if socket_unix and os.path.exists(socket_unix):
+            os.remove(socket_unix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service local de résolution : instances gardées en mémoire, "
+                                                 "requêtes JSON sur HTTP (POST /resoudre, GET /etat)")
+    parser.add_argument("--hote", default="127.0.0.1", help="Adresse d'écoute (défaut : boucle locale)")
+    parser.add_argument("--port", type=int, default=8765, help="Port d'écoute")
+    parser.add_argument("--socket", default=None, help="Socket Unix à la place du port TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument("--taille-file", type=int, default=16,
+                        help="Nombre de requêtes en attente au-delà duquel on refuse (503)")
+    parser.add_argument("--precharger", nargs="*", default=[], help="Instances chargées au démarrage")
+    parser.add_argument("--dossier-instances", default=DOSSIER_INSTANCES,
+                        help="Seul dossier dont les instances peuvent être demandées (défaut : data)")
+    args = parser.parse_args()
+
+    try:
+        serveur = ServeurResolution(args.workers, args.taille_file, args.precharger, args.dossier_instances)
+    except RequeteInvalide as e:
+        parser.error(str(e))
+    try:
+        asyncio.run(servir(serveur, args.hote, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import time
+
+from instance import _ecrireAtomique, empreinteInstance
+
+
+# Dossier par défaut du stockage des solutions utilisé par les scripts
+DOSSIER_SOLUTIONS = "solutions"
+
+
+class StockageSolutions:
+    """
+    Solutions enregistrées sur disque pour être reprises d'une exécution à l'autre.
+
+    Chaque solution est un fichier JSON <dossier>/<nom>_<empreinte>/<clé>.json, où
+    l'empreinte est celle du fichier de l'instance (empreinteInstance) et la clé un
+    hash de (méthode, p demandé, graine, paramètres). Pour une même clé, seule la
+    meilleure solution est gardée. Les solutions de toutes les méthodes servent
+    aussi de départs à chaud (meilleure). Avec dossier=None, rien n'est lu ni écrit.
+    """
+
+    def __init__(self, dossier=DOSSIER_SOLUTIONS):
+        self.dossier = dossier
+
+    def _dossier_instance(self, probleme):
+        return os.path.join(self.dossier, f"{probleme.name}_{empreinteInstance(probleme)[:16]}")
+
+    @staticmethod
+    def _cle(methode, p, graine, parametres):
+        description = json.dumps({"methode": methode, "p": p, "graine": graine, "parametres": parametres or {}},
+                                 sort_keys=True, default=str)
+        return hashlib.sha1(description.encode()).hexdigest()[:16]
+
+    def lire(self, probleme, methode, p=None, graine=None, parametres=None):
+        """Solution enregistrée pour cette clé (dictionnaire), ou None."""
+        if self.dossier is None:
+            return None
+        chemin = os.path.join(self._dossier_instance(probleme), f"{self._cle(methode, p, graine, parametres)}.json")
+        try:
+            with open(chemin) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def enregistrer(self, probleme, methode, cycle, stations, cout, p=None, graine=None, parametres=None, **infos):
+        """
+        Enregistre une solution, sauf si une meilleure existe déjà pour la même clé.
+
+        Args:
+            p: Nombre de stations demandé (None si la méthode le choisit elle-même)
+            infos: Informations ajoutées à l'entrée (temps, borne...)
+
+        Returns:
+            L'entrée gardée (la nouvelle ou celle déjà enregistrée), None sans dossier
+        """
+        if self.dossier is None:
+            return None
+        existante = self.lire(probleme, methode, p, graine, parametres)
+        if existante is not None and existante["cout"] <= cout:
+            return existante
+        entree = {
+            "instance": probleme.name,
+            "methode": methode,
+            "p_demande": p,
+            "graine": graine,
+            "parametres": parametres or {},
+            "p": len(stations),
+            "cout": cout,
+            "cycle": [int(u) for u in cycle],
+            "stations": [int(u) for u in stations],
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **infos,
+        }
+        dossier = self._dossier_instance(probleme)
+        os.makedirs(dossier, exist_ok=True)
+        chemin = os.path.join(dossier, f"{self._cle(methode, p, graine, parametres)}.json")
+        _ecrireAtomique(chemin, lambda f: json.dump(entree, f, indent=2, default=str), mode="w")
+        return entree
+
+    def meilleure(self, probleme, p=None):
+        """Meilleure solution enregistrée pour l'instance, toutes méthodes confondues (à p stations si p est donné)."""
+        if self.dossier is None:
+            return None
+        dossier = self._dossier_instance(probleme)
+        meilleure = None
+        if not os.path.isdir(dossier):
+            return None
+        for nom in os.listdir(dossier):
+            if not nom.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(dossier, nom)) as f:
+                    entree = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if p is not None and entree["p"] != p:
+                continue
+            if meilleure is None or entree["cout"] < meilleure["cout"]:
+                meilleure = entree
+        return meilleure
+
+    def resoudre(self, probleme, methode, calcul, p=None, graine=None, parametres=None, recalculer=False,
+                 a_chaud=True, aleatoire=False, afficher=print):
+        """
+        Reprend la solution enregistrée pour cette clé, ou la calcule et l'enregistre.
+
+        Args:
+            calcul: Fonction depart -> (p, cycle, stations, cout), où depart est la meilleure
+                solution enregistrée (cycle, stations), à p stations si p est donné, ou None
+            recalculer: Calcule même si une solution est enregistrée (la meilleure reste gardée)
+            a_chaud: Cherche un départ à chaud (False si la méthode n'en prend pas)
+            aleatoire: Méthode aléatoire ; sans graine, deux exécutions ne sont pas le même
+                calcul : rien n'est repris, la solution est seulement enregistrée (elle sert
+                de départ à chaud et la meilleure reste gardée)
+
+        Returns:
+            (p, cycle, stations, cout)
+        """
+        if not recalculer and not (aleatoire and graine is None):
+            entree = self.lire(probleme, methode, p, graine, parametres)
+            if entree is not None:
+                afficher(f"Solution reprise du stockage ({entree['date']}) : p={entree['p']}, coût={entree['cout']:.2f}")
+                return entree["p"], entree["cycle"], entree["stations"], entree["cout"]
+
+        depart = self.meilleure(probleme, p) if a_chaud else None
+        if depart is not None:
+            afficher(f"Départ à chaud depuis le stockage ({depart['methode']}) : p={depart['p']}, "
+                     f"coût={depart['cout']:.2f}")
+            depart = (depart["cycle"], depart["stations"])
+        debut = time.perf_counter()
+        p_trouve, cycle, stations, cout = calcul(depart)
+        self.enregistrer(probleme, methode, cycle, stations, cout, p, graine, parametres,
+                         temps=time.perf_counter() - debut)
+        return p_trouve, cycle, stations, cout
+
+
+# Retire --solutions <dossier>, --sans-stockage et --recalculer des arguments d'un script
+def optionsStockage(argv):
+    restants = []
+    dossier = DOSSIER_SOLUTIONS
+    recalculer = False
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--solutions" and i + 1 < len(argv):
+            dossier = argv[i + 1]
+            i += 2
+            continue
+        if argv[i] == "--sans-stockage":
+            dossier = None
+        elif argv[i] == "--recalculer":
+            recalculer = True
+        else:
+            restants.append(argv[i])
+        i += 1
+    return restants, StockageSolutions(dossier), recalculer
+
+
+# Retire --budget <secondes> des arguments d'un script ; budget None sans l'option
+def optionsBudget(argv):
+    restants = []
+    budget = None
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--budget" and i + 1 < len(argv):
+            budget = float(argv[i + 1])
+            i += 2
+            continue
+        restants.append(argv[i])
+        i += 1
+    return restants, budget
@@ -0,0 +1,69 @@
+import os
+import random
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import instance
+from instance import (
+    InstanceTSP,
+    MatriceImplicite,
+    amelioration_locale,
+    cout_solution,
+    heuristique_rapide,
+    obtenirMatriceDistances,
+    valeursNombreStations,
+)
+
+
+def _instance(n=120, graine=0):
+    rng = np.random.default_rng(graine)
+    return InstanceTSP("aleatoire", "EUC_2D", np.arange(1, n + 1), rng.uniform(0, 1000, (n, 2)))
+
+
+def test_indexation_identique_a_la_matrice_dense():
+    probleme = _instance()
+    dense = obtenirMatriceDistances(probleme)[0]
+    implicite = MatriceImplicite(probleme.coords)
+    I = np.array([5, 0, 17, 119])
+    J = np.array([3, 3, 64])
+    assert implicite.shape == dense.shape
+    assert implicite[7, 42] == dense[7, 42]
+    assert np.array_equal(implicite[7], dense[7])
+    assert np.array_equal(implicite[np.ix_(I, J)], dense[np.ix_(I, J)])
+    assert np.array_equal(implicite[:, J], dense[:, J])
+    assert np.array_equal(implicite[10:50, J], dense[10:50, J])
+    assert np.array_equal(implicite[I[:3], J], dense[I[:3], J])
+
+
+def test_amelioration_locale_identique_avec_matrice_implicite(monkeypatch):
+    resultats = []
+    for seuil in (instance.SEUIL_MATRICE_IMPLICITE, 0):
+        monkeypatch.setattr(instance, "SEUIL_MATRICE_IMPLICITE", seuil)
+        probleme = _instance()
+        matrice, index_to_node, node_to_index = obtenirMatriceDistances(probleme)
+        assert isinstance(matrice, MatriceImplicite) == (seuil == 0)
+        random.seed(3)
+        cycle, stations = heuristique_rapide(probleme, 12)
+        cycle, stations, cout = amelioration_locale(probleme, 12, cycle, stations, max_iter=50)
+        assert cout == pytest.approx(cout_solution(probleme, cycle, stations, matrice, index_to_node, node_to_index))
+        resultats.append((cycle, stations, cout))
+    # Mêmes mouvements, donc même solution ; le coût peut différer au dernier bit (ordre des sommes)
+    assert resultats[0][:2] == resultats[1][:2]
+    assert resultats[0][2] == pytest.approx(resultats[1][2])
+
+
+def test_balayage_plafonne_avec_avertissement(monkeypatch):
+    monkeypatch.setattr(instance, "SEUIL_MATRICE_IMPLICITE", 10)
+    monkeypatch.setattr(instance, "P_MAX_MATRICE_IMPLICITE", 20)
+    with pytest.warns(RuntimeWarning, match="de 3 à 20"):
+        assert valeursNombreStations(40) == list(range(3, 21))
+    # Échantillon autour de √n : p=n n'est pas demandé, le plafond ne retire rien sans prévenir
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        valeurs = valeursNombreStations(400, n_max_tests=10)
+    assert max(valeurs) == 20 and min(valeurs) == 3
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from instance import InstanceTSP, MemoAnneaux
+from stockage import StockageSolutions
+
+
+def _instance(n=30, graine=0):
+    rng = np.random.default_rng(graine)
+    return InstanceTSP("aleatoire", "EUC_2D", np.arange(1, n + 1), rng.uniform(0, 1000, (n, 2)))
+
+
+def test_collision_de_cle_non_reprise():
+    memo = MemoAnneaux(10)
+    anneau = np.array([0, 1, 2], dtype=np.int32)
+    memo.enregistrer(42, frozenset([0, 1, 2]), anneau, 3.0)
+    assert memo.obtenir(42, frozenset([0, 1, 2]))[1] == 3.0
+    # Même clé, autre ensemble de stations : échec, pas l'anneau gardé
+    assert memo.obtenir(42, frozenset([0, 1, 3])) is None
+
+
+def test_memo_borne_en_stations():
+    memo = MemoAnneaux(10, capacite=100, capacite_stations=6)
+    for cle in range(3):
+        stations = frozenset(range(cle, cle + 3))
+        memo.enregistrer(cle, stations, np.array(sorted(stations)), 1.0)
+    assert memo.obtenir(0, frozenset(range(0, 3))) is None
+    assert memo.obtenir(2, frozenset(range(2, 5))) is not None
+
+
+def test_methode_aleatoire_sans_graine_jamais_reprise(tmp_path):
+    probleme = _instance()
+    stockage = StockageSolutions(str(tmp_path))
+    appels = []
+
+    def calcul(depart):
+        appels.append(depart)
+        return 3, [1, 2, 3], [1, 2, 3], 100.0 - len(appels)
+
+    for _ in range(2):
+        stockage.resoudre(probleme, "heuristique", calcul, a_chaud=False, aleatoire=True, afficher=lambda m: None)
+    assert len(appels) == 2
+    # La meilleure des deux exécutions reste enregistrée
+    assert stockage.lire(probleme, "heuristique")["cout"] == 98.0
+
+    # Avec une graine, le même calcul est repris
+    for _ in range(2):
+        stockage.resoudre(probleme, "heuristique", calcul, graine=1, a_chaud=False, aleatoire=True,
+                          afficher=lambda m: None)
+    assert len(appels) == 3